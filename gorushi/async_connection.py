@@ -0,0 +1,305 @@
+import asyncio
+from collections.abc import Iterable
+from datetime import datetime
+import ssl
+
+from gorushi.cache import BrowserCacheKey
+from gorushi.charset import CharsetDecoder
+from gorushi.connection import CacheControl, Connection, HttpOptions
+from gorushi.connection_pool import ConnectionPoolCacheKey
+from gorushi.resolver import HAPPY_EYEBALLS_DELAY
+from gorushi.url import URL
+
+
+Stream = tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class AsyncConnection(Connection):
+    """
+    asyncio counterpart of Connection for fetching many URLs concurrently.
+
+    Chunked and compressed bodies, the redirect cache and the browser/disk
+    caches behave as in Connection. Keep-alive streams are pooled per
+    AsyncConnection, several per host, because asyncio streams belong to
+    the event loop that opened them. Unlike Connection, a stream is closed
+    after a redirect instead of being drained and reused for the next hop.
+    """
+
+    stream_pool: dict[ConnectionPoolCacheKey, list[Stream]]
+
+    def __init__(self, http_options: HttpOptions | None = None):
+        super().__init__(http_options)
+        self.stream_pool = {}
+
+    async def _open_stream(
+        self,
+        url: URL,
+        reuse: bool = True
+    ) -> tuple[Stream, bool]:
+        """An idle pooled stream, or a new one, and whether it was reused."""
+        key = ConnectionPoolCacheKey(host=url.host, port=url.port)
+        idle = self.stream_pool.get(key)
+        while reuse and idle:
+            reader, writer = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return (reader, writer), True
+            writer.close()
+
+        # Shares Connection's SSLContext, but TLS sessions are not resumed:
+        # asyncio has no way to hand a saved session to the handshake
+        if url.scheme == "https":
+            stream = await asyncio.open_connection(
+                url.host,
+                url.port,
+                ssl=Connection.tls.context(Connection.tls_config),
+                server_hostname=url.host,
+                happy_eyeballs_delay=HAPPY_EYEBALLS_DELAY
+            )
+        else:
+            stream = await asyncio.open_connection(
+                url.host, url.port, happy_eyeballs_delay=HAPPY_EYEBALLS_DELAY
+            )
+        return stream, False
+
+    async def _exchange_async(
+        self,
+        stream: Stream,
+        request: bytes
+    ) -> tuple[str, dict[str, str]]:
+        """Send request and read the response status and headers."""
+        reader, writer = stream
+        writer.write(request)
+        await writer.drain()
+
+        statusline = await reader.readline()
+        if not statusline:
+            raise ConnectionError(
+                "Connection closed before a response was received"
+            )
+        status = self._parse_status_line(statusline)
+
+        response_headers: dict[str, str] = {}
+        while self._parse_header_line(
+            await reader.readline(), response_headers
+        ):
+            pass
+
+        return status, response_headers
+
+    async def _send_request_async(
+        self,
+        url: URL,
+        request: bytes
+    ) -> tuple[Stream, str, dict[str, str]]:
+        """
+        Send request on a pooled stream. As in Connection, a reused
+        keep-alive stream the server has closed in the meantime is retried
+        once on a new stream.
+        """
+        stream, reused = await self._open_stream(url)
+        try:
+            return stream, *await self._exchange_async(stream, request)
+        except OSError:
+            stream[1].close()
+            if not reused:
+                raise
+        except BaseException:
+            stream[1].close()
+            raise
+
+        stream, _ = await self._open_stream(url, reuse=False)
+        try:
+            return stream, *await self._exchange_async(stream, request)
+        except BaseException:
+            stream[1].close()
+            raise
+
+    def _release_stream(
+        self,
+        url: URL,
+        stream: Stream,
+        http_options: HttpOptions,
+        response_headers: dict[str, str]
+    ) -> None:
+        _, writer = stream
+        if (
+            http_options['http_version'] == "1.0"
+            or response_headers.get('connection', '').lower() == 'close'
+        ):
+            writer.close()
+            return
+        key = ConnectionPoolCacheKey(host=url.host, port=url.port)
+        self.stream_pool.setdefault(key, []).append(stream)
+
+    async def _read_chunked_body_async(
+        self,
+        reader: asyncio.StreamReader
+    ) -> list[bytes]:
+        chunks: list[bytes] = []
+        while True:
+            chunk_size = self._parse_chunk_size(await reader.readline())
+            if chunk_size == 0:
+                break
+            chunks.append(await reader.readexactly(chunk_size))
+            _ = await reader.readexactly(2)  # Read the trailing CRLF
+
+        # Skip the (usually empty) trailer section
+        while (await reader.readline()) not in (b"\r\n", b""):
+            pass
+
+        return chunks
+
+    async def _read_body_async(
+        self,
+        reader: asyncio.StreamReader,
+        response_headers: dict[str, str]
+    ) -> bytes:
+        if 'content-length' in response_headers:
+            remaining = int(response_headers['content-length'])
+            chunks: list[bytes] = []
+            while remaining > 0:
+                data = await reader.read(
+                    min(remaining, self.STREAM_CHUNK_SIZE)
+                )
+                if not data:
+                    break
+                remaining -= len(data)
+                chunks.append(data)
+        elif (
+            'transfer-encoding' in response_headers
+            and response_headers['transfer-encoding'].lower() == 'chunked'
+        ):
+            chunks = await self._read_chunked_body_async(reader)
+        else:
+            chunks = [await reader.read()]
+        return b"".join(self._decode_content(chunks, response_headers))
+
+    async def _fetch_http(self, url: URL, http_options: HttpOptions) -> str:
+        url, redirect_count = self._follow_cached_redirects(url)
+        cached_content = self._cached_entry(url, datetime.now())
+        if cached_content is not None:
+            return cached_content.content
+
+        if http_options['http_version'] not in ("1.0", "1.1"):
+            raise ValueError("Unsupported HTTP version")
+
+        # The stream in use, closed on the way out unless released to the pool
+        stream: Stream | None = None
+        try:
+            while True:
+                if redirect_count > self.MAX_REDIRECTS:
+                    raise RuntimeError("Maximum redirect limit reached")
+
+                stale_content = self._stale_entry(
+                    BrowserCacheKey(url=str(url))
+                )
+                request = self._build_request(url, http_options, stale_content)
+                stream, status, response_headers = (
+                    await self._send_request_async(url, request)
+                )
+
+                redirect_url = self._redirect_url(
+                    url, status, response_headers
+                )
+                if redirect_url is not None:
+                    self._remember_redirect(
+                        url, status, response_headers, redirect_url
+                    )
+                    url = redirect_url
+                    redirect_count += 1
+
+                    # The redirect body is left unread, so the stream cannot
+                    # be reused for the next hop
+                    stream[1].close()
+                    stream = None
+                    continue
+
+                break
+
+            cache_control = CacheControl.parse(response_headers)
+            if status == "304" and stale_content is not None:
+                # Not modified: refresh the stale entry without moving the body
+                self._release_stream(
+                    url, stream, http_options, response_headers
+                )
+                stream = None
+                return self._refresh_entry(
+                    url, stale_content, cache_control, response_headers
+                ).content
+
+            body = await self._read_body_async(stream[0], response_headers)
+            content = CharsetDecoder(
+                content_type=response_headers.get('content-type')
+            ).decode(body, final=True)
+
+            self._release_stream(url, stream, http_options, response_headers)
+            stream = None
+        finally:
+            if stream is not None:
+                stream[1].close()
+
+        self._update_cache(
+            url,
+            cache_control,
+            response_headers,
+            content if cache_control.is_cacheable(response_headers) else None
+        )
+
+        return content
+
+    async def fetch(self, *, url: URL) -> str:
+        if url.scheme == "data":
+            return self._request_data(url)
+        elif url.scheme == "file":
+            return self._request_file(url)
+        else:
+            return await self._fetch_http(url, http_options=self.http_options)
+
+    async def fetch_many(
+        self,
+        urls: Iterable[URL],
+        concurrency: int = 8
+    ) -> list[str]:
+        """
+        Fetch every URL with at most `concurrency` requests in flight.
+        Results are returned in the order of urls.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch_one(url: URL) -> str:
+            async with semaphore:
+                return await self.fetch(url=url)
+
+        return await asyncio.gather(*(fetch_one(url) for url in urls))
+
+    async def aclose(self) -> None:
+        """Close every pooled keep-alive stream."""
+        writers = [
+            writer for idle in self.stream_pool.values() for _, writer in idle
+        ]
+        self.stream_pool.clear()
+        for writer in writers:
+            writer.close()
+        for writer in writers:
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+
+
+def fetch_many(
+    urls: Iterable[URL],
+    concurrency: int = 8,
+    http_options: HttpOptions | None = None
+) -> list[str]:
+    """Fetch urls concurrently from synchronous code."""
+    async def run() -> list[str]:
+        connection = AsyncConnection(
+            http_options=http_options or {"http_version": "1.1"}
+        )
+        try:
+            return await connection.fetch_many(urls, concurrency=concurrency)
+        finally:
+            await connection.aclose()
+
+    return asyncio.run(run())
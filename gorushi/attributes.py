@@ -0,0 +1,116 @@
+from collections.abc import Iterator, Mapping, MutableMapping
+from functools import lru_cache
+import re
+import sys
+from types import MappingProxyType
+from typing import cast, final, override
+
+
+# Shared by every element without attributes; read-only so that it stays
+# empty. Attributes copies it before the first change.
+EMPTY_ATTRIBUTES: Mapping[str, str] = MappingProxyType({})
+
+# Optional whitespace, then the tag name (with the / of an end tag)
+TAG_NAME = re.compile(r"\s*(/?[^\s/]*)")
+
+# An attribute name, optionally followed by = and a double-quoted,
+# single-quoted or unquoted value
+# (https://html.spec.whatwg.org/multipage/syntax.html#attributes-2)
+ATTRIBUTE = re.compile(
+    r"""([^\s"'<>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|(\S+)))?"""
+)
+
+TAG_CACHE_SIZE = 4096
+
+
+@final
+class Attributes(MutableMapping[str, str]):
+    """
+    The attributes of an element. Reads go to a mapping that may be shared
+    with other elements, such as a cached parse_attributes() result or
+    EMPTY_ATTRIBUTES; the first change copies it, so that changes stay with
+    the element.
+    """
+    __slots__ = ("_mapping", "_copy")
+
+    def __init__(self, mapping: Mapping[str, str] = EMPTY_ATTRIBUTES):
+        self._mapping: Mapping[str, str] = mapping
+        self._copy: dict[str, str] | None = None
+
+    @property
+    def changed(self) -> bool:
+        """Whether the shared mapping has been copied to make a change."""
+        return self._copy is not None
+
+    def _writable(self) -> dict[str, str]:
+        if self._copy is None:
+            self._copy = dict(self._mapping)
+            self._mapping = self._copy
+        return self._copy
+
+    @override
+    def __getitem__(self, name: str) -> str:
+        return self._mapping[name]
+
+    @override
+    def __contains__(self, name: object) -> bool:
+        return name in self._mapping
+
+    @override
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._mapping)
+
+    @override
+    def __len__(self) -> int:
+        return len(self._mapping)
+
+    @override
+    def __setitem__(self, name: str, value: str) -> None:
+        self._writable()[name] = value
+
+    @override
+    def __delitem__(self, name: str) -> None:
+        del self._writable()[name]
+
+    @override
+    def __repr__(self) -> str:
+        return repr(dict(self._mapping))
+
+
+def parse_tag_name(text: str) -> tuple[str, int]:
+    """
+    The casefolded name of the tag whose source is text, e.g.
+    'a href="/" class=nav', and the index its attributes start at.
+    """
+    match = TAG_NAME.match(text)
+    assert match is not None
+    # Interned, so every element with the same tag shares one string
+    return (sys.intern(match.group(1).casefold()), match.end())
+
+
+@lru_cache(maxsize=TAG_CACHE_SIZE)
+def parse_attributes(text: str) -> Mapping[str, str]:
+    """
+    The attributes in the source of a tag, in one scan. The first of
+    duplicate attributes wins, as in browsers.
+
+    Results are cached, since pages repeat the same tags over and over,
+    so they are read-only and shared by every element with the same tag
+    source, each wrapping them in its own Attributes.
+    """
+    _, start = parse_tag_name(text)
+    attributes: dict[str, str] = {}
+    # One (name, double quoted, single quoted, unquoted) tuple per match
+    matches = cast(
+        list[tuple[str, str, str, str]], ATTRIBUTE.findall(text, start)
+    )
+    for name, double_quoted, single_quoted, unquoted in matches:
+        name = name.casefold()
+        if name not in attributes:
+            attributes[name] = double_quoted or single_quoted or unquoted
+
+    return MappingProxyType(attributes) if attributes else EMPTY_ATTRIBUTES
+
+
+def parse_tag(text: str) -> tuple[str, Mapping[str, str]]:
+    return (parse_tag_name(text)[0], parse_attributes(text))
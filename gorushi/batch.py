@@ -0,0 +1,190 @@
+import argparse
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+
+from gorushi.command import DrawCommand, DrawRect, DrawText
+from gorushi.connection import Connection
+from gorushi.constants import DEFAULT_WIDTH
+from gorushi.font_measure_cache import font_measurer
+from gorushi.fonts import HeadlessFontBackend, set_font_backend
+from gorushi.layout import (
+    FONT_CACHE, BlockLayout, DocumentLayout, paint_tree
+)
+from gorushi.parser import HTMLParser
+from gorushi.url import URL
+
+
+# Font sizes warmed in every worker. Headings, <small>/<big> and nested
+# <sup>/<sub> move around the 12pt body size; anything outside this range
+# is still created on demand.
+WARM_FONT_SIZES = range(2, 33)
+
+SerializedCommand = tuple[str | float, ...]
+
+
+@dataclass
+class BatchResult:
+    source: str
+    error: str | None = None
+
+    height: float = 0.0
+    commands: int = 0
+    words: int = 0
+
+    # sha256 of the serialized display list, to compare runs cheaply
+    digest: str = ""
+    display_list: list[SerializedCommand] | None = None
+
+    worker: int = 0
+    # Fonts the task had to create itself; 0 once the worker is warm
+    fonts_created: int = 0
+
+
+def serialize_command(command: DrawCommand) -> SerializedCommand:
+    """Plain tuple for a draw command, free of font objects."""
+    box = (command.left, command.top, command.right, command.bottom)
+    if isinstance(command, DrawText):
+        font = command.font
+        font_key = " ".join([
+            font.cget("family"),
+            str(font.cget("size")),
+            font.cget("weight"),
+            font.cget("slant"),
+        ]) if font is not None else ""
+        return ("text", *box, command.text, font_key)
+    if isinstance(command, DrawRect):
+        return ("rect", *box, command.color)
+    return (type(command).__name__, *box)
+
+
+def warm_worker() -> None:
+    """
+    Runs once in every worker process: switch to headless fonts and fill
+    FONT_CACHE and the measurer's ASCII tables for every font layout is
+    going to ask for, so tasks start warm.
+    """
+    set_font_backend(HeadlessFontBackend())
+    layout = BlockLayout()
+    for size in WARM_FONT_SIZES:
+        for weight in ("normal", "bold"):
+            for style in ("roman", "italic"):
+                font = layout.get_font(size, weight, style)
+                _ = font_measurer.measure(font, " ")
+
+
+def source_url(source: str) -> URL:
+    if "://" not in source and not source.startswith(("data:", "about:")):
+        source = "file://" + os.path.abspath(source)
+    return URL.parse(source)
+
+
+def render_document(
+    source: str,
+    width: float = DEFAULT_WIDTH,
+    include_display_list: bool = False
+) -> BatchResult:
+    fonts_before = len(FONT_CACHE)
+    try:
+        url = source_url(source)
+        connection = Connection(http_options={"http_version": "1.1"})
+        body = connection.request(url=url)
+        document = DocumentLayout(
+            width=width, node=HTMLParser(body=body).parse(), verbose=False
+        )
+        document.layout()
+        display_list: list[DrawCommand] = []
+        paint_tree(document, display_list)
+    except Exception as e:
+        return BatchResult(
+            source=source,
+            error=f"{type(e).__name__}: {e}",
+            worker=os.getpid(),
+        )
+
+    serialized = [serialize_command(command) for command in display_list]
+    return BatchResult(
+        source=source,
+        height=document.height,
+        commands=len(serialized),
+        words=sum(
+            1 for command in display_list if isinstance(command, DrawText)
+        ),
+        digest=hashlib.sha256(repr(serialized).encode("utf-8")).hexdigest(),
+        display_list=serialized if include_display_list else None,
+        worker=os.getpid(),
+        fonts_created=len(FONT_CACHE) - fonts_before,
+    )
+
+
+def render_batch(
+    sources: Iterable[str],
+    *,
+    max_workers: int | None = None,
+    width: float = DEFAULT_WIDTH,
+    include_display_list: bool = False,
+    chunksize: int = 4
+) -> list[BatchResult]:
+    """
+    Render every source (a URL or a file path) in a pool of max_workers
+    processes, defaulting to one per CPU. Results come back in the order
+    of sources; a document that fails to load or lay out gets a result
+    with error set instead of failing the batch.
+    """
+    sources = list(sources)
+    # spawn rather than fork: the parent may be running threads (e.g. the
+    # connection pool), and workers set up their own caches anyway
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=warm_worker,
+    ) as executor:
+        return list(executor.map(
+            render_document,
+            sources,
+            [width] * len(sources),
+            [include_display_list] * len(sources),
+            chunksize=chunksize,
+        ))
+
+
+class BatchArguments(argparse.Namespace):
+    sources: Sequence[str] = ()
+    workers: int | None = None
+    width: float = DEFAULT_WIDTH
+    display_list: bool = False
+
+
+def main(argv: list[str] | None = None) -> int:
+    argparser = argparse.ArgumentParser(
+        description=(
+            "Fetch, parse, lay out and paint documents headlessly in a pool "
+            "of worker processes, and print one JSON summary per document."
+        )
+    )
+    _ = argparser.add_argument(
+        "sources", nargs="+", help="URLs or file paths"
+    )
+    _ = argparser.add_argument("--workers", type=int)
+    _ = argparser.add_argument("--width", type=float, default=DEFAULT_WIDTH)
+    _ = argparser.add_argument("--display-list", action="store_true")
+    args = argparser.parse_args(argv, namespace=BatchArguments())
+
+    results = render_batch(
+        args.sources,
+        max_workers=args.workers,
+        width=args.width,
+        include_display_list=args.display_list,
+    )
+    for result in results:
+        print(json.dumps(asdict(result), ensure_ascii=False))
+    return 1 if any(result.error for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
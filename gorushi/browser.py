@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from time import time
 import tkinter
 import tkinter.font
@@ -9,8 +11,10 @@ from gorushi.connection import Connection
 from gorushi.constants import (
     DEFAULT_HEIGHT, DEFAULT_HORIZONTAL_PADDING, DEFAULT_HSTEP, DEFAULT_VERTICAL_PADDING, DEFAULT_VSTEP, DEFAULT_WIDTH
 )
-from gorushi.font_measure_cache import font_measurer
+from gorushi.font_measure_cache import FontMetricsDiskCache, font_measurer
+from gorushi.fonts import TkFontBackend, set_font_backend
 from gorushi.layout import DocumentLayout, Layout, paint_tree
+from gorushi.node import Element
 from gorushi.parser import HTMLParser, HTMLViewSourceParser
 from gorushi.renderer import RenderMode, Renderer
 from gorushi.url import URL
@@ -30,6 +34,31 @@ def get_project_root() -> str:
 
 project_root = get_project_root()
 
+@dataclass
+class LinkPreconnector:
+    """
+    HTMLParser.on_element hook that warms up a socket for the origin of
+    page at the first <a> linking back to it, while the rest of the page
+    is still arriving. Links to other origins are left alone.
+    """
+    page: URL
+    connection: Connection
+    submitted: bool = False
+
+    def __call__(self, element: Element) -> None:
+        if self.submitted or element.tag != "a":
+            return
+        href = element.attributes.get("href")
+        if href is None:
+            return
+        link = self.page.resolve(href)
+        origin = (self.page.scheme, self.page.host, self.page.port)
+        if (link.scheme, link.host, link.port) == origin:
+            self.submitted = True
+            _ = Browser.preconnector.submit(
+                self.connection.preconnect, [link]
+            )
+
 def build_emoji_map() -> dict[str, str]:
     """
     Build a mapping from emoji characters to their corresponding 
@@ -107,6 +136,11 @@ class Browser:
 
     SCROLL_DOWN: ClassVar[int] = 100
 
+    # Runs the preconnects of every page load, one at a time
+    preconnector: ClassVar[ThreadPoolExecutor] = ThreadPoolExecutor(
+        max_workers=1
+    )
+
     content: str = ""
     display_list: list[DrawCommand] = []
 
@@ -128,6 +162,11 @@ class Browser:
         center_align: bool = False
     ):
         self.window = tkinter.Tk()
+        # The canvas draws with Tk fonts, whatever the default backend
+        set_font_backend(TkFontBackend(root=self.window))
+        # Skip measuring every font afresh on each start
+        if font_measurer.disk_cache is None:
+            font_measurer.disk_cache = FontMetricsDiskCache()
         self.canvas = tkinter.Canvas(
             self.window, 
             background="white",
@@ -171,6 +210,7 @@ class Browser:
             vstep = self.vstep,
             is_ltr = self.is_ltr,
             node = nodes,
+            verbose = False,
         )
         self.document.layout()
 
@@ -290,20 +330,30 @@ class Browser:
         print(f"Draw time: {end_time - time_start:.4f} seconds")
 
 
-    def load(self, url: URL):
-        body = ""
+    @classmethod
+    def fetch(
+        cls,
+        url: URL,
+        view_source: bool = False
+    ) -> tuple[str, Element]:
+        """Source and document tree of url, parsed as the body arrives."""
+        parser = HTMLViewSourceParser() if view_source else HTMLParser()
+
+        chunks: list[str] = []
+        connection = Connection(http_options={'http_version': '1.1'})
+        if url.scheme in ("http", "https"):
+            # Warm up a socket for the same-origin page the user is likely
+            # to open next, without waiting for the rest of this one
+            parser.on_element = LinkPreconnector(url, connection)
         if url.scheme != 'about':
-            connection = Connection(http_options={'http_version': '1.1'})
-            body = connection.request(url=url)
-        else:
-            body = ""
-        self.content = body
+            for chunk in connection.stream(url=url):
+                chunks.append(chunk)
+                parser.feed(chunk)
+        return "".join(chunks), parser.close()
+
+    def load(self, url: URL):
         self.view_source = url.view_source
-        
-        if self.view_source:
-            nodes = HTMLViewSourceParser(self.content).parse()
-        else:
-            nodes = HTMLParser(self.content).parse()
+        self.content, nodes = self.fetch(url, self.view_source)
 
         self.document = DocumentLayout(
             width = self.width,
@@ -312,6 +362,7 @@ class Browser:
             vstep = self.vstep,
             is_ltr = self.is_ltr,
             node = nodes,
+            verbose = False,
         )
         self.document.layout()
 
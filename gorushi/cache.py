@@ -0,0 +1,468 @@
+from collections import OrderedDict
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import NamedTuple, cast
+
+from gorushi.url import URL
+
+
+DEFAULT_DISK_CACHE_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "gorushi"
+)
+
+DEFAULT_DISK_CACHE_SIZE = 64 * 1024 * 1024
+
+DEFAULT_MEMORY_CACHE_SIZE = 32 * 1024 * 1024
+
+DEFAULT_REDIRECT_CACHE_ENTRIES = 1024
+
+
+def write_atomic(path: str, data: bytes, tmp_dir: str) -> None:
+    """
+    Write data to a temporary file in tmp_dir, on the same filesystem as
+    path, and rename it over path, so that readers in other processes
+    see either the old file or the complete new one.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            _ = f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class BrowserCacheKey(NamedTuple):
+    url: str
+
+
+class BrowserCacheEntry(NamedTuple):
+    content: str
+    max_age: int
+    timestamp: datetime | None = None
+
+    # Validators used to revalidate the entry once it goes stale
+    etag: str | None = None
+    last_modified: str | None = None
+
+    @property
+    def has_validators(self) -> bool:
+        return self.etag is not None or self.last_modified is not None
+
+    def is_fresh(self, now: datetime) -> bool:
+        age = (now - self.timestamp).total_seconds() if self.timestamp else 0
+        return age < self.max_age
+
+    @property
+    def expires_at(self) -> float:
+        if self.timestamp is None:
+            return float("inf") if self.max_age > 0 else float("-inf")
+        return self.timestamp.timestamp() + self.max_age
+
+    @property
+    def size(self) -> int:
+        return sys.getsizeof(self.content)
+
+
+class RedirectCacheEntry(NamedTuple):
+    location: URL
+    status: str
+
+    # None for a permanent redirect without an explicit lifetime
+    max_age: int | None = None
+    timestamp: datetime | None = None
+
+    def is_fresh(self, now: datetime) -> bool:
+        if self.max_age is None:
+            return True
+        age = (now - self.timestamp).total_seconds() if self.timestamp else 0
+        return age < self.max_age
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    bytes_held: int = 0
+
+
+@dataclass
+class MemoryCache:
+    """
+    In-process LRU cache of responses bounded by max_size bytes.
+
+    Entries are kept in recency order, the least recently used ones are
+    evicted once bytes_held exceeds the budget, and expired entries are
+    dropped proactively on every lookup and store through a heap ordered
+    by expiry time. Expired entries that carry validators are kept (until
+    evicted) so they can be revalidated instead of refetched.
+
+    Supports the dict operations Connection used on the plain dict it
+    replaces; only lookup() counts towards hits and misses.
+    """
+    max_size: int = DEFAULT_MEMORY_CACHE_SIZE
+    entries: OrderedDict[BrowserCacheKey, BrowserCacheEntry] = field(
+        default_factory=OrderedDict
+    )
+    stats: CacheStats = field(default_factory=CacheStats)
+    expiry_heap: list[tuple[float, int, BrowserCacheKey]] = field(
+        default_factory=list
+    )
+    _sequence: int = 0
+
+    def __contains__(self, key: BrowserCacheKey) -> bool:
+        return key in self.entries
+
+    def __getitem__(self, key: BrowserCacheKey) -> BrowserCacheEntry:
+        return self.entries[key]
+
+    def __setitem__(
+        self,
+        key: BrowserCacheKey,
+        entry: BrowserCacheEntry
+    ) -> None:
+        self.store(key, entry)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: BrowserCacheKey) -> BrowserCacheEntry | None:
+        return self.entries.get(key)
+
+    def pop(
+        self,
+        key: BrowserCacheKey,
+        default: BrowserCacheEntry | None = None
+    ) -> BrowserCacheEntry | None:
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return default
+        self.stats.bytes_held -= entry.size
+        return entry
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.expiry_heap.clear()
+        self.stats.bytes_held = 0
+
+    def lookup(
+        self,
+        key: BrowserCacheKey,
+        now: datetime
+    ) -> BrowserCacheEntry | None:
+        """Return the fresh entry for key, counting a hit or a miss."""
+        self.purge_expired(now)
+        entry = self.entries.get(key)
+        if entry is None or not entry.is_fresh(now):
+            self.stats.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.stats.hits += 1
+        return entry
+
+    def store(self, key: BrowserCacheKey, entry: BrowserCacheEntry) -> None:
+        _ = self.pop(key)
+        if entry.size > self.max_size:
+            return
+
+        self.entries[key] = entry
+        self.stats.bytes_held += entry.size
+        self._sequence += 1
+        heapq.heappush(
+            self.expiry_heap, (entry.expires_at, self._sequence, key)
+        )
+        if len(self.expiry_heap) > 2 * len(self.entries) + 64:
+            self._compact_expiry_heap()
+
+        self.purge_expired(datetime.now())
+        while self.stats.bytes_held > self.max_size:
+            _, evicted = self.entries.popitem(last=False)
+            self.stats.bytes_held -= evicted.size
+            self.stats.evictions += 1
+
+    def _compact_expiry_heap(self) -> None:
+        self.expiry_heap = [
+            (entry.expires_at, sequence, key)
+            for sequence, (key, entry) in enumerate(self.entries.items())
+        ]
+        heapq.heapify(self.expiry_heap)
+        self._sequence = len(self.expiry_heap)
+
+    def purge_expired(self, now: datetime) -> None:
+        deadline = now.timestamp()
+        while self.expiry_heap and self.expiry_heap[0][0] <= deadline:
+            expires_at, _, key = heapq.heappop(self.expiry_heap)
+            entry = self.entries.get(key)
+            # Skip heap records left behind by a replaced or evicted entry
+            if entry is None or entry.expires_at != expires_at:
+                continue
+            if entry.has_validators:
+                continue
+            _ = self.pop(key)
+            self.stats.expirations += 1
+
+
+@dataclass
+class RedirectStats:
+    hits: int = 0
+    hops_skipped: int = 0
+
+
+@dataclass
+class RedirectCache:
+    """
+    Remembered redirects: 301/308 responses, and 302/307 responses that
+    carry an explicit max-age. Kept in memory only, in LRU order, at most
+    max_entries of them.
+    """
+    max_entries: int = DEFAULT_REDIRECT_CACHE_ENTRIES
+    entries: OrderedDict[BrowserCacheKey, RedirectCacheEntry] = field(
+        default_factory=OrderedDict
+    )
+    stats: RedirectStats = field(default_factory=RedirectStats)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(
+        self,
+        key: BrowserCacheKey,
+        now: datetime
+    ) -> RedirectCacheEntry | None:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if not entry.is_fresh(now):
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def store(self, key: BrowserCacheKey, entry: RedirectCacheEntry) -> None:
+        _ = self.entries.pop(key, None)
+        self.entries[key] = entry
+        while len(self.entries) > self.max_entries:
+            _ = self.entries.popitem(last=False)
+
+    def pop(self, key: BrowserCacheKey) -> None:
+        _ = self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.stats = RedirectStats()
+
+
+@dataclass
+class DiskCache:
+    """
+    Persistent HTTP cache tier shared by every browser process using the
+    same directory.
+
+    Bodies are content-addressed: they live in objects/<sha256 of body>,
+    so identical responses are stored once. Each URL has a small JSON
+    record in index/<sha256 of url> pointing at its body; its mtime is
+    bumped on every hit and drives LRU eviction once the objects exceed
+    max_size bytes. The bytes held are tracked as a running total, so
+    the directory is only rescanned once a write takes it over budget.
+
+    Every file is written with write_atomic, so readers in other
+    processes only ever see complete files. A record or body that
+    disappears mid-read is treated as a miss.
+    """
+    directory: str = DEFAULT_DISK_CACHE_DIR
+    max_size: int = DEFAULT_DISK_CACHE_SIZE
+
+    # None until the first write scans the objects directory
+    _bytes_held: int | None = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        for name in ("index", "objects", "tmp"):
+            os.makedirs(os.path.join(self.directory, name), exist_ok=True)
+
+    def _index_path(self, key: BrowserCacheKey) -> str:
+        digest = hashlib.sha256(key.url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, "index", digest)
+
+    @property
+    def _tmp_dir(self) -> str:
+        return os.path.join(self.directory, "tmp")
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "objects", digest)
+
+    def _read_record(self, path: str) -> dict[str, str | int | None] | None:
+        try:
+            with open(path, "rb") as f:
+                return cast(
+                    dict[str, str | int | None], json.loads(f.read())
+                )
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _read_object(self, digest: str) -> str | None:
+        try:
+            with open(self._object_path(digest), "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return ""
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    return str(m, "utf-8")
+        except FileNotFoundError:
+            return None
+
+    def get(
+        self,
+        key: BrowserCacheKey,
+        fresh: bool = False
+    ) -> BrowserCacheEntry | None:
+        """
+        Return the entry for key, or None on a miss. Stale entries are
+        only returned when they carry validators to revalidate them with,
+        and never with fresh=True. The body is only read once the record
+        shows the entry will be returned.
+        """
+        path = self._index_path(key)
+        record = self._read_record(path)
+        if record is None or record.get("url") != key.url:
+            return None
+
+        timestamp = record.get("timestamp")
+        etag = record.get("etag")
+        last_modified = record.get("last_modified")
+        entry = BrowserCacheEntry(
+            content="",
+            max_age=int(record.get("max_age") or 0),
+            timestamp=(
+                datetime.fromisoformat(timestamp)
+                if isinstance(timestamp, str) else None
+            ),
+            etag=etag if isinstance(etag, str) else None,
+            last_modified=(
+                last_modified if isinstance(last_modified, str) else None
+            ),
+        )
+        if not entry.is_fresh(datetime.now()):
+            if not entry.has_validators:
+                self.pop(key)
+                return None
+            if fresh:
+                return None
+
+        content = self._read_object(str(record.get("digest")))
+        if content is None:
+            return None
+
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return entry._replace(content=content)
+
+    def put(self, key: BrowserCacheKey, entry: BrowserCacheEntry) -> None:
+        body = entry.content.encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()
+        if not os.path.exists(self._object_path(digest)):
+            write_atomic(self._object_path(digest), body, self._tmp_dir)
+            if self._bytes_held is not None:
+                self._bytes_held += len(body)
+
+        record = {
+            "url": key.url,
+            "digest": digest,
+            "max_age": entry.max_age,
+            "timestamp": (
+                entry.timestamp.isoformat() if entry.timestamp else None
+            ),
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+        }
+        write_atomic(
+            self._index_path(key),
+            json.dumps(record).encode("utf-8"),
+            self._tmp_dir
+        )
+        if self._bytes_held is None or self._bytes_held > self.max_size:
+            self.evict()
+
+    def pop(self, key: BrowserCacheKey) -> None:
+        self._unlink(self._index_path(key))
+
+    def _object_sizes(self) -> dict[str, int]:
+        sizes: dict[str, int] = {}
+        with os.scandir(os.path.join(self.directory, "objects")) as entries:
+            for entry in entries:
+                try:
+                    sizes[entry.name] = entry.stat().st_size
+                except FileNotFoundError:
+                    pass
+        return sizes
+
+    def size(self) -> int:
+        """Total bytes held by cached bodies."""
+        return sum(self._object_sizes().values())
+
+    def evict(self) -> None:
+        """Drop least recently used records until within max_size."""
+        sizes = self._object_sizes()
+        total = sum(sizes.values())
+        self._bytes_held = total
+        if total <= self.max_size:
+            return
+
+        records: list[tuple[float, str, str]] = []
+        with os.scandir(os.path.join(self.directory, "index")) as entries:
+            for entry in entries:
+                record = self._read_record(entry.path)
+                if record is None:
+                    continue
+                try:
+                    mtime = entry.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                records.append((mtime, entry.path, str(record.get("digest"))))
+        records.sort()
+
+        references: dict[str, int] = {}
+        for _, _, digest in records:
+            references[digest] = references.get(digest, 0) + 1
+
+        # Bodies no record points at anymore go first
+        for digest, size in sizes.items():
+            if digest not in references:
+                self._unlink(self._object_path(digest))
+                total -= size
+
+        for _, path, digest in records:
+            if total <= self.max_size:
+                break
+            self._unlink(path)
+            references[digest] -= 1
+            if references[digest] == 0:
+                self._unlink(self._object_path(digest))
+                total -= sizes.get(digest, 0)
+        self._bytes_held = total
+
+    def _unlink(self, path: str) -> None:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        for name in ("index", "objects"):
+            with os.scandir(os.path.join(self.directory, name)) as entries:
+                for entry in entries:
+                    self._unlink(entry.path)
+        self._bytes_held = 0
@@ -0,0 +1,120 @@
+import codecs
+from dataclasses import dataclass, field
+import re
+
+
+DEFAULT_CHARSET = "utf-8"
+
+# How much of the body is searched for a <meta> charset declaration
+SNIFF_SIZE = 1024
+
+# Labels browsers decode differently from what Python's codec of the same
+# name does (https://encoding.spec.whatwg.org/#names-and-labels)
+CHARSET_ALIASES = {
+    "ascii": "cp1252",
+    "us-ascii": "cp1252",
+    "iso-8859-1": "cp1252",
+    "iso8859-1": "cp1252",
+    "latin1": "cp1252",
+    "latin-1": "cp1252",
+    "l1": "cp1252",
+}
+
+BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+CONTENT_TYPE_CHARSET = re.compile(
+    r"""charset\s*=\s*["']?([\w.:-]+)""",
+    re.IGNORECASE,
+)
+
+# <meta charset="..."> or
+# <meta http-equiv="Content-Type" content="...; charset=...">
+META_CHARSET = re.compile(
+    rb"""<meta\s[^>]*?charset\s*=\s*["']?\s*([\w.:-]+)""",
+    re.IGNORECASE,
+)
+
+
+def normalize_charset(label: str) -> str | None:
+    """Return the Python codec name for a charset label, None if unknown."""
+    label = label.strip().lower()
+    label = CHARSET_ALIASES.get(label, label)
+    try:
+        return codecs.lookup(label).name
+    except LookupError:
+        return None
+
+
+def charset_from_content_type(content_type: str | None) -> str | None:
+    if content_type is None:
+        return None
+    match = CONTENT_TYPE_CHARSET.search(content_type)
+    return normalize_charset(match.group(1)) if match else None
+
+
+def sniff_meta_charset(data: bytes) -> str | None:
+    match = META_CHARSET.search(data[:SNIFF_SIZE])
+    if match is None:
+        return None
+    charset = normalize_charset(match.group(1).decode("ascii", "replace"))
+    # A document that decodes as UTF-16 could not have declared it in ASCII
+    if charset is not None and charset.startswith("utf-16"):
+        return DEFAULT_CHARSET
+    return charset
+
+
+@dataclass
+class CharsetDecoder:
+    """
+    Incremental decoder picking the charset the way browsers do: a byte
+    order mark, then the Content-Type charset, then a <meta> declaration
+    within the first SNIFF_SIZE bytes, then UTF-8.
+
+    Input is held back until SNIFF_SIZE bytes have arrived (or the stream
+    ends) when the charset has to be sniffed. Undecodable bytes are
+    replaced rather than raising.
+    """
+    content_type: str | None = None
+    charset: str | None = None
+
+    pending: list[bytes] = field(default_factory=list)
+    pending_size: int = 0
+    decoder: codecs.IncrementalDecoder | None = None
+
+    def _start(self, head: bytes) -> None:
+        for bom, charset in BOMS:
+            if head.startswith(bom):
+                self.charset = charset
+                break
+        else:
+            self.charset = (
+                charset_from_content_type(self.content_type)
+                or sniff_meta_charset(head)
+                or DEFAULT_CHARSET
+            )
+        self.decoder = codecs.getincrementaldecoder(self.charset)(
+            errors="replace"
+        )
+
+    def decode(self, data: bytes, final: bool = False) -> str:
+        if self.decoder is None:
+            self.pending.append(data)
+            self.pending_size += len(data)
+            # Without a Content-Type charset the <meta> sniff needs the
+            # first SNIFF_SIZE bytes; otherwise only a BOM is looked for
+            if charset_from_content_type(self.content_type):
+                needed = 3
+            else:
+                needed = SNIFF_SIZE
+            if self.pending_size < needed and not final:
+                return ""
+            data = b"".join(self.pending)
+            self.pending.clear()
+            self._start(data)
+
+        assert self.decoder is not None
+        return self.decoder.decode(data, final)
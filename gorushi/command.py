@@ -1,8 +1,11 @@
 from dataclasses import dataclass
-from tkinter import Canvas
-import tkinter
-from tkinter.font import Font
-from typing import override
+from typing import TYPE_CHECKING, override
+
+from gorushi.fonts import Font
+
+if TYPE_CHECKING:
+    from tkinter import Canvas
+    import tkinter
 
 
 @dataclass
@@ -12,7 +15,7 @@ class DrawCommand:
     bottom: float = 0.0
     right: float = 0.0
 
-    def execute(self, _scroll: float, _canvas: Canvas) -> None:
+    def execute(self, _scroll: float, _canvas: "Canvas") -> None:
         raise NotImplementedError()
 
 
@@ -22,22 +25,23 @@ class DrawText(DrawCommand):
     font: Font | None = None
 
     @override
-    def execute(self, scroll: float, canvas: Canvas) -> None:
+    def execute(self, scroll: float, canvas: "Canvas") -> None:
         assert self.font is not None
         _ = canvas.create_text(
             self.left,
             self.top - scroll,
             text=self.text,
-            font=self.font,
+            # Tk looks fonts up by name, which is what str() of a Tk font is
+            font=str(self.font),
             anchor="nw"
         )
 
 @dataclass 
 class DrawEmoji(DrawCommand):
-    image: tkinter.PhotoImage | None = None
+    image: "tkinter.PhotoImage | None" = None
 
     @override
-    def execute(self, scroll: float, canvas: Canvas) -> None:
+    def execute(self, scroll: float, canvas: "Canvas") -> None:
         _ = canvas.create_image(
             self.left,
             self.top - scroll,
@@ -49,7 +53,8 @@ class DrawEmoji(DrawCommand):
 class DrawRect(DrawCommand):
     color: str = "black"
 
-    def execute(self, scroll: float, canvas: Canvas) -> None:
+    @override
+    def execute(self, scroll: float, canvas: "Canvas") -> None:
         color, stipple = self.color.split('_') if '_' in self.color else (self.color, None)
         _ = canvas.create_rectangle(
             self.left,
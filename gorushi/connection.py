@@ -1,29 +1,68 @@
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from io import BufferedReader
-from socket import socket as Socket, AF_INET, SOCK_STREAM, IPPROTO_TCP
+from socket import socket as Socket
 import ssl
 from typing import ClassVar, Literal, NamedTuple, TypedDict
-
+import zlib
+
+from gorushi.cache import (
+    BrowserCacheEntry, BrowserCacheKey, CacheStats, DiskCache, MemoryCache,
+    RedirectCache, RedirectCacheEntry
+)
+from gorushi.charset import CharsetDecoder
+from gorushi.connection_pool import (
+    ConnectionPool, ConnectionPoolCacheKey, PooledSocket
+)
+from gorushi.resolver import Resolver
+from gorushi.tls import TLSConfig, TLSContextCache
 from gorushi.url import URL
 
 
-class HttpOptions(TypedDict):
-    http_version: Literal["1.0", "1.1"] | None
+# zlib window bits for every Content-Encoding _decode_content can undo
+CONTENT_ENCODING_WBITS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'x-gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS,
+}
 
+ACCEPT_ENCODING = "gzip, deflate"
 
-class ConnectionPoolCacheKey(NamedTuple):
-    host: str 
-    port: int
+# Redirects remembered by the redirect cache, the temporary ones only
+# when they carry a max-age
+PERMANENT_REDIRECTS = ("301", "308")
+TEMPORARY_REDIRECTS = ("302", "307")
 
 
-class BrowserCacheKey(NamedTuple):
-    url: str
+class HttpOptions(TypedDict):
+    http_version: Literal["1.0", "1.1"] | None
 
 
-class BrowserCacheEntry(NamedTuple):
-    content: str
-    max_age: int
-    timestamp: datetime | None = None
+class CacheControl(NamedTuple):
+    max_age: int | None = None
+    no_store: bool = False
+
+    @classmethod
+    def parse(cls, response_headers: dict[str, str]) -> "CacheControl":
+        max_age: int | None = None
+        no_store = False
+        if 'cache-control' in response_headers:
+            directives = [
+                d.strip() for d in response_headers['cache-control'].split(",")
+            ]
+            no_store = "no-store" in directives
+            for directive in directives:
+                if directive.startswith("max-age="):
+                    max_age = int(directive[len("max-age="):])
+        return cls(max_age=max_age, no_store=no_store)
+
+    def is_cacheable(self, response_headers: dict[str, str]) -> bool:
+        return not self.no_store and (
+            self.max_age is not None
+            or 'etag' in response_headers
+            or 'last-modified' in response_headers
+        )
 
 
 class Connection:
@@ -36,180 +75,637 @@ class Connection:
     # See chromiums's implmentation: https://chromium.googlesource.com/chromium/src/+/refs/heads/main/net/url_request
     MAX_REDIRECTS = 20
 
-    connection_pool: ClassVar[dict[ConnectionPoolCacheKey, Socket]] = {}
-    browser_cache: ClassVar[dict[BrowserCacheKey, BrowserCacheEntry]] = {}
+    # Block size used when streaming a response body off the socket
+    STREAM_CHUNK_SIZE: ClassVar[int] = 64 * 1024
 
-    socket: Socket | None
+    # Most origins a single preconnect() call opens sockets for
+    MAX_PRECONNECTS: ClassVar[int] = 8
+
+    connection_pool: ClassVar[ConnectionPool] = ConnectionPool()
+    browser_cache: ClassVar[MemoryCache] = MemoryCache()
+    redirect_cache: ClassVar[RedirectCache] = RedirectCache()
+    resolver: ClassVar[Resolver] = Resolver()
+    tls: ClassVar[TLSContextCache] = TLSContextCache()
+    tls_config: ClassVar[TLSConfig] = TLSConfig()
+
+    # Optional persistent tier consulted when browser_cache misses
+    disk_cache: ClassVar[DiskCache | None] = None
+
+    pooled_socket: PooledSocket | None
     http_options: HttpOptions
 
     def __init__(self, http_options: HttpOptions | None = None):
-        self.socket = None 
+        self.pooled_socket = None 
         self.http_options = http_options or { "http_version": "1.0" }
 
-    def _read_chunked_body(self, response: BufferedReader) -> bytes:
-        body = b""
+    @classmethod
+    def cache_stats(cls) -> CacheStats:
+        """Hit, miss, eviction and size counters of the in-memory cache."""
+        return cls.browser_cache.stats
+
+    def _parse_chunk_size(self, line: bytes) -> int:
+        if not line:
+            raise ConnectionError("Connection closed inside a chunked body")
+        # Chunk extensions (";name=value") carry nothing we use
+        return int(line.split(b";", 1)[0].strip(), 16)
+
+    def _iter_chunked_body(
+        self,
+        response: BufferedReader,
+        trailers: dict[str, str] | None = None
+    ) -> Iterator[bytes]:
+        """
+        Yield the chunks of a chunked body as they arrive, without joining
+        them. Trailer fields are collected into trailers when given.
+        """
         while True:
-            chunk_size_line = response.readline()
-            chunk_size_str = chunk_size_line.split(b"\r\n")[0]
-            chunk_size = int(chunk_size_str, 16)
+            chunk_size = self._parse_chunk_size(response.readline())
             if chunk_size == 0:
                 break
             chunk_data = response.read(chunk_size)
-            body += chunk_data
+            if len(chunk_data) < chunk_size:
+                raise ConnectionError(
+                    "Connection closed inside a chunked body"
+                )
+            yield chunk_data
             response.read(2)  # Read the trailing CRLF
 
-        return body
+        # Consume the (usually empty) trailer section so the next response
+        # on a kept-alive socket starts at its status line
+        while (line := response.readline()) not in (b"\r\n", b""):
+            if trailers is not None:
+                _ = self._parse_header_line(line, trailers)
+
+    def _read_chunked_body(
+        self,
+        response: BufferedReader,
+        trailers: dict[str, str] | None = None
+    ) -> bytes:
+        # Joined once at the end: growing a bytes object chunk by chunk
+        # copies the whole body every time
+        return b"".join(self._iter_chunked_body(response, trailers))
+
+    def _iter_framed_body(
+        self,
+        response: BufferedReader,
+        response_headers: dict[str, str]
+    ) -> Iterator[bytes]:
+        """Yield the body as sent, before any content decoding."""
+        if 'content-length' in response_headers:
+            remaining = int(response_headers['content-length'])
+            while remaining > 0:
+                data = response.read(min(remaining, self.STREAM_CHUNK_SIZE))
+                if not data:
+                    break
+                remaining -= len(data)
+                yield data
+        elif (
+            'transfer-encoding' in response_headers
+            and response_headers['transfer-encoding'].lower() == 'chunked'
+        ):
+            yield from self._iter_chunked_body(response)
+        else:
+            while data := response.read1(self.STREAM_CHUNK_SIZE):
+                yield data
+
+    def _decode_content(
+        self,
+        chunks: Iterable[bytes],
+        response_headers: dict[str, str]
+    ) -> Iterator[bytes]:
+        """Undo Content-Encoding chunk by chunk as the body arrives."""
+        content_encoding = response_headers.get(
+            'content-encoding', 'identity'
+        ).strip().lower()
+        if content_encoding == 'identity':
+            yield from chunks
+            return
+        if content_encoding not in CONTENT_ENCODING_WBITS:
+            raise ValueError(
+                f"Unsupported content encoding: {content_encoding}"
+            )
+
+        decompressor = zlib.decompressobj(
+            CONTENT_ENCODING_WBITS[content_encoding]
+        )
+        started = False
+        for chunk_data in chunks:
+            try:
+                data = decompressor.decompress(chunk_data)
+            except zlib.error:
+                # Some servers send "deflate" without the zlib wrapper,
+                # which shows in the very first bytes
+                if content_encoding != 'deflate' or started:
+                    raise
+                decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+                data = decompressor.decompress(chunk_data)
+            started = started or bool(chunk_data)
+            if data:
+                yield data
+        data = decompressor.flush()
+        if data:
+            yield data
+
+    def _iter_body(
+        self,
+        response: BufferedReader,
+        response_headers: dict[str, str]
+    ) -> Iterator[bytes]:
+        """Yield the decoded response body in blocks as it arrives."""
+        yield from self._decode_content(
+            self._iter_framed_body(response, response_headers),
+            response_headers
+        )
 
     def _request_data(self, url: URL) -> str:
         return url.content or ""
 
     def _request_file(self, url: URL) -> str:
-        with open(url.path, "r") as f:
-            return f.read()
+        return "".join(self._stream_file(url))
+
+    def _stream_file(self, url: URL) -> Iterator[str]:
+        decoder = CharsetDecoder()
+        with open(url.path, "rb") as f:
+            while data := f.read(self.STREAM_CHUNK_SIZE):
+                if text := decoder.decode(data):
+                    yield text
+        if text := decoder.decode(b"", final=True):
+            yield text
 
     def _request_http(self, url: URL, http_options: HttpOptions) -> str:
-        now = datetime.now()
+        return "".join(self._stream_http(url, http_options))
+
+    def _cached_entry(
+        self,
+        url: URL,
+        now: datetime
+    ) -> BrowserCacheEntry | None:
+        """Return a fresh cached entry for url from memory or disk."""
         browser_cache_key = BrowserCacheKey(url=str(url))
 
-        # flush cache if expired
-        if browser_cache_key in Connection.browser_cache:
-            cached_content = Connection.browser_cache[browser_cache_key]
-            age = (now - cached_content.timestamp).total_seconds() if cached_content.timestamp else 0
-            if age >= cached_content.max_age:
-                Connection.browser_cache.pop(browser_cache_key, None)
-            else:
-                return cached_content.content
+        # expired entries are flushed by the lookup
+        cached_content = Connection.browser_cache.lookup(
+            browser_cache_key, now
+        )
+        if cached_content is not None:
+            return cached_content
+
+        # A stale disk entry is left for _stale_entry to read
+        if Connection.disk_cache is not None:
+            cached_content = Connection.disk_cache.get(
+                browser_cache_key, fresh=True
+            )
+            if cached_content is not None:
+                Connection.browser_cache[browser_cache_key] = cached_content
+                return cached_content
+
+        return None
+
+    def _build_request(
+        self,
+        url: URL,
+        http_options: HttpOptions,
+        stale_content: BrowserCacheEntry | None
+    ) -> bytes:
+        request = f"GET {url.path} HTTP/{http_options['http_version']}\r\n"
+        request += f"Host: {url.host}\r\n"
+
+        if http_options['http_version'] == "1.1":
+            request += "Connection: keep-alive\r\n"
+        elif http_options['http_version'] == "1.0":
+            request += "Connection: close\r\n"
+        request += "User-Agent: kokokokojima/1.0\r\n"
+        request += f"Accept-Encoding: {ACCEPT_ENCODING}\r\n"
+        if stale_content is not None:
+            if stale_content.etag is not None:
+                request += f"If-None-Match: {stale_content.etag}\r\n"
+            if stale_content.last_modified is not None:
+                request += (
+                    f"If-Modified-Since: {stale_content.last_modified}\r\n"
+                )
+        request += "\r\n"
+
+        return request.encode("utf-8")
+
+    def _parse_status_line(self, line: bytes) -> str:
+        statusline = line.decode("utf-8")
+        _, status, _ = statusline.split(" ", 2)
+        return status
+
+    def _parse_header_line(
+        self,
+        line: bytes,
+        response_headers: dict[str, str]
+    ) -> bool:
+        """Add one header line to response_headers. False at the blank line."""
+        decoded = line.decode("utf-8")
+        if decoded == "\r\n": 
+            return False
+        header, value = decoded.split(":", 1)
+        response_headers[header.casefold()] = value.strip()
+        return True
+
+    def _redirect_url(
+        self,
+        url: URL,
+        status: str,
+        response_headers: dict[str, str]
+    ) -> URL | None:
+        if not (status.startswith("3") and 'location' in response_headers):
+            return None
+        if response_headers['location'].startswith("http://") or response_headers['location'].startswith("https://"):
+            # absolute redirect
+            return URL.parse(response_headers['location'])
+        # relative redirect
+        return URL.parse(
+            url.scheme + "://" + url.host + f":{url.port}"
+            + response_headers['location']
+        )
+
+    def _follow_cached_redirects(self, url: URL) -> tuple[URL, int]:
+        """
+        Jump along remembered redirects starting at url. Returns where they
+        lead and the number of hops skipped.
+        """
+        now = datetime.now()
+        hops = 0
+        while hops <= self.MAX_REDIRECTS:
+            entry = Connection.redirect_cache.lookup(
+                BrowserCacheKey(url=str(url)), now
+            )
+            if entry is None:
+                break
+            url = entry.location
+            hops += 1
+
+        if hops:
+            Connection.redirect_cache.stats.hits += 1
+            Connection.redirect_cache.stats.hops_skipped += hops
+        return url, hops
+
+    def _remember_redirect(
+        self,
+        url: URL,
+        status: str,
+        response_headers: dict[str, str],
+        redirect_url: URL
+    ) -> None:
+        cache_control = CacheControl.parse(response_headers)
+        key = BrowserCacheKey(url=str(url))
+        if cache_control.no_store or not (
+            status in PERMANENT_REDIRECTS
+            or (
+                status in TEMPORARY_REDIRECTS
+                and cache_control.max_age is not None
+            )
+        ):
+            Connection.redirect_cache.pop(key)
+            return
+
+        Connection.redirect_cache.store(key, RedirectCacheEntry(
+            location=redirect_url,
+            status=status,
+            max_age=cache_control.max_age,
+            timestamp=datetime.now(),
+        ))
+
+    def _stream_http(
+        self,
+        url: URL,
+        http_options: HttpOptions
+    ) -> Iterator[str]:
+        url, redirect_count = self._follow_cached_redirects(url)
+        cached_content = self._cached_entry(url, datetime.now())
+        if cached_content is not None:
+            yield cached_content.content
+            return
 
         if http_options['http_version'] not in ("1.0", "1.1"):
             raise ValueError("Unsupported HTTP version")
 
-        if http_options['http_version'] == '1.1': 
-            key = ConnectionPoolCacheKey(host=url.host, port=url.port)
-            if key in Connection.connection_pool:
-                self.socket = Connection.connection_pool[key]
-        
-        response_headers = {}
-        redirect_count = 0
-
-        while True:
-            if redirect_count > self.MAX_REDIRECTS:
-                raise RuntimeError("Maximum redirect limit reached")
-
-            if self.socket is None:
-                self.socket = Socket(
-                    family=AF_INET,
-                    type=SOCK_STREAM,
-                    proto=IPPROTO_TCP
-                )
+        try:
 
-                self.socket.connect((url.host, url.port))
-                if url.scheme == "https":
-                    ctx = ssl.create_default_context()
-                    self.socket = ctx.wrap_socket(self.socket, server_hostname=url.host)
-
-            if http_options['http_version'] == "1.1":
-                key = ConnectionPoolCacheKey(host=url.host, port=url.port)
-                if key not in Connection.connection_pool:
-                    Connection.connection_pool[key] = self.socket
+            while True:
+                if redirect_count > self.MAX_REDIRECTS:
+                    raise RuntimeError("Maximum redirect limit reached")
 
-            request = f"GET {url.path} HTTP/{http_options['http_version']}\r\n"
-            request += f"Host: {url.host}\r\n"
+                stale_content = self._stale_entry(
+                    BrowserCacheKey(url=str(url))
+                )
+                request = self._build_request(url, http_options, stale_content)
+                status, response, response_headers = self._send_request(
+                    url, http_options, request
+                )
 
-            if http_options['http_version'] == "1.1":
-                request += "Connection: keep-alive\r\n"
-            elif http_options['http_version'] == "1.0":
-                request += "Connection: close\r\n"
-            request += "User-Agent: kokokokojima/1.0\r\n"
-            request += "Accept-Encoding: *\r\n"
-            request += "\r\n"
+                redirect_url = self._redirect_url(
+                    url, status, response_headers
+                )
+                if redirect_url is not None:
+                    self._remember_redirect(
+                        url, status, response_headers, redirect_url
+                    )
+
+                    # Drain the redirect body so the socket goes back to the
+                    # pool, where a same-origin next hop picks it up again
+                    if self._is_framed(response_headers):
+                        for _ in self._iter_framed_body(
+                            response, response_headers
+                        ):
+                            pass
+                        self._release_socket(http_options, response_headers)
+                    else:
+                        self._checkin(reusable=False)
 
-            self.socket.send(request.encode("utf-8"))
+                    url = redirect_url
+                    redirect_count += 1
+                    continue 
 
-            response = self.socket.makefile("rb", encoding="utf-8", newline="\r\n")
-            statusline = response.readline().decode("utf-8")
-            version, status, explanation = statusline.split(" ", 2)
+                break
 
+            yield from self._stream_response(
+                url, status, response, response_headers, stale_content
+            )
+            self._release_socket(http_options, response_headers)
+        finally:
+            # Abandoned or failed mid-response, so the socket state is unknown
+            if self.pooled_socket is not None:
+                self._checkin(reusable=False)
+
+    def _stream_response(
+        self,
+        url: URL,
+        status: str,
+        response: BufferedReader,
+        response_headers: dict[str, str],
+        stale_content: BrowserCacheEntry | None
+    ) -> Iterator[str]:
+        """Yield the decoded body of a response and update the caches."""
+        cache_control = CacheControl.parse(response_headers)
+        if status == "304" and stale_content is not None:
+            # Not modified: refresh the stale entry without moving the body
+            yield self._refresh_entry(
+                url, stale_content, cache_control, response_headers
+            ).content
+            return
+
+        # Only keep a copy of the body around when it is going to be cached
+        cached_chunks: list[str] | None = (
+            [] if cache_control.is_cacheable(response_headers) else None
+        )
+
+        decoder = CharsetDecoder(
+            content_type=response_headers.get('content-type')
+        )
+        for data in self._iter_body(response, response_headers):
+            text = decoder.decode(data)
+            if text:
+                if cached_chunks is not None:
+                    cached_chunks.append(text)
+                yield text
+        text = decoder.decode(b"", final=True)
+        if text:
+            if cached_chunks is not None:
+                cached_chunks.append(text)
+            yield text
+
+        self._update_cache(
+            url,
+            cache_control,
+            response_headers,
+            "".join(cached_chunks) if cached_chunks is not None else None
+        )
+
+    def _pipeline_http(
+        self,
+        urls: list[URL],
+        http_options: HttpOptions
+    ) -> list[str | None]:
+        """
+        Write a GET for every url (all on the same origin) back to back on
+        one pooled socket, then read the responses in order. Entries are
+        None for responses that were not read: redirects, and everything
+        after the server closed the connection.
+        """
+        contents: list[str | None] = [None] * len(urls)
+        stale_contents = [
+            self._stale_entry(BrowserCacheKey(url=str(url))) for url in urls
+        ]
+
+        pooled = self._checkout(urls[0], http_options)
+        try:
+            pooled.uses += len(urls)
+            pooled.socket.sendall(b"".join(
+                self._build_request(url, http_options, stale_content)
+                for url, stale_content in zip(urls, stale_contents)
+            ))
+
+            # One reader for the whole batch, since its buffer may already
+            # hold the responses that follow
+            response = pooled.socket.makefile("rb")
             response_headers: dict[str, str] = {}
-            while True:
-                line = response.readline().decode("utf-8")
-                if line == "\r\n": 
+            for index, url in enumerate(urls):
+                statusline = response.readline()
+                if not statusline:
                     break
-                header, value = line.split(":", 1)
-                response_headers[header.casefold()] = value.strip()
-
-            if status.startswith("3") and 'location' in response_headers:
-                if response_headers['location'].startswith("http://") or response_headers['location'].startswith("https://"):
-                    # absolute redirect
-                    url = URL.parse(response_headers['location'])
-                else:
-                    # relative redirect
-                    url = URL.parse(url.scheme + "://" + url.host + f":{url.port}" + response_headers['location'])
-                redirect_count += 1
-
-                # Close the socket for HTTP/1.0 connections on redirect (not persistent)
-                self.socket.close()
-                self.socket = None
-                continue 
-
-            break
-
-        content = ""
-        if 'content-length' in response_headers:
-            content_length = int(response_headers['content-length'])
-            content = response.read(content_length).decode("utf-8")
-        elif 'transfer-encoding' in response_headers and response_headers['transfer-encoding'].lower() == 'chunked':
-            chunked_data = self._read_chunked_body(response)
-            # Handle gzip encoding if present
-            if 'content-encoding' in response_headers and response_headers['content-encoding'].lower() == 'gzip':
-                import gzip
-                decompressed_data = gzip.decompress(chunked_data)
-                content = decompressed_data.decode("utf-8")
-            else:
-                content = chunked_data.decode("utf-8")
-        else:
-            content = response.read().decode("utf-8")
-
-        if (
-            http_options['http_version'] == "1.0" or 
-            ('connection' in response_headers and response_headers['connection'].lower() == 'close')
-        ):
-            self.socket.close()
-            self.socket = None 
-            Connection.connection_pool.pop(ConnectionPoolCacheKey(host=url.host, port=url.port), None)
-
+                status = self._parse_status_line(statusline)
 
-        if 'cache-control' in response_headers:
-            cache_control = response_headers['cache-control']
+                response_headers = {}
+                while self._parse_header_line(
+                    response.readline(), response_headers
+                ):
+                    pass
 
-            directives = [d.strip() for d in cache_control.split(",")]
-            if "no-store" in directives:
-                Connection.browser_cache.pop(BrowserCacheKey(url=str(url)), None)
-                pass
+                redirect_url = self._redirect_url(
+                    url, status, response_headers
+                )
+                if redirect_url is not None:
+                    # Skip the body; the redirect is followed serially
+                    self._remember_redirect(
+                        url, status, response_headers, redirect_url
+                    )
+                    for _ in self._iter_framed_body(
+                        response, response_headers
+                    ):
+                        pass
+                else:
+                    contents[index] = "".join(self._stream_response(
+                        url,
+                        status,
+                        response,
+                        response_headers,
+                        stale_contents[index]
+                    ))
+
+                if (
+                    response_headers.get('connection', '').lower() == 'close'
+                    or not self._is_framed(response_headers)
+                ):
+                    break
             else:
-                for directive in directives:
-                    if not directive.startswith("max-age="):
-                        continue
-
-                    max_age = int(directive[len("max-age="):])
-                    cached_content = Connection.browser_cache.get(BrowserCacheKey(url=str(url)))
-                    if cached_content:
-                        age = (datetime.now() - cached_content.timestamp).total_seconds() if cached_content.timestamp else 0
-                        if age < cached_content.max_age:
-                            content = cached_content.content 
-                        else:
-                            Connection.browser_cache[BrowserCacheKey(url=str(url))] = BrowserCacheEntry(
-                                content=content,
-                                max_age=max_age,
-                                timestamp=datetime.now()
-                            )
-                    else:
-                        Connection.browser_cache[BrowserCacheKey(url=str(url))] = BrowserCacheEntry(
-                            content=content,
-                            max_age=max_age,
-                            timestamp=datetime.now()
-                        )
-
-        return content
+                self._release_socket(http_options, response_headers)
+        except OSError:
+            pass
+        finally:
+            if self.pooled_socket is not None:
+                self._checkin(reusable=False)
+
+        return contents
+
+    def _is_framed(self, response_headers: dict[str, str]) -> bool:
+        """Whether the body length is known without reading until close."""
+        return 'content-length' in response_headers or (
+            response_headers.get('transfer-encoding', '').lower()
+            == 'chunked'
+        )
+
+    def _connect(self, url: URL) -> Socket:
+        sock = Connection.resolver.connect(url.host, url.port)
+        if url.scheme == "https":
+            sock = Connection.tls.wrap_socket(
+                sock, url.host, url.port, Connection.tls_config
+            )
+        return sock
+
+    def _checkout(
+        self,
+        url: URL,
+        http_options: HttpOptions,
+        reuse: bool = True
+    ) -> PooledSocket:
+        self.pooled_socket = Connection.connection_pool.checkout(
+            ConnectionPoolCacheKey(host=url.host, port=url.port),
+            lambda: self._connect(url),
+            reuse=reuse and http_options['http_version'] == "1.1",
+        )
+        return self.pooled_socket
+
+    def _checkin(self, reusable: bool) -> None:
+        if self.pooled_socket is not None:
+            sock, key = self.pooled_socket.socket, self.pooled_socket.key
+            if isinstance(sock, ssl.SSLSocket):
+                Connection.tls.save_session(sock, key.host, key.port)
+            Connection.connection_pool.checkin(
+                self.pooled_socket, reusable=reusable
+            )
+            self.pooled_socket = None
+
+    def _exchange(
+        self,
+        pooled: PooledSocket,
+        request: bytes
+    ) -> tuple[str, BufferedReader, dict[str, str]]:
+        """Send request over pooled, read the response status and headers."""
+        pooled.uses += 1
+        pooled.socket.sendall(request)
+
+        response = pooled.socket.makefile("rb")
+        statusline = response.readline()
+        if not statusline:
+            raise ConnectionError(
+                "Connection closed before a response was received"
+            )
+        status = self._parse_status_line(statusline)
+
+        response_headers: dict[str, str] = {}
+        while self._parse_header_line(response.readline(), response_headers):
+            pass
+
+        return status, response, response_headers
+
+    def _send_request(
+        self,
+        url: URL,
+        http_options: HttpOptions,
+        request: bytes
+    ) -> tuple[str, BufferedReader, dict[str, str]]:
+        """
+        Send request on a pooled socket. A reused keep-alive socket may have
+        been closed by the server in the meantime; that is retried once on a
+        new socket.
+        """
+        pooled = self._checkout(url, http_options)
+        reused = pooled.reused
+        try:
+            return self._exchange(pooled, request)
+        except OSError:
+            if not reused:
+                raise
+            self._checkin(reusable=False)
+            with Connection.connection_pool.condition:
+                Connection.connection_pool.stats.retries += 1
+
+        pooled = self._checkout(url, http_options, reuse=False)
+        return self._exchange(pooled, request)
+
+    def _refresh_entry(
+        self,
+        url: URL,
+        stale_content: BrowserCacheEntry,
+        cache_control: CacheControl,
+        response_headers: dict[str, str]
+    ) -> BrowserCacheEntry:
+        entry = stale_content._replace(
+            max_age=(
+                cache_control.max_age if cache_control.max_age is not None
+                else stale_content.max_age
+            ),
+            timestamp=datetime.now(),
+            etag=response_headers.get('etag', stale_content.etag),
+            last_modified=response_headers.get(
+                'last-modified', stale_content.last_modified
+            ),
+        )
+        self._store_entry(BrowserCacheKey(url=str(url)), entry)
+        return entry
+
+    def _update_cache(
+        self,
+        url: URL,
+        cache_control: CacheControl,
+        response_headers: dict[str, str],
+        content: str | None
+    ) -> None:
+        key = BrowserCacheKey(url=str(url))
+        if cache_control.no_store:
+            _ = Connection.browser_cache.pop(key, None)
+            if Connection.disk_cache is not None:
+                Connection.disk_cache.pop(key)
+        elif content is not None:
+            self._store_entry(key, BrowserCacheEntry(
+                content=content,
+                max_age=cache_control.max_age or 0,
+                timestamp=datetime.now(),
+                etag=response_headers.get('etag'),
+                last_modified=response_headers.get('last-modified'),
+            ))
+
+    def _release_socket(
+        self,
+        http_options: HttpOptions,
+        response_headers: dict[str, str]
+    ) -> None:
+        self._checkin(reusable=not (
+            http_options['http_version'] == "1.0"
+            or response_headers.get('connection', '').lower() == 'close'
+        ))
+
+    def _stale_entry(self, key: BrowserCacheKey) -> BrowserCacheEntry | None:
+        """Return a cached entry for key that can be revalidated, if any."""
+        entry = Connection.browser_cache.get(key)
+        if entry is None and Connection.disk_cache is not None:
+            entry = Connection.disk_cache.get(key)
+        if entry is None or not entry.has_validators:
+            return None
+        return entry
+
+    def _store_entry(
+        self,
+        key: BrowserCacheKey,
+        entry: BrowserCacheEntry
+    ) -> None:
+        Connection.browser_cache[key] = entry
+        if Connection.disk_cache is not None:
+            Connection.disk_cache.put(key, entry)
 
     def request(self, *, url: URL) -> str:
         if url.scheme == "data":
@@ -219,3 +715,92 @@ class Connection:
         else:
             return self._request_http(url,  http_options=self.http_options)
 
+    def request_many(
+        self,
+        urls: Iterable[URL],
+        pipeline: bool = False
+    ) -> list[str]:
+        """
+        Fetch urls in order. With pipeline=True over HTTP/1.1 the requests
+        for each origin are pipelined on one pooled socket instead of
+        waiting a round trip per request. Whatever the pipeline could not
+        fetch, e.g. because the server closed the connection, is requested
+        serially.
+        """
+        urls = list(urls)
+        if not pipeline or self.http_options['http_version'] != "1.1":
+            return [self.request(url=url) for url in urls]
+
+        contents: list[str | None] = [None] * len(urls)
+        origins: dict[tuple[str, str, int], list[int]] = {}
+        now = datetime.now()
+        for index, url in enumerate(urls):
+            if url.scheme in ("http", "https"):
+                url, _ = self._follow_cached_redirects(url)
+                urls[index] = url
+                cached_content = self._cached_entry(url, now)
+                if cached_content is not None:
+                    contents[index] = cached_content.content
+                else:
+                    origin = (url.scheme, url.host, url.port)
+                    origins.setdefault(origin, []).append(index)
+
+        for indices in origins.values():
+            pipelined = self._pipeline_http(
+                [urls[index] for index in indices], self.http_options
+            )
+            for index, content in zip(indices, pipelined):
+                contents[index] = content
+
+        return [
+            content if content is not None else self.request(url=url)
+            for url, content in zip(urls, contents)
+        ]
+
+    def preconnect(self, urls: Iterable[URL]) -> int:
+        """
+        Open, and for https TLS-handshake, an idle pooled socket for each
+        of the first MAX_PRECONNECTS origins in urls that has none, in
+        parallel, so the first request skips DNS and the handshakes. Only
+        HTTP/1.1 requests reuse pooled sockets. Failures are ignored: this
+        is only a hint. Returns the number of sockets opened.
+        """
+        if self.http_options['http_version'] != "1.1":
+            return 0
+
+        origins: dict[ConnectionPoolCacheKey, URL] = {}
+        for url in urls:
+            if url.scheme in ("http", "https"):
+                key = ConnectionPoolCacheKey(host=url.host, port=url.port)
+                _ = origins.setdefault(key, url)
+                if len(origins) == self.MAX_PRECONNECTS:
+                    break
+
+        def open_socket(key: ConnectionPoolCacheKey, url: URL) -> bool:
+            try:
+                return Connection.connection_pool.preconnect(
+                    key, lambda: self._connect(url)
+                )
+            except OSError:
+                return False
+
+        if len(origins) <= 1:
+            return sum(map(open_socket, origins.keys(), origins.values()))
+        with ThreadPoolExecutor(max_workers=len(origins)) as executor:
+            return sum(executor.map(
+                open_socket, origins.keys(), origins.values()
+            ))
+
+    def stream(self, *, url: URL) -> Iterator[str]:
+        """
+        Like request(), but yield the decoded body in chunks as they come
+        off the socket. The iterator must be exhausted so the connection
+        can be reused or closed.
+        """
+        if url.scheme == "data":
+            yield self._request_data(url)
+        elif url.scheme == "file":
+            yield from self._stream_file(url)
+        else:
+            yield from self._stream_http(url, http_options=self.http_options)
+
@@ -0,0 +1,221 @@
+from dataclasses import dataclass, field
+import select
+from socket import MSG_PEEK, socket as Socket
+import ssl
+import threading
+import time
+from typing import Callable, NamedTuple
+
+
+class ConnectionPoolCacheKey(NamedTuple):
+    host: str
+    port: int
+
+
+@dataclass
+class PooledSocket:
+    socket: Socket
+    key: ConnectionPoolCacheKey
+    last_used: float = field(default_factory=time.monotonic)
+
+    # Number of requests sent over this socket
+    uses: int = 0
+
+    @property
+    def reused(self) -> bool:
+        return self.uses > 0
+
+    def close(self) -> None:
+        try:
+            self.socket.close()
+        except OSError:
+            pass
+
+
+@dataclass
+class PoolStats:
+    created: int = 0
+    reused: int = 0
+    idle_evictions: int = 0
+    dead_sockets: int = 0
+    retries: int = 0
+
+
+def is_socket_alive(sock: Socket) -> bool:
+    """
+    Check an idle keep-alive socket without blocking. An idle socket must
+    have nothing to read: readability means the peer closed it or sent
+    bytes that belong to no request.
+    """
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+    except (OSError, ValueError):
+        return False
+    if not readable:
+        return True
+
+    timeout = sock.gettimeout()
+    sock.setblocking(False)
+    try:
+        if isinstance(sock, ssl.SSLSocket):
+            # TLS 1.3 session tickets make a socket readable without
+            # carrying any application data.
+            _ = sock.recv(1)
+        else:
+            _ = sock.recv(1, MSG_PEEK)
+        # Either EOF or stray bytes
+        return False
+    except (ssl.SSLWantReadError, BlockingIOError):
+        return True
+    except OSError:
+        return False
+    finally:
+        try:
+            sock.settimeout(timeout)
+        except OSError:
+            pass
+
+
+@dataclass
+class ConnectionPool:
+    """
+    Thread-safe pool of keep-alive sockets, several per (host, port).
+
+    checkout() hands out an idle socket for the host when a healthy one
+    exists, otherwise opens a new one as long as the host has fewer than
+    max_per_host sockets, and blocks until one is checked in when the
+    host is at its limit. Sockets idle for longer than idle_timeout
+    seconds are closed.
+    """
+    max_per_host: int = 6
+    idle_timeout: float = 30.0
+
+    idle: dict[ConnectionPoolCacheKey, list[PooledSocket]] = field(
+        default_factory=dict
+    )
+    active: dict[ConnectionPoolCacheKey, int] = field(default_factory=dict)
+    stats: PoolStats = field(default_factory=PoolStats)
+    condition: threading.Condition = field(default_factory=threading.Condition)
+
+    def __len__(self) -> int:
+        """Number of idle sockets."""
+        with self.condition:
+            return sum(len(sockets) for sockets in self.idle.values())
+
+    def __contains__(self, key: ConnectionPoolCacheKey) -> bool:
+        with self.condition:
+            return bool(self.idle.get(key))
+
+    def _evict_idle(self, now: float) -> None:
+        for key, sockets in list(self.idle.items()):
+            kept: list[PooledSocket] = []
+            for pooled in sockets:
+                if now - pooled.last_used > self.idle_timeout:
+                    pooled.close()
+                    self.stats.idle_evictions += 1
+                else:
+                    kept.append(pooled)
+            if kept:
+                self.idle[key] = kept
+            else:
+                del self.idle[key]
+
+    def evict_idle(self) -> None:
+        with self.condition:
+            self._evict_idle(time.monotonic())
+
+    def checkout(
+        self,
+        key: ConnectionPoolCacheKey,
+        connect: Callable[[], Socket],
+        reuse: bool = True
+    ) -> PooledSocket:
+        """
+        Return a socket for key. With reuse=False a new socket is always
+        opened (but still counts against max_per_host).
+        """
+        with self.condition:
+            while True:
+                self._evict_idle(time.monotonic())
+                sockets = self.idle.get(key, [])
+                while reuse and sockets:
+                    pooled = sockets.pop()
+                    if is_socket_alive(pooled.socket):
+                        self.active[key] = self.active.get(key, 0) + 1
+                        self.stats.reused += 1
+                        return pooled
+                    pooled.close()
+                    self.stats.dead_sockets += 1
+
+                if self.active.get(key, 0) + len(sockets) < self.max_per_host:
+                    self.active[key] = self.active.get(key, 0) + 1
+                    break
+
+                # Free an idle slot for a caller that must not reuse one
+                if sockets:
+                    sockets.pop(0).close()
+                    continue
+
+                _ = self.condition.wait()
+
+        return self._open(key, connect)
+
+    def _open(
+        self,
+        key: ConnectionPoolCacheKey,
+        connect: Callable[[], Socket]
+    ) -> PooledSocket:
+        """Connect a socket for a slot already counted in active."""
+        try:
+            sock = connect()
+        except BaseException:
+            with self.condition:
+                self.active[key] -= 1
+                self.condition.notify()
+            raise
+
+        with self.condition:
+            self.stats.created += 1
+        return PooledSocket(socket=sock, key=key)
+
+    def preconnect(
+        self,
+        key: ConnectionPoolCacheKey,
+        connect: Callable[[], Socket]
+    ) -> bool:
+        """
+        Open an idle socket for key ahead of a request. An idle keep-alive
+        socket still gets a spare next to it, for a request made while it
+        is busy. Nothing is done, and False returned, when key already has
+        an unused idle socket or no free slot; this never waits.
+        """
+        with self.condition:
+            sockets = self.idle.get(key, [])
+            if any(not pooled.reused for pooled in sockets):
+                return False
+            if self.active.get(key, 0) + len(sockets) >= self.max_per_host:
+                return False
+            self.active[key] = self.active.get(key, 0) + 1
+
+        self.checkin(self._open(key, connect))
+        return True
+
+    def checkin(self, pooled: PooledSocket, reusable: bool = True) -> None:
+        """Return a checked out socket; it is closed unless reusable."""
+        with self.condition:
+            self.active[pooled.key] -= 1
+            if reusable:
+                pooled.last_used = time.monotonic()
+                self.idle.setdefault(pooled.key, []).append(pooled)
+            else:
+                pooled.close()
+            self.condition.notify()
+
+    def clear(self) -> None:
+        """Close every idle socket and reset the counters."""
+        with self.condition:
+            for sockets in self.idle.values():
+                for pooled in sockets:
+                    pooled.close()
+            self.idle.clear()
+            self.stats = PoolStats()
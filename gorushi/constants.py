@@ -9,9 +9,9 @@ DEFAULT_VERTICAL_PADDING = 10
 
 
 
-SELF_CLOSING_TAGS = [
+SELF_CLOSING_TAGS = {
     'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
     'link', 'meta', 'param', 'source', 'track', 'wbr'
-]
+}
 
 
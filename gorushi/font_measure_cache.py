@@ -1,18 +1,181 @@
+from array import array
+from collections import OrderedDict
+from collections.abc import Iterable
 from dataclasses import dataclass, field
-import tkinter.font
+import hashlib
+import json
+import os
+from typing import TypedDict, cast
+
+from gorushi.cache import DEFAULT_DISK_CACHE_DIR, write_atomic
+from gorushi.fonts import (
+    Font, FontDescriptor, FontKey, FontMetrics, get_font_backend
+)
+
+
+DEFAULT_FONT_METRICS_DIR = os.path.join(DEFAULT_DISK_CACHE_DIR, "fonts")
+
+# Characters whose widths are measured up front for every font
+PREFETCH_CHARS = [chr(i) for i in range(32, 127)]  # printable ASCII
+
+# Basic Latin through Latin Extended-B get an array slot per code point
+GLYPH_TABLE_SIZE = 0x250
+UNMEASURED = -1.0
+
+DEFAULT_WORD_CACHE_SIZE = 16384
+
+
+# Backend version(), the FontKey fields and the family actually used
+FontMetricsDiskKey = list[str | int]
+
+
+@dataclass
+class FontMetricsRecord:
+    widths: dict[str, float]
+    cjk_width: float
+    metrics: FontMetrics
+
+
+class FontMetricsFile(TypedDict):
+    key: FontMetricsDiskKey
+    widths: list[float]
+    cjk_width: float
+    metrics: FontMetrics
+
+
+@dataclass
+class FontMetricsDiskCache:
+    """
+    Widths of PREFETCH_CHARS, the CJK width and metrics() of every font
+    measured so far, one small JSON file per font. Files are keyed by the
+    font key, the family the font actually resolved to and the backend's
+    version(), so a Tk upgrade, a different scaling or a new font install
+    never reuses stale widths. A file is only read the first time its font
+    is measured. Browser processes can share the directory, as files
+    are replaced with write_atomic.
+    """
+    directory: str = DEFAULT_FONT_METRICS_DIR
+
+    def __post_init__(self):
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: FontMetricsDiskKey) -> str:
+        digest = hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest)
+
+    def get(self, key: FontMetricsDiskKey) -> FontMetricsRecord | None:
+        try:
+            with open(self._path(key), "rb") as f:
+                record = cast(FontMetricsFile, json.loads(f.read()))
+        except (FileNotFoundError, ValueError):
+            return None
+        if record.get("key") != key:
+            return None
+        widths = record.get("widths", [])
+        if len(widths) != len(PREFETCH_CHARS):
+            return None
+        return FontMetricsRecord(
+            widths=dict(zip(PREFETCH_CHARS, widths)),
+            cjk_width=record["cjk_width"],
+            metrics=record["metrics"],
+        )
+
+    def put(self, key: FontMetricsDiskKey, record: FontMetricsRecord) -> None:
+        contents: FontMetricsFile = {
+            "key": key,
+            "widths": [record.widths[ch] for ch in PREFETCH_CHARS],
+            "cjk_width": record.cjk_width,
+            "metrics": record.metrics,
+        }
+        data = json.dumps(contents, separators=(",", ":")).encode("utf-8")
+        write_atomic(self._path(key), data, self.directory)
+
+    def clear(self) -> None:
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
+
+
+@dataclass
+class GlyphTable:
+    """
+    Widths of one font's glyphs. Code points below GLYPH_TABLE_SIZE live
+    in a flat array (negative until measured), the rest in a dict. CJK
+    glyphs all share cjk_width and are not stored.
+    """
+    cjk_width: float = 0.0
+    widths: array[float] = field(
+        default_factory=lambda: array("f", [UNMEASURED]) * GLYPH_TABLE_SIZE
+    )
+    other: dict[str, float] = field(default_factory=dict)
+
+    def get(self, ch: str) -> float | None:
+        code = ord(ch)
+        if code < GLYPH_TABLE_SIZE:
+            width = self.widths[code]
+            return width if width >= 0 else None
+        return self.other.get(ch)
+
+    def set(self, ch: str, width: float) -> None:
+        code = ord(ch)
+        if code < GLYPH_TABLE_SIZE:
+            self.widths[code] = width
+        else:
+            self.other[ch] = width
+
+
+@dataclass
+class FontMeasureStats:
+    word_hits: int = 0
+    word_misses: int = 0
+    word_evictions: int = 0
+    # Glyphs found in a table vs. measured by the font
+    glyph_hits: int = 0
+    glyph_misses: int = 0
+
+    @property
+    def word_hit_rate(self) -> float:
+        lookups = self.word_hits + self.word_misses
+        return self.word_hits / lookups if lookups else 0.0
+
+    @property
+    def glyph_hit_rate(self) -> float:
+        lookups = self.glyph_hits + self.glyph_misses
+        return self.glyph_hits / lookups if lookups else 0.0
 
 
 @dataclass
 class FontMeasurer:
-    cache: dict[tuple[float, str, str, str], dict[str, float]] = field(default_factory=dict)
-    fixed_cjk_width: dict[tuple[float, str, str, str], float] = field(default_factory=dict)
+    """
+    Text widths as sums of per-glyph widths. Each font gets a GlyphTable
+    that only grows with the distinct characters seen, which is small;
+    widths of whole words are kept in an LRU of at most max_words entries
+    shared by all fonts, so that a long session does not hold on to its
+    whole vocabulary.
+    """
+    max_words: int = DEFAULT_WORD_CACHE_SIZE
 
-    def _font_key(self, font: tkinter.font.Font):
-        return (
-            font.cget("size"),
-            font.cget("weight"),
-            font.cget("slant"),
-            font.cget("family"),
+    glyphs: dict[FontKey, GlyphTable] = field(default_factory=dict)
+    words: OrderedDict[tuple[FontKey, str], float] = field(
+        default_factory=OrderedDict
+    )
+    font_metrics: dict[FontKey, FontMetrics] = field(default_factory=dict)
+    stats: FontMeasureStats = field(default_factory=FontMeasureStats)
+
+    # Persists what is measured up front for each font across runs
+    disk_cache: FontMetricsDiskCache | None = None
+
+    def _font_key(self, font: Font) -> FontKey:
+        if isinstance(font, FontDescriptor):
+            return font.key
+        return FontKey(
+            size=font.cget("size"),
+            weight=font.cget("weight"),
+            slant=font.cget("slant"),
+            family=font.cget("family"),
         )
 
     def _is_cjk(self, ch: str) -> bool:
@@ -26,58 +189,122 @@ class FontMeasurer:
             0xFF00 <= code <= 0xFF60     # Fullwidth roman characters and halfwidth katakana
         )
 
-    def _prefetch_ascii_widths(self, font: tkinter.font.Font, cache: dict[str, float]):
+    def _prefetch_ascii_widths(self, font: Font, glyphs: GlyphTable):
         """Prefetch widths for common ASCII characters."""
-        ascii_chars = (
-            [chr(i) for i in range(32, 127)]  # printable ASCII
-        )
-        for ch in ascii_chars:
-            if ch not in cache:
-                cache[ch] = font.measure(ch)
+        for ch in PREFETCH_CHARS:
+            glyphs.set(ch, font.measure(ch))
 
-    def measure(self, font: tkinter.font.Font, text: str) -> float:
-        if not text:
-            return 0.0
+    def _load_font(self, font: Font, key: FontKey) -> GlyphTable:
+        """
+        Build the glyph table and metrics of a font seen for the first
+        time, from the disk cache when it has them.
+        """
+        disk_key: FontMetricsDiskKey | None = None
+        if self.disk_cache is not None:
+            disk_key = [
+                get_font_backend().version(), *key, font.actual("family")
+            ]
+            record = self.disk_cache.get(disk_key)
+            if record is not None:
+                glyphs = GlyphTable(cjk_width=record.cjk_width)
+                for ch, width in record.widths.items():
+                    glyphs.set(ch, width)
+                self.font_metrics[key] = record.metrics
+                return glyphs
 
-        key = self._font_key(font)
-        cache = self.cache.setdefault(key, {})
+        glyphs = GlyphTable(cjk_width=font.measure("가"))
+        self._prefetch_ascii_widths(font, glyphs)
+        self.font_metrics[key] = font.metrics()
 
-        # Prefetch widths for common ASCII characters (only once)
-        if " " not in cache:
-            self._prefetch_ascii_widths(font, cache)
+        if self.disk_cache is not None and disk_key is not None:
+            self.disk_cache.put(
+                disk_key,
+                FontMetricsRecord(
+                    widths={
+                        ch: glyphs.widths[ord(ch)] for ch in PREFETCH_CHARS
+                    },
+                    cjk_width=glyphs.cjk_width,
+                    metrics=self.font_metrics[key],
+                ),
+            )
+        return glyphs
 
-        # Initialize fixed CJK width if not already done
-        if key not in self.fixed_cjk_width:
-            self.fixed_cjk_width[key] = font.measure("가")
+    def _glyph_table(self, font: Font) -> tuple[FontKey, GlyphTable]:
+        key = self._font_key(font)
+        glyphs = self.glyphs.get(key)
+        if glyphs is None:
+            glyphs = self.glyphs[key] = self._load_font(font, key)
+        return key, glyphs
 
-        result = cache.get(text)
-        if result is not None:
-            return result
+    def _glyph_width(self, font: Font, glyphs: GlyphTable, ch: str) -> float:
+        width = glyphs.get(ch)
+        if width is None and self._is_cjk(ch):
+            width = glyphs.cjk_width
+        if width is not None:
+            self.stats.glyph_hits += 1
+            return width
+        self.stats.glyph_misses += 1
+        width = font.measure(ch)
+        glyphs.set(ch, width)
+        return width
 
+    def metrics(self, font: Font) -> FontMetrics:
+        """font.metrics(), without a round trip into Tk after the first."""
+        key, _ = self._glyph_table(font)
+        return self.font_metrics[key]
+
+    def _measure(
+        self,
+        font: Font,
+        key: FontKey,
+        glyphs: GlyphTable,
+        text: str
+    ) -> float:
         # Single character case
         if len(text) == 1:
-            if text not in cache:
-                cache[text] = (
-                    self.fixed_cjk_width[key]
-                    if self._is_cjk(text)
-                    else font.measure(text)
-                )
-            return cache[text]
+            return self._glyph_width(font, glyphs, text)
 
         # Multi-character case
+        word_key = (key, text)
+        width = self.words.get(word_key)
+        if width is not None:
+            self.words.move_to_end(word_key)
+            self.stats.word_hits += 1
+            return width
+        self.stats.word_misses += 1
+
         width = 0.0
         for ch in text:
-            w = cache.get(ch)
-            if w is None:
-                w = (
-                    self.fixed_cjk_width[key]
-                    if self._is_cjk(ch)
-                    else font.measure(ch)
-                )
-                cache[ch] = w
-            width += w
-
-        cache[text] = width
+            width += self._glyph_width(font, glyphs, ch)
+
+        self.words[word_key] = width
+        if len(self.words) > self.max_words:
+            _ = self.words.popitem(last=False)
+            self.stats.word_evictions += 1
         return width
 
+    def measure(self, font: Font, text: str) -> float:
+        if not text:
+            return 0.0
+
+        key, glyphs = self._glyph_table(font)
+        return self._measure(font, key, glyphs, text)
+
+    def measure_many(self, font: Font, words: Iterable[str]) -> list[float]:
+        """
+        Widths of several strings in the same font, e.g. the words of a
+        text node, looking the font up once rather than once per word.
+        """
+        key, glyphs = self._glyph_table(font)
+        return [
+            self._measure(font, key, glyphs, text) if text else 0.0
+            for text in words
+        ]
+
+    def clear(self) -> None:
+        self.glyphs.clear()
+        self.words.clear()
+        self.font_metrics.clear()
+        self.stats = FontMeasureStats()
+
 font_measurer = FontMeasurer()
@@ -0,0 +1,361 @@
+from dataclasses import dataclass, field
+import math
+import os
+import sys
+from typing import (
+    TYPE_CHECKING, Literal, NamedTuple, Protocol, TypedDict, overload, override
+)
+
+if TYPE_CHECKING:
+    import tkinter
+
+
+class FontMetrics(TypedDict):
+    """metrics() of a font, in pixels; the same dict Tk returns."""
+    ascent: int
+    descent: int
+    linespace: int
+    fixed: bool
+
+
+class Font(Protocol):
+    """
+    The part of tkinter.font.Font that layout and FontMeasurer use, so
+    that a backend can hand out Tk fonts or anything measuring like them.
+    """
+
+    def measure(self, text: str) -> int: ...
+
+    # All metrics at once; callers pick the ones they need from the dict
+    def metrics(self) -> FontMetrics: ...
+
+    @overload
+    def cget(self, option: Literal["size"]) -> int: ...
+    @overload
+    def cget(self, option: Literal["family", "weight", "slant"]) -> str: ...
+
+    def actual(self, option: Literal["family"]) -> str: ...
+
+
+class FontKey(NamedTuple):
+    size: int
+    weight: str
+    slant: str
+    family: str
+
+
+@dataclass(eq=False)
+class FontDescriptor:
+    """
+    A font with its key and metrics worked out once, for code that looks
+    at the same font over and over: FontMeasurer hashes key directly and
+    metrics() is a dict lookup, where a Tk font makes a round trip into
+    Tcl for every cget() and metrics() call. Passes for the wrapped font
+    anywhere a Font is expected, Tk canvases included.
+    """
+    font: Font
+    key: FontKey
+    _metrics: FontMetrics | None = None
+
+    @classmethod
+    def wrap(cls, font: Font) -> "FontDescriptor":
+        return cls(
+            font=font,
+            key=FontKey(
+                size=font.cget("size"),
+                weight=font.cget("weight"),
+                slant=font.cget("slant"),
+                family=font.cget("family"),
+            ),
+        )
+
+    def measure(self, text: str) -> int:
+        return self.font.measure(text)
+
+    def metrics(self) -> FontMetrics:
+        metrics = self._metrics
+        if metrics is None:
+            metrics = self._metrics = self.font.metrics()
+        return metrics
+
+    @overload
+    def cget(self, option: Literal["size"]) -> int: ...
+    @overload
+    def cget(self, option: Literal["family", "weight", "slant"]) -> str: ...
+    def cget(
+        self,
+        option: Literal["family", "size", "weight", "slant"]
+    ) -> str | int:
+        if option == "size":
+            return self.key.size
+        if option == "weight":
+            return self.key.weight
+        if option == "slant":
+            return self.key.slant
+        return self.key.family
+
+    def actual(self, option: Literal["family"]) -> str:
+        return self.font.actual(option)
+
+    @override
+    def __str__(self) -> str:
+        # Tk takes a font option by name, which for a tkinter Font is str()
+        return str(self.font)
+
+
+class FontBackend(Protocol):
+    name: str
+
+    def version(self) -> str:
+        """
+        Identifies everything besides the font itself that widths depend
+        on, so that measurements persisted on disk are not reused after
+        it changes.
+        """
+        ...
+
+    def create_font(
+        self,
+        family: str,
+        size: int,
+        weight: Literal["normal", "bold"],
+        slant: Literal["italic", "roman"]
+    ) -> Font: ...
+
+
+@dataclass
+class TkFontBackend:
+    """
+    Real fonts through Tk; needs a display. Fonts are created for root,
+    the Tk window they will be drawn in, or for a hidden root window of
+    their own when none is given.
+    """
+    name: str = "tk"
+    root: "tkinter.Misc | None" = None
+
+    def _root(self) -> "tkinter.Misc":
+        # Imported here so that the headless backend works where Tk is
+        # not installed at all
+        import tkinter
+
+        if self.root is None:
+            root = tkinter.Tk()
+            root.withdraw()
+            self.root = root
+        return self.root
+
+    def version(self) -> str:
+        # The root's scaling turns points into pixels
+        tk = self._root().tk
+        return (
+            f"tk {tk.call('info', 'patchlevel')} "
+            f"scaling {tk.call('tk', 'scaling')}"
+        )
+
+    def create_font(
+        self,
+        family: str,
+        size: int,
+        weight: Literal["normal", "bold"],
+        slant: Literal["italic", "roman"]
+    ) -> Font:
+        import tkinter.font
+
+        return tkinter.font.Font(
+            root=self._root(),
+            family=family,
+            size=size,
+            weight=weight,
+            slant=slant,
+        )
+
+
+# Advance widths in 1/1000 em of printable ASCII (32-126) for Helvetica,
+# which Arial and Liberation Sans match. Oblique shares the upright widths.
+HELVETICA_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191,
+    333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556,
+    556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778,
+    722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944,
+    667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556,
+    556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722,
+    500, 500, 500, 334, 260, 334, 584,
+)
+
+HELVETICA_BOLD_WIDTHS = (
+    278, 333, 474, 556, 556, 889, 722, 238,
+    333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556,
+    556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778,
+    722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944,
+    667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611,
+    611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778,
+    556, 556, 500, 389, 280, 389, 584,
+)
+
+# Vertical metrics in 1/1000 em (Arial: 1854 and 434 units of 2048)
+HELVETICA_ASCENT = 905
+HELVETICA_DESCENT = 212
+
+# Width of glyphs outside the tables: full width for CJK, an average
+# Latin width for everything else
+FULL_WIDTH = 1000
+FALLBACK_WIDTH = 556
+
+# Tk's default scaling: 96 dpi screen pixels per 72 points
+PIXELS_PER_POINT = 96 / 72
+
+# Bump whenever the tables above change
+HEADLESS_METRICS_VERSION = 1
+
+
+def is_full_width(code: int) -> bool:
+    return (
+        0x1100 <= code <= 0x115F or  # Hangul Jamo
+        0x2E80 <= code <= 0xA4CF or  # CJK radicals through Yi
+        0xAC00 <= code <= 0xD7A3 or  # Hangul syllables
+        0xF900 <= code <= 0xFAFF or  # CJK compatibility ideographs
+        0xFF00 <= code <= 0xFF60 or  # Fullwidth forms
+        0x20000 <= code <= 0x3FFFD   # CJK extensions B and beyond
+    )
+
+
+@dataclass
+class HeadlessFont:
+    """
+    Font measured from precomputed tables instead of a font engine, so
+    layout needs neither Tk nor a display. Widths and metrics are in
+    whole pixels like Tk's, though they will not match Tk to the pixel.
+    """
+    family: str
+    size: int
+    weight: Literal["normal", "bold"] = "normal"
+    slant: Literal["italic", "roman"] = "roman"
+
+    pixels: float = field(init=False)
+    widths: tuple[int, ...] = field(init=False)
+
+    def __post_init__(self):
+        # Like Tk, negative sizes are in pixels and positive ones in points
+        if self.size < 0:
+            self.pixels = -self.size
+        else:
+            self.pixels = self.size * PIXELS_PER_POINT
+        if self.weight == "bold":
+            self.widths = HELVETICA_BOLD_WIDTHS
+        else:
+            self.widths = HELVETICA_WIDTHS
+
+    def _advance(self, ch: str) -> int:
+        code = ord(ch)
+        if 32 <= code <= 126:
+            return self.widths[code - 32]
+        if is_full_width(code):
+            return FULL_WIDTH
+        return FALLBACK_WIDTH
+
+    def measure(self, text: str) -> int:
+        advance = sum(self._advance(ch) for ch in text)
+        return round(advance * self.pixels / 1000)
+
+    def metrics(self) -> FontMetrics:
+        ascent = math.ceil(HELVETICA_ASCENT * self.pixels / 1000)
+        descent = math.ceil(HELVETICA_DESCENT * self.pixels / 1000)
+        return {
+            "ascent": ascent,
+            "descent": descent,
+            "linespace": ascent + descent,
+            "fixed": False,
+        }
+
+    @overload
+    def cget(self, option: Literal["size"]) -> int: ...
+    @overload
+    def cget(self, option: Literal["family", "weight", "slant"]) -> str: ...
+    def cget(
+        self,
+        option: Literal["family", "size", "weight", "slant"]
+    ) -> str | int:
+        if option == "size":
+            return self.size
+        if option == "weight":
+            return self.weight
+        if option == "slant":
+            return self.slant
+        return self.family
+
+    def actual(self, option: Literal["family"]) -> str:
+        # The same tables stand in for every family
+        return self.cget(option)
+
+
+@dataclass
+class HeadlessFontBackend:
+    """Fonts from the metrics tables above; see HeadlessFont."""
+    name: str = "headless"
+
+    def version(self) -> str:
+        return f"headless {HEADLESS_METRICS_VERSION}"
+
+    def create_font(
+        self,
+        family: str,
+        size: int,
+        weight: Literal["normal", "bold"],
+        slant: Literal["italic", "roman"]
+    ) -> Font:
+        return HeadlessFont(
+            family=family, size=size, weight=weight, slant=slant
+        )
+
+
+FONT_BACKENDS: dict[str, type[TkFontBackend] | type[HeadlessFontBackend]] = {
+    "tk": TkFontBackend,
+    "headless": HeadlessFontBackend,
+}
+
+_font_backend: FontBackend | None = None
+
+
+def default_font_backend() -> FontBackend:
+    """
+    GORUSHI_FONT_BACKEND (tk or headless) when set. Otherwise Tk, except
+    on X11 systems without a display to open a Tk window on.
+    """
+    name = os.environ.get("GORUSHI_FONT_BACKEND")
+    if name is None:
+        headless = (
+            sys.platform not in ("win32", "darwin")
+            and not os.environ.get("DISPLAY")
+            and not os.environ.get("WAYLAND_DISPLAY")
+        )
+        name = "headless" if headless else "tk"
+    if name not in FONT_BACKENDS:
+        raise ValueError(f"Unknown font backend: {name}")
+    return FONT_BACKENDS[name]()
+
+
+def get_font_backend() -> FontBackend:
+    global _font_backend
+    if _font_backend is None:
+        _font_backend = default_font_backend()
+    return _font_backend
+
+
+def set_font_backend(backend: FontBackend) -> None:
+    """
+    Switch backends. Fonts already handed out by the old backend stay
+    cached in layout.FONT_CACHE and FontMeasurer, so switch before laying
+    anything out.
+    """
+    global _font_backend
+    _font_backend = backend
@@ -1,19 +1,22 @@
-import tkinter.font
 from dataclasses import dataclass, field
-from typing import Literal, final, override
+from typing import TYPE_CHECKING, Literal, final, override
 
 from gorushi.command import DrawCommand, DrawRect, DrawText
 from gorushi.constants import (
     DEFAULT_HEIGHT, DEFAULT_HORIZONTAL_PADDING, DEFAULT_HSTEP, DEFAULT_VERTICAL_PADDING, DEFAULT_VSTEP, DEFAULT_WIDTH
 )
 from gorushi.font_measure_cache import font_measurer
+from gorushi.fonts import Font, FontDescriptor, get_font_backend
 from gorushi.node import Element, Node, Text
 from gorushi.parser import print_tree
 
+if TYPE_CHECKING:
+    import tkinter
+
 
 FONT_CACHE: dict[
     tuple[float, str, str],
-    tuple[tkinter.font.Font, tkinter.Label | None]
+    tuple[FontDescriptor, "tkinter.Label | None"]
 ] = {}
 
 SOFT_HYPHEN = "-"
@@ -30,7 +33,7 @@ class VerticalAlignContext:
 
 @dataclass 
 class BufferLine:
-    words: list[tuple[float, float, str, tkinter.font.Font]] = field(default_factory=list)
+    words: list[tuple[float, float, str, Font]] = field(default_factory=list)
     baseline: float = 0.0
     current_baseline: float = 0.0
 
@@ -55,19 +58,18 @@ class BufferLine:
         self, 
         *,
         x: float,
-        font: tkinter.font.Font,
+        font: Font,
         word: str,
     ):
-        self.words.append(
-            (x, self.current_baseline - font.metrics("ascent"), word, font)
-        )
+        ascent = font_measurer.metrics(font)["ascent"]
+        self.words.append((x, self.current_baseline - ascent, word, font))
 
     def calculate_bounds(self) -> tuple[float, float]:
         upper_bound = 0.0
         lower_bound = 0.0
 
         for _, y, __, font in self.words:
-            metrics = font.metrics()
+            metrics = font_measurer.metrics(font)
             ascent = metrics["ascent"]
             descent = metrics["descent"]
             if y + ascent > upper_bound:
@@ -106,7 +108,9 @@ BLOCK_ELEMENTS = [
 
 @dataclass
 class BaseLayout:
-    display_list: list[tuple[float,float,str, tkinter.font.Font]] = field(default_factory=list)
+    display_list: list[tuple[float, float, str, Font]] = field(
+        default_factory=list
+    )
     children: list['BaseLayout'] = field(default_factory=list)
 
     x: float = 0.0
@@ -133,12 +137,17 @@ class Layout(BaseLayout):
     parent : BaseLayout | None = None
     previous: BaseLayout | None = None
 
-    display_list: list[tuple[float,float,str, tkinter.font.Font]] = field(default_factory=list)
+    display_list: list[tuple[float, float, str, Font]] = field(
+        default_factory=list
+    )
 
 
 @final
 @dataclass
 class DocumentLayout(Layout):
+    # Print the document tree after layout
+    verbose: bool = True
+
     @override
     def layout(self):
         child = BlockLayout(
@@ -154,7 +163,7 @@ class DocumentLayout(Layout):
         child.layout()
         self.height = child.height
 
-        if self.node:
+        if self.node and self.verbose:
             print_tree(self.node)
 
     @override
@@ -312,7 +321,7 @@ class BlockLayout(Layout):
                 left = x
                 word_length = font_measurer.measure(font, word)
                 right = left + word_length
-                bottom  = y + font.metrics("linespace")
+                bottom  = y + font_measurer.metrics(font)["linespace"]
                 cmds.append(
                     DrawText(
                         left=x,
@@ -344,10 +353,14 @@ class BlockLayout(Layout):
                     if line.endswith('\n'):
                         self.flush()
             else:
-                for word in tree.text.split():
-                    self.process_word(
-                        word if not self.small_caps else word.upper()
-                    )
+                words = tree.text.split()
+                if self.small_caps:
+                    words = [word.upper() for word in words]
+                font = self.get_font(self.size, self.font_weight, self.style)
+                space = font_measurer.measure(font, " ")
+                widths = font_measurer.measure_many(font, words)
+                for word, width in zip(words, widths):
+                    self.process_word(word, width=width, space=space)
 
         elif isinstance(tree, Element):
             self.open_tag(tree.tag)
@@ -355,9 +368,18 @@ class BlockLayout(Layout):
                 self.recurse(child)
             self.close_tag(tree.tag)
 
-    def process_word(self, word: str):
+    def process_word(
+        self,
+        word: str,
+        width: float | None = None,
+        space: float | None = None
+    ):
+        """
+        Lay out one word. width and space (the width of " ") may be passed
+        in when already measured in the current font.
+        """
         font = self.get_font(self.size, self.font_weight, self.style)
-        w = font_measurer.measure(font, word)
+        w = font_measurer.measure(font, word) if width is None else width
 
         if self.cursor_x + w > self.interpolate_width:
             part = ""
@@ -390,7 +412,9 @@ class BlockLayout(Layout):
             font=font,
             word=word,
         )
-        self.cursor_x += w + font_measurer.measure(font, " ")
+        if space is None:
+            space = font_measurer.measure(font, " ")
+        self.cursor_x += w + space
 
     def open_tag(self, tag: str):
         if tag == "i":
@@ -406,7 +430,7 @@ class BlockLayout(Layout):
             self.small_caps = True 
         elif tag == 'sup':
             current_font = self.get_font(self.size, self.font_weight, self.style)
-            metrics = current_font.metrics()
+            metrics = font_measurer.metrics(current_font)
             ascent = metrics["ascent"]
             baseline_y = self.buffer_line.previous_baseline - int(ascent * 0.25)
             self.buffer_line.add_context(
@@ -421,7 +445,7 @@ class BlockLayout(Layout):
             self.size = int(previous_size * 0.75)
         elif tag == "sub": 
             current_font = self.get_font(self.size, self.font_weight, self.style)
-            metrics = current_font.metrics()
+            metrics = font_measurer.metrics(current_font)
             descent = metrics["descent"]
             baseline_y = self.buffer_line.previous_baseline + int(descent * 0.25)
             self.buffer_line.add_context(
@@ -526,17 +550,17 @@ class BlockLayout(Layout):
         size: int, 
         weight: Literal['normal', 'bold'], 
         style: Literal['italic', 'roman']
-    ) -> tkinter.font.Font:
+    ) -> FontDescriptor:
         key = (size, weight, style)
         if key not in FONT_CACHE:
-            font = tkinter.font.Font(
+            font = get_font_backend().create_font(
                 family="Arial",
                 size=size, 
                 weight=weight,
                 slant=style
             )
             # label = tkinter.Label(font=font)
-            FONT_CACHE[key] = (font, None)
+            FONT_CACHE[key] = (FontDescriptor.wrap(font), None)
         return FONT_CACHE[key][0]
 
     def reset(self):
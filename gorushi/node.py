@@ -1,19 +1,83 @@
+from collections.abc import Iterable, Mapping
 from dataclasses import dataclass, field
+from typing import NoReturn, Self, SupportsIndex, override
 
+from gorushi.attributes import Attributes, EMPTY_ATTRIBUTES, parse_attributes
 
-@dataclass
+
+# Nodes are slotted: large pages have hundreds of thousands of them, and
+# an instance __dict__ would more than double the size of each
+@dataclass(slots=True)
 class Node:
     tag: str = ""
     children: list['Node'] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True, init=False)
 class Element(Node):
-    attributes: dict[str, str] = field(default_factory=dict)
     parent: Node | None = None
 
+    # Source of the tag, e.g. 'a href="/"', whose attributes are only
+    # parsed the first time they are asked for; most never are
+    source: str = ""
+    _attributes: Attributes | None = field(default=None, repr=False)
+
+    def __init__(
+        self,
+        tag: str = "",
+        children: list[Node] | None = None,
+        attributes: Mapping[str, str] | None = None,
+        parent: Node | None = None,
+        source: str = ""
+    ):
+        Node.__init__(self, tag, [] if children is None else children)
+        self.parent = parent
+        self.source = source
+        self._attributes = (
+            None if attributes is None else Attributes(attributes)
+        )
+
+    @property
+    def attributes(self) -> Attributes:
+        if self._attributes is None:
+            self._attributes = Attributes(
+                parse_attributes(self.source)
+                if self.source else EMPTY_ATTRIBUTES
+            )
+        return self._attributes
+
+    @property
+    def has_source_attributes(self) -> bool:
+        """Whether the attributes are those written in source, unchanged."""
+        return bool(self.source) and (
+            self._attributes is None or not self._attributes.changed
+        )
+
+    @override
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Element):
+            return NotImplemented
+        if (self.tag, self.children, self.parent) != (
+            other.tag, other.children, other.parent
+        ):
+            return False
+        # The same source has the same attributes, so they are only parsed
+        # when the sources differ, which may still spell the same ones
+        if (
+            self.source == other.source
+            and self.has_source_attributes
+            and other.has_source_attributes
+        ):
+            return True
+        return self.attributes == other.attributes
+
+    @override
     def __repr__(self) -> str:
-        if not self.attributes:
+        # The tag as written, whether or not its attributes have been
+        # parsed; printing a tree must not parse those of every element
+        if self.has_source_attributes:
+            return f"<{self.source}>"
+        if not self._attributes:
             return f"<{self.tag}>"
         return f"<{self.tag} {self.attribute_str}>"
 
@@ -25,8 +89,46 @@ class Element(Node):
         return " ".join(attrs)
 
 
-@dataclass
+class NoChildren(list[Node]):
+    """A list that refuses to grow, for nodes that never have children."""
+
+    def _grow(self) -> NoReturn:
+        raise TypeError("Text nodes cannot have children")
+
+    @override
+    def append(self, node: Node, /) -> None:
+        self._grow()
+
+    @override
+    def extend(self, nodes: Iterable[Node], /) -> None:
+        self._grow()
+
+    @override
+    def insert(self, index: SupportsIndex, node: Node, /) -> None:
+        self._grow()
+
+    @override
+    def __iadd__(self, nodes: Iterable[Node], /) -> Self:
+        self._grow()
+
+    @override
+    def __setitem__(
+        self,
+        index: SupportsIndex | slice,
+        value: Node | Iterable[Node],
+        /
+    ) -> None:
+        self._grow()
+
+
+# Shared by every text node, like EMPTY_ATTRIBUTES by every element
+# without attributes
+EMPTY_CHILDREN: list[Node] = NoChildren()
+
+
+@dataclass(slots=True)
 class Text(Node):
+    children: list[Node] = field(default_factory=lambda: EMPTY_CHILDREN)
     text: str = ""
     parent: Node | None = None
 
@@ -1,10 +1,12 @@
 from dataclasses import dataclass, field
-from typing import Literal, override
+from typing import Callable, ClassVar, override
 
+from gorushi.attributes import parse_tag_name
+from gorushi.charset import CharsetDecoder
 from gorushi.constants import SELF_CLOSING_TAGS
 from gorushi.node import Element, Node, Text
-from gorushi.renderer import aho_corasick_matcher
-from gorushi.state_machine import HTMLTokenizerState, HTMLTokenizerStateMachine
+from gorushi.renderer import replace_all
+from gorushi.tokenizer import HTMLTokenizer
 
 
 def print_tree(node: Node, indent: int = 0) -> None:
@@ -12,142 +14,126 @@ def print_tree(node: Node, indent: int = 0) -> None:
     for child in node.children:
         print_tree(child, indent + 2)
 
-@dataclass 
-class AttributesExtractor:
-    text: str = ""
-
-    state: Literal['idle', 'name', 'equal_sign', 'value', 'whitespace'] \
-        = 'idle'
-
-    def parse(self) -> dict[str, str]:
-        attributes: dict[str, str] = {}
-        
-        attibute_name = ""
-        attibute_value = ""
-        current_quote_char: str | None = None
-
-        for i in range(len(self.text)):
-            c = self.text[i]
-            if self.state == 'idle':
-                if c.isspace():
-                    continue
-                else:
-                    if c.isalnum() or c in ['-', '_']:
-                        attibute_name += c
-                        self.state = 'name'
-            elif self.state == 'name':
-                if c == '=':
-                    self.state = 'equal_sign'
-                elif c.isspace():
-                    attributes[attibute_name.casefold()] = ""
-                    attibute_name = ""
-                    self.state = 'idle'
-                else:
-                    attibute_name += c
-            elif self.state == 'equal_sign':
-                if c in ['"', "'"]:
-                    current_quote_char = c
-                    self.state = 'value'
-            elif self.state == 'value':
-                if c == current_quote_char:
-                    if self.text[i - 1] == '\\':
-                        attibute_value = attibute_value[:-1] + c
-                        continue
-                    attributes[attibute_name.casefold()] = attibute_value
-                    attibute_name = ""
-                    attibute_value = ""
-                    current_quote_char = None
-                    self.state = 'idle'
-                else:
-                    attibute_value += c
-            
-        if attibute_name:
-            attributes[attibute_name.casefold()] = attibute_value
-
-        return attributes
-
-
 @dataclass
 class HTMLParser:
-    HEAD_TAGS = [
+    HEAD_TAGS: ClassVar[set[str]] = {
         'base', 'basefont', 'bgsound', 'noscript',
         'link', 'meta', 'script', 'style', 'title'
-    ]
+    }
 
-    TEXT_STYLE_TAGS = [
-        'b', 'big', 'i', 'small', 'tt', 'abbr', 'acronym', 'cite', 'code', 'u', 'span',
-    ]
+    TEXT_STYLE_TAGS: ClassVar[set[str]] = {
+        'b', 'big', 'i', 'small', 'tt', 'abbr', 'acronym', 'cite', 'code',
+        'u', 'span',
+    }
 
-    CLOSING_TEXT_STYLE_TAGS = list(f'/{tag}' for tag in TEXT_STYLE_TAGS)
+    CLOSING_TEXT_STYLE_TAGS: ClassVar[set[str]] = {
+        f'/{tag}' for tag in TEXT_STYLE_TAGS
+    }
 
     body: str = ""
     unfinished: list[Element] = field(default_factory=list)
+    # Tags of the unfinished elements that are in TEXT_STYLE_TAGS, kept in
+    # step with unfinished by push() and pop()
+    open_text_style_tags: list[str] = field(default_factory=list)
     implicit_opening_tags: list[str] = field(default_factory=list)
 
+    tokenizer: HTMLTokenizer = field(default_factory=HTMLTokenizer)
+    decoder: CharsetDecoder | None = None
+    # Called with every element as it is opened, while the rest of the
+    # document may still be arriving
+    on_element: Callable[[Element], None] | None = None
 
-    def parse(self) -> Element:
-        state_machine = HTMLTokenizerStateMachine()
-        for c in self.body:
-            output = state_machine.feed(c)
-            if output:
-                kind, value = output
-                if kind == "text":
-                    if value:
-                        self.add_text(value)
-                elif kind == "tag":
-                    self.add_tag(value)
-                elif kind == "script":
-                    self.add_text(value)
-                elif kind == "comment":
-                    _comment = state_machine.flush_buffer()
-
-        if state_machine.state == HTMLTokenizerState.TEXT:
-            text = state_machine.flush_buffer()
-            if text:
-                self.add_text(text)
 
+    def parse(self) -> Element:
+        self.feed(self.body)
+        return self.close()
+
+    def feed(self, chunk: str | bytes) -> None:
+        """
+        Parse the next chunk of the document. Chunks may be split anywhere,
+        including inside a tag, a comment, a script or a UTF-8 sequence.
+        """
+        for kind, value in self.tokenizer.feed(self.decode(chunk)):
+            self.handle_token(kind, value)
+
+    def close(self) -> Element:
+        """Flush any pending input and return the document tree."""
+        if self.decoder is not None:
+            self.feed(self.decoder.decode(b"", final=True))
+        for _kind, text in self.tokenizer.close():
+            self.handle_trailing_text(text)
         return self.finish()
 
+    def decode(self, chunk: str | bytes) -> str:
+        if isinstance(chunk, str):
+            return chunk
+        if self.decoder is None:
+            self.decoder = CharsetDecoder()
+        return self.decoder.decode(chunk)
+
+    def handle_token(self, kind: str, value: str) -> None:
+        if kind == "text":
+            if value:
+                self.add_text(value)
+        elif kind == "tag":
+            self.add_tag(value)
+        elif kind == "script":
+            self.add_text(value)
+
+    def handle_trailing_text(self, text: str) -> None:
+        self.add_text(text)
+
     def add_implicit_opening_tags(self) -> None:
         tags = reversed(self.implicit_opening_tags)
         self.implicit_opening_tags = []
         for tag in tags:
             self.add_tag(tag)
 
+    def push(self, node: Element) -> None:
+        self.unfinished.append(node)
+        if node.tag in self.TEXT_STYLE_TAGS:
+            self.open_text_style_tags.append(node.tag)
+
+    def pop(self) -> Element:
+        node = self.unfinished.pop()
+        if node.tag in self.TEXT_STYLE_TAGS:
+            _ = self.open_text_style_tags.pop()
+        return node
+
     def implicit_tags(self, tag: str | None) -> None:
+        # Only looks at the bottom two and the top of the open elements, so
+        # that a tag costs the same however deep the document is nested
         while True:
-            open_tags = [node.tag for node in self.unfinished]
-            if open_tags == [] and tag != 'html':
+            depth = len(self.unfinished)
+            top = self.unfinished[-1].tag if depth else None
+            if depth == 0 and tag != 'html':
                 self.add_tag('html')
-            elif open_tags == ['html'] \
-                    and tag not in ['head', 'body', '/html']:
+            elif depth == 1 and top == 'html' \
+                    and tag not in ('head', 'body', '/html'):
                 if tag in self.HEAD_TAGS:
                     self.add_tag('head')
                 else:
                     self.add_tag('body')
-            elif open_tags == ['html', 'head'] \
-                    and tag not in ['/head'] + self.HEAD_TAGS:
+            elif depth == 2 and top == 'head' \
+                    and self.unfinished[0].tag == 'html' \
+                    and tag != '/head' and tag not in self.HEAD_TAGS:
                 self.add_tag('/head')
-            elif open_tags == ['html', 'body'] \
-                   and tag is not None and tag.startswith('/'):
+            elif depth == 2 and top == 'body' \
+                    and self.unfinished[0].tag == 'html' \
+                    and tag is not None and tag.startswith('/'):
                 break
-            elif len(open_tags) > 0:
-                if open_tags[-1] == 'p' and tag == 'p':
+            elif depth > 0:
+                if top == 'p' and tag == 'p':
                     self.add_tag('/p')
-                elif open_tags[-1] == 'li' and tag == 'li':
+                elif top == 'li' and tag == 'li':
                     self.add_tag('/li')
                 elif (
-                    open_tags[-1] in self.TEXT_STYLE_TAGS and 
+                    top in self.TEXT_STYLE_TAGS and 
                     tag in self.CLOSING_TEXT_STYLE_TAGS and
-                    tag != f'/{open_tags[-1]}'
+                    tag != f'/{top}'
                 ):
-                    open_text_style_tags = reversed(
-                        [node.tag for node in self.unfinished 
-                         if node.tag in self.TEXT_STYLE_TAGS]
-                    )
-
                     closable_tags: list[str] = []
-                    for open_tag in open_text_style_tags:
+                    for open_tag in reversed(self.open_text_style_tags):
                         if tag == f'/{open_tag}':
                             break
                         closable_tags.append(open_tag)
@@ -163,27 +149,19 @@ class HTMLParser:
             else:
                 break           
 
-    def get_attributes(self, text: str) -> tuple[str, dict[str, str]]:
-        parts = text.split()
-        tag = parts[0].casefold()
-        attributes_part = " ".join(parts[1:])
-
-        extractor = AttributesExtractor(text=attributes_part)
-        attributes = extractor.parse()
-
-        return (tag, attributes)
-
     def add_text(self, text: str) -> None:
         if text.isspace():
             return
 
-        unescaped_text = aho_corasick_matcher.replace_all(text)
+        unescaped_text = replace_all(text)
         parent = self.unfinished[-1] 
         node = Text(text=unescaped_text, parent=parent)
         parent.children.append(node)
 
-    def add_tag(self, tag: str) -> None:
-        tag, attributes = self.get_attributes(tag)
+    def add_tag(self, text: str) -> None:
+        tag, end = parse_tag_name(text)
+        # Attributes are parsed from the source when first used
+        source = text if end < len(text) else ""
         if tag.startswith('!'):
             return
 
@@ -191,20 +169,24 @@ class HTMLParser:
             if len(self.unfinished) == 1:
                 return
             self.implicit_tags(tag)
-            node = self.unfinished.pop()
+            node = self.pop()
             parent = self.unfinished[-1]
             parent.children.append(node)
             self.add_implicit_opening_tags()
         elif tag in SELF_CLOSING_TAGS:
             parent = self.unfinished[-1] if self.unfinished else None
-            node = Element(tag=tag, parent=parent, attributes=attributes)
+            node = Element(tag=tag, parent=parent, source=source)
             if parent:
                 parent.children.append(node)
+            if self.on_element is not None:
+                self.on_element(node)
         else:
             self.implicit_tags(tag)
             parent = self.unfinished[-1] if self.unfinished else None
-            node = Element(tag=tag, parent=parent, attributes=attributes)
-            self.unfinished.append(node)
+            node = Element(tag=tag, parent=parent, source=source)
+            self.push(node)
+            if self.on_element is not None:
+                self.on_element(node)
         pass
 
     def finish(self) -> Element:
@@ -212,53 +194,57 @@ class HTMLParser:
             self.implicit_tags(None)
 
         while len(self.unfinished) > 1:
-            node = self.unfinished.pop()
+            node = self.pop()
             parent = self.unfinished[-1]
             parent.children.append(node)
-        return self.unfinished.pop()
+        return self.pop()
 
 
 @dataclass 
 class HTMLViewSourceParser(HTMLParser):
     @override
-    def parse(self) -> Element:
-        state_machine = HTMLTokenizerStateMachine()
-        for c in self.body:
-            output = state_machine.feed(c)
-            if c == '\n':
-                self.add_tag('br')
-            if output:
-                kind, value = output
-                if kind == "text":
-                    if value:
-                        self.add_tag('b')
-                        self.add_text(value)
-                        self.add_tag('/b')
-                elif kind == "tag":
-                    if value.startswith('/'):
-                        self.add_tag("/span")
-                    else:
-                        self.add_tag("span class=\"html-tag\"")
-                    if value.startswith('pre'):
-                        self.add_tag('pre')
-                        self.add_text(f'<{value}>')
-                    elif value.startswith('/pre'):
-                        self.add_tag('/pre')
-                        self.add_text(f'<{value}>')
-                    else:
-                        self.add_text(f'<{value}>')
-                elif kind == "script":
-                    self.add_text(value)
-                elif kind == "comment":
-                    _comment = state_machine.flush_buffer()
-
-        if state_machine.state == HTMLTokenizerState.TEXT:
-            text = state_machine.flush_buffer()
-            if text:
-                self.add_tag('b')
-                self.add_text(text)
-
-        return self.finish()
+    def feed(self, chunk: str | bytes) -> None:
+        text = self.decode(chunk)
+        start = self.tokenizer.position
+        position = 0
+        for kind, value in self.tokenizer.feed(text):
+            # Newlines never complete a token, so every newline consumed
+            # up to this token is rendered before it.
+            end = self.tokenizer.position - start
+            self.add_line_breaks(text, position, end)
+            position = end
+            self.handle_token(kind, value)
+
+        self.add_line_breaks(text, position, len(text))
 
+    @override
+    def handle_token(self, kind: str, value: str) -> None:
+        if kind == "text":
+            if value:
+                self.add_tag('b')
+                self.add_text(value)
+                self.add_tag('/b')
+        elif kind == "tag":
+            if value.startswith('/'):
+                self.add_tag("/span")
+            else:
+                self.add_tag("span class=\"html-tag\"")
+            if value.startswith('pre'):
+                self.add_tag('pre')
+                self.add_text(f'<{value}>')
+            elif value.startswith('/pre'):
+                self.add_tag('/pre')
+                self.add_text(f'<{value}>')
+            else:
+                self.add_text(f'<{value}>')
+        elif kind == "script":
+            self.add_text(value)
 
+    @override
+    def handle_trailing_text(self, text: str) -> None:
+        self.add_tag('b')
+        self.add_text(text)
 
+    def add_line_breaks(self, text: str, start: int, end: int) -> None:
+        for _ in range(text.count('\n', start, end)):
+            self.add_tag('br')
@@ -1,141 +1,217 @@
-from collections import deque
+from array import array
 from dataclasses import dataclass, field
 from enum import Enum
+from html.entities import html5
+import re
 
 
-ENTITIES = {
-    "&amp;": "&",
-    "&lt;": "<",
-    "&gt;": ">",
-    "&quot;": '"',
-    "&apos;": "'",
-    "&#39;": "'",
+# Every named character reference of HTML5, including the legacy ones
+# that may omit the semicolon ("&amp", "&copy")
+ENTITIES = {f"&{name}": replacement for name, replacement in html5.items()}
+
+# "&#39;" or "&#x27;"; the semicolon is optional, as in browsers
+NUMERIC_REFERENCE = re.compile(r"&#(?:[xX]([0-9a-fA-F]+)|([0-9]+));?")
+
+# A numeric reference, or a run of characters that can make up a named
+# one, for EntityDecoder to find the longest entity at the start of
+REFERENCE = re.compile(r"&#(?:[xX][0-9a-fA-F]+|[0-9]+);?|&[0-9A-Za-z]{1,32};?")
+
+DECODED_CACHE_SIZE = 4096
+
+# Numeric references to C1 controls mean the windows-1252 character with
+# that byte, except for the five bytes windows-1252 leaves undefined
+C1_REPLACEMENTS = {
+    code: bytes([code]).decode("cp1252", errors="ignore") or chr(code)
+    for code in range(0x80, 0xA0)
 }
 
+# The dead state, where no pattern continues, and the trie root
+DEAD = 0
+START = 1
+
+
+def decode_numeric_reference(code: int) -> str:
+    if code == 0 or 0xD800 <= code <= 0xDFFF or code > 0x10FFFF:
+        return "\ufffd"
+    return C1_REPLACEMENTS.get(code) or chr(code)
+
+
 class RenderMode(Enum):
     RAW = 1 
     RENDERED = 2
 
 
-@dataclass
-class TrieNode:
-    """Node in the Aho-Corasick automaton."""
-    children: dict[str, 'TrieNode'] = field(default_factory=dict)
-    is_terminal: bool = False  # Marks end of a pattern
-    replacement: str | None = None  # Value to replace matched pattern with
-    failure_link: 'TrieNode | None' = None  # Fallback node on mismatch
-
-
 @dataclass 
-class AhoCorasickMatcher:
+class EntityDecoder:
     """
-    Aho-Corasick algorithm implementation for efficient multi-pattern matching.
-    
-    Uses a trie with failure links to handle overlapping patterns and partial
-    match failures. Useful for entity recognition, text replacement, etc.
+    Replaces character references in text: numeric ones and the named
+    ones added with add_pattern(), "&" followed by ASCII letters and
+    digits and maybe a semicolon.
+
+    compile() turns the patterns into a DFA stored as one flat transition
+    table, with a row per state and a column per character that occurs in
+    the patterns; every other character leads to the dead state. REFERENCE
+    finds candidates and the DFA runs over each one, keeping the longest
+    pattern seen, so "&notin;" is "∉" while "&notit;" is "¬it;" as in
+    browsers.
     """
-    root: TrieNode = field(default_factory=TrieNode)
-    _compiled: bool = False  # Track if failure links are built
-    
+    # The trie the DFA is compiled from, with the root at START
+    trie: list[dict[str, int]] = field(default_factory=lambda: [{}, {}])
+    outputs: list[str | None] = field(default_factory=lambda: [None, None])
+    max_length: int = 0
+
+    # Column of every byte, 0 for those in no pattern; for bytes.translate
+    columns: bytes = bytes(256)
+    # States are numbered by the offset of their row, so that a step is a
+    # single index: transitions[row + column] is the next row, negated when
+    # a pattern ends there
+    transitions: array[int] = field(default_factory=lambda: array("i"))
+    replacements: dict[int, str] = field(default_factory=dict)
+    # Row of the state after the leading "&"
+    first_row: int = DEAD
+    # Pages use the same few references over and over
+    decoded: dict[str, str] = field(default_factory=dict)
+    _compiled: bool = False  # Track if the transition table is built
+
     def add_pattern(self, pattern: str, replacement: str) -> None:
         """
         Insert a pattern and its replacement value into the trie.
         
         Args:
-            pattern: The text pattern to match
+            pattern: The text pattern to match, e.g. "&amp;"
             replacement: The value to replace the pattern with
         """
-        node = self.root
+        if not REFERENCE.fullmatch(pattern) or pattern.startswith("&#"):
+            raise ValueError(f"Not a named character reference: {pattern}")
+
+        state = START
         for char in pattern:
-            if char not in node.children:
-                node.children[char] = TrieNode()
-            node = node.children[char]
-        node.is_terminal = True
-        node.replacement = replacement
-        self._compiled = False  # Need to rebuild failure links
+            next_state = self.trie[state].get(char)
+            if next_state is None:
+                next_state = self.trie[state][char] = len(self.trie)
+                self.trie.append({})
+                self.outputs.append(None)
+            state = next_state
+        self.outputs[state] = replacement
+        self.max_length = max(self.max_length, len(pattern))
+        self._compiled = False  # Need to rebuild the transition table
 
     def compile(self) -> None:
         """
-        Build failure links using BFS traversal.
+        Build the transition table from the trie.
         Must be called after adding all patterns and before matching.
         """
-        queue: deque[TrieNode] = deque()
-        
-        # Level 1 nodes fail back to root
-        for child in self.root.children.values():
-            child.failure_link = self.root
-            queue.append(child)
-        
-        # BFS to build failure links for remaining nodes
-        while queue:
-            current = queue.popleft()
-            
-            for char, child in current.children.items():
-                queue.append(child)
-                
-                # Find the deepest node that matches the suffix
-                fail_node = current.failure_link
-                while fail_node and char not in fail_node.children:
-                    fail_node = fail_node.failure_link
-                
-                child.failure_link = fail_node.children[char] if fail_node else self.root
-                
-                # Inherit terminal status from failure link if needed
-                if child.failure_link.is_terminal and not child.is_terminal:
-                    child.is_terminal = True
-                    child.replacement = child.failure_link.replacement
-        
+        characters = sorted({char for edges in self.trie for char in edges})
+        columns = bytearray(256)
+        for column, char in enumerate(characters, 1):
+            columns[ord(char)] = column
+        self.columns = bytes(columns)
+        width = len(characters) + 1
+
+        def row(state: int) -> int:
+            # Negative rows mark states that complete a reference
+            if self.outputs[state] is not None:
+                return -state * width
+            return state * width
+
+        self.transitions = array("i", bytes(4 * len(self.trie) * width))
+        for state, edges in enumerate(self.trie):
+            for char, next_state in edges.items():
+                column = columns[ord(char)]
+                self.transitions[state * width + column] = row(next_state)
+        self.replacements = {
+            state * width: output
+            for state, output in enumerate(self.outputs)
+            if output is not None
+        }
+        self.first_row = self.trie[START].get("&", DEAD) * width
+        self.decoded.clear()
+
         self._compiled = True
 
+    def decode(self, match: re.Match[str]) -> str:
+        """Replacement for a REFERENCE match, memoized."""
+        reference = match.group()
+        replacement = self.decoded.get(reference)
+        if replacement is None:
+            replacement = self.decode_reference(reference)
+            if len(self.decoded) < DECODED_CACHE_SIZE:
+                self.decoded[reference] = replacement
+        return replacement
+
+    def decode_reference(self, reference: str) -> str:
+        """
+        The longest pattern at the start of reference replaced, with
+        whatever follows it kept as text.
+        """
+        if reference.startswith("&#"):
+            match = NUMERIC_REFERENCE.match(reference)
+            if match is None:
+                return reference
+            hex_digits, digits = match.groups()
+            # Past 0x10FFFF anyway, and int() refuses very long strings
+            if hex_digits:
+                hex_digits = hex_digits.lstrip("0")
+                if len(hex_digits) > 6:
+                    return "�"
+                code = int(hex_digits or "0", 16)
+            else:
+                digits = digits.lstrip("0")
+                if len(digits) > 7:
+                    return "�"
+                code = int(digits or "0")
+            return decode_numeric_reference(code)
+
+        transitions = self.transitions
+        row = self.first_row
+        accepted = DEAD
+        end = 0
+        # REFERENCE only matches ASCII, so every character is one byte
+        columns = reference.encode("ascii").translate(self.columns)
+        for i in range(1, min(len(columns), self.max_length)):
+            row = transitions[row + columns[i]]
+            if row <= 0:
+                if row == DEAD:
+                    break
+                row = accepted = -row
+                end = i + 1
+
+        if accepted == DEAD:
+            return reference
+        return self.replacements[accepted] + reference[end:]
+
     def replace_all(self, text: str) -> str:
         """
-        Scan text and replace all pattern matches with their replacements.
+        Scan text and replace all character references.
         
         Args:
             text: Input text to scan
             
         Returns:
-            Text with all patterns replaced
+            Text with all references replaced
             
         Raises:
             RuntimeError: If compile() hasn't been called
         """
+        if "&" not in text:
+            return text
         if not self._compiled:
             raise RuntimeError("Must call compile() before matching")
-        
-        result: list[str] = []
-        node = self.root
-        i = 0
-        
-        while i < len(text):
-            char = text[i]
-            
-            # Follow failure links until we find a match or reach root
-            while node != self.root and char not in node.children:
-                node = node.failure_link
-            
-            if char in node.children:
-                node = node.children[char]
-            else:
-                # No match from root - keep original character
-                result.append(char)
-                i += 1
-                continue
-            
-            # Check if we've completed a pattern match
-            if node.is_terminal:
-                result.append(node.replacement or '')
-                node = self.root  # Reset to root after match
-            
-            i += 1
-        
-        return ''.join(result)
 
-aho_corasick_matcher = AhoCorasickMatcher()
+        return REFERENCE.sub(self.decode, text)
+
+entity_decoder = EntityDecoder()
 
 for entity, replacement in ENTITIES.items():
-    aho_corasick_matcher.add_pattern(entity, replacement)
-aho_corasick_matcher.compile()
+    entity_decoder.add_pattern(entity, replacement)
+entity_decoder.compile()
+
+
+def replace_all(text: str) -> str:
+    """entity_decoder.replace_all(), skipping the call for text without "&"."""
+    if "&" not in text:
+        return text
+    return entity_decoder.replace_all(text)
 
 
 @dataclass
@@ -164,6 +240,6 @@ class Renderer:
         if self.render_mode == RenderMode.RAW:
             return self.content
         elif self.render_mode == RenderMode.RENDERED:
-            return aho_corasick_matcher.replace_all(self.content)
+            return entity_decoder.replace_all(self.content)
         else:
             raise ValueError("Unsupported render mode")
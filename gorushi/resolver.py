@@ -0,0 +1,161 @@
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+import errno
+import os
+import select
+import socket
+from socket import socket as Socket
+import threading
+import time
+from typing import NamedTuple
+
+
+# getaddrinfo does not expose record TTLs, so entries live this long
+DEFAULT_DNS_TTL = 60.0
+
+# RFC 8305 "Connection Attempt Delay"
+HAPPY_EYEBALLS_DELAY = 0.25
+
+
+# As returned by socket.getaddrinfo
+AddressInfo = tuple[
+    socket.AddressFamily,
+    socket.SocketKind,
+    int,
+    str,
+    tuple[str, int] | tuple[str, int, int, int] | tuple[int, bytes]
+]
+
+
+class DnsCacheKey(NamedTuple):
+    host: str
+    port: int
+
+
+class DnsCacheEntry(NamedTuple):
+    addresses: list[AddressInfo]
+    expires_at: float
+
+
+@dataclass
+class DnsStats:
+    hits: int = 0
+    misses: int = 0
+
+
+def interleave_families(addresses: Sequence[AddressInfo]) -> list[AddressInfo]:
+    """
+    Alternate address families, starting with the family getaddrinfo
+    preferred (RFC 8305 section 4), so a broken IPv6 path costs one
+    attempt delay rather than one per IPv6 address.
+    """
+    by_family: dict[socket.AddressFamily, list[AddressInfo]] = {}
+    for address in addresses:
+        by_family.setdefault(address[0], []).append(address)
+
+    interleaved: list[AddressInfo] = []
+    queues = list(by_family.values())
+    while any(queues):
+        for queue in queues:
+            if queue:
+                interleaved.append(queue.pop(0))
+    return interleaved
+
+
+def happy_eyeballs_connect(
+    addresses: list[AddressInfo],
+    delay: float = HAPPY_EYEBALLS_DELAY,
+    timeout: float | None = None
+) -> Socket:
+    """
+    Connect to the first address that answers. A new attempt starts every
+    `delay` seconds, or as soon as the previous one fails, while the
+    earlier ones stay in flight; the losers are closed.
+    """
+    remaining = list(addresses)
+    pending: list[Socket] = []
+    last_error: OSError | None = None
+    deadline = None if timeout is None else time.monotonic() + timeout
+    next_attempt = time.monotonic()
+
+    try:
+        while remaining or pending:
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                raise TimeoutError("Timed out connecting")
+
+            if remaining and now >= next_attempt:
+                family, kind, proto, _, sockaddr = remaining.pop(0)
+                sock = Socket(family, kind, proto)
+                sock.setblocking(False)
+                error = sock.connect_ex(sockaddr)
+                if error in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+                    pending.append(sock)
+                    next_attempt = now + delay
+                else:
+                    sock.close()
+                    last_error = OSError(error, os.strerror(error))
+                continue
+
+            waits = [next_attempt - now] if remaining else []
+            if deadline is not None:
+                waits.append(deadline - now)
+            _, writable, exceptional = select.select(
+                [], pending, pending, max(0.0, min(waits)) if waits else None
+            )
+            for sock in dict.fromkeys(writable + exceptional):
+                error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                pending.remove(sock)
+                if error == 0:
+                    sock.setblocking(True)
+                    return sock
+                sock.close()
+                last_error = OSError(error, os.strerror(error))
+                # Do not wait out the delay after a failure
+                next_attempt = now
+
+        raise last_error or OSError("No addresses to connect to")
+    finally:
+        for sock in pending:
+            sock.close()
+
+
+@dataclass
+class Resolver:
+    """
+    getaddrinfo results cached per (host, port) for ttl seconds, IPv6 and
+    IPv4 alike. Thread-safe; concurrent misses for the same host may both
+    resolve it.
+    """
+    ttl: float = DEFAULT_DNS_TTL
+
+    entries: dict[DnsCacheKey, DnsCacheEntry] = field(default_factory=dict)
+    stats: DnsStats = field(default_factory=DnsStats)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def resolve(self, host: str, port: int) -> list[AddressInfo]:
+        key = DnsCacheKey(host=host, port=port)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self.stats.hits += 1
+                return entry.addresses
+            self.stats.misses += 1
+
+        addresses = interleave_families(
+            socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        )
+        with self.lock:
+            self.entries[key] = DnsCacheEntry(
+                addresses=addresses, expires_at=now + self.ttl
+            )
+        return addresses
+
+    def connect(self, host: str, port: int) -> Socket:
+        return happy_eyeballs_connect(self.resolve(host, port))
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.stats = DnsStats()
@@ -0,0 +1,111 @@
+from dataclasses import dataclass, field
+from socket import socket as Socket
+import ssl
+import threading
+from typing import NamedTuple
+
+
+class TLSConfig(NamedTuple):
+    # Extra CA bundle to trust on top of the system store, e.g. for a
+    # local server with a self-signed certificate
+    cafile: str | None = None
+
+
+class TLSSessionKey(NamedTuple):
+    host: str
+    port: int
+
+
+class TLSSavedSession(NamedTuple):
+    # A session can only be resumed with the context that created it
+    context: ssl.SSLContext
+    session: ssl.SSLSession
+
+
+@dataclass
+class TLSStats:
+    contexts_created: int = 0
+    full_handshakes: int = 0
+    resumed_handshakes: int = 0
+
+
+@dataclass
+class TLSContextCache:
+    """
+    Client SSLContexts, one per TLSConfig, built on first use and shared
+    by every socket since loading the CA store is the expensive part. The
+    TLS session of the last connection to each host is kept so that the
+    next one resumes it instead of doing a full handshake, as long as it
+    uses the same context.
+    """
+    contexts: dict[TLSConfig, ssl.SSLContext] = field(default_factory=dict)
+    sessions: dict[TLSSessionKey, TLSSavedSession] = field(
+        default_factory=dict
+    )
+    stats: TLSStats = field(default_factory=TLSStats)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def context(self, config: TLSConfig) -> ssl.SSLContext:
+        with self.lock:
+            context = self.contexts.get(config)
+            if context is None:
+                context = ssl.create_default_context(cafile=config.cafile)
+                if config.cafile is not None:
+                    context.load_default_certs()
+                self.contexts[config] = context
+                self.stats.contexts_created += 1
+            return context
+
+    def wrap_socket(
+        self,
+        sock: Socket,
+        host: str,
+        port: int,
+        config: TLSConfig
+    ) -> ssl.SSLSocket:
+        """Handshake over sock, resuming the last session with host if any."""
+        context = self.context(config)
+        with self.lock:
+            saved = self.sessions.get(TLSSessionKey(host=host, port=port))
+        # The config changed since the session was saved
+        if saved is not None and saved.context is not context:
+            saved = None
+        tls_socket = context.wrap_socket(
+            sock,
+            server_hostname=host,
+            session=saved.session if saved is not None else None
+        )
+        with self.lock:
+            if tls_socket.session_reused:
+                self.stats.resumed_handshakes += 1
+            else:
+                self.stats.full_handshakes += 1
+        return tls_socket
+
+    def save_session(
+        self,
+        tls_socket: ssl.SSLSocket,
+        host: str,
+        port: int
+    ) -> None:
+        """
+        Remember the session of tls_socket for the next connection to host.
+        With TLS 1.3 the session ticket only arrives after the handshake,
+        so this is done once a response has been read.
+        """
+        session = tls_socket.session
+        if session is None:
+            return
+        if tls_socket.version() == "TLSv1.3" and not session.has_ticket:
+            return
+        with self.lock:
+            key = TLSSessionKey(host=host, port=port)
+            self.sessions[key] = TLSSavedSession(
+                context=tls_socket.context, session=session
+            )
+
+    def clear(self) -> None:
+        with self.lock:
+            self.contexts.clear()
+            self.sessions.clear()
+            self.stats = TLSStats()
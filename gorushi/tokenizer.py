@@ -0,0 +1,181 @@
+from collections.abc import Iterator
+import re
+from dataclasses import dataclass, field
+
+from gorushi.state_machine import HTMLTokenizerState
+
+
+Token = tuple[str, str]
+
+# Characters that can change the state while inside a tag
+TAG_SPECIAL_CHARS = re.compile(r"[>\-\"']")
+
+COMMENT_OPEN = "<!-"
+COMMENT_CLOSE = "-->"
+SCRIPT_OPEN = "<script>"
+SCRIPT_CLOSE = "</script>"
+
+
+@dataclass
+class HTMLTokenizer:
+    """
+    Run-based HTML tokenizer.
+
+    Emits the same ("text"|"tag"|"comment"|"script", value) token stream
+    as feeding HTMLTokenizerStateMachine one character at a time the way
+    HTMLParser used to, but scans whole text runs, comments, scripts and
+    attribute values with str.find and compiled regexes.
+
+    State is kept between feed() calls, so the input can be split into
+    chunks at any position.
+    """
+    buffer: list[str] = field(default_factory=list)
+    state: HTMLTokenizerState = HTMLTokenizerState.TEXT
+    attribution_qoute_char: str | None = None
+
+    # Offset (over all fed input) just past the character that produced
+    # the most recently emitted token.
+    position: int = 0
+
+    def flush_buffer(self) -> str:
+        result = "".join(self.buffer)
+        self.buffer = []
+        return result
+
+    def _tail(self, n: int) -> str:
+        tail = ""
+        for piece in reversed(self.buffer):
+            tail = piece + tail
+            if len(tail) >= n:
+                break
+        return tail[-n:]
+
+    def _find_across(self, data: str, pos: int, needle: str) -> int:
+        """
+        Find the end offset in data of the first needle occurrence that
+        ends at or after pos, taking the buffered tail into account.
+        Returns -1 if there is none.
+        """
+        tail = self._tail(len(needle) - 1)
+        head = tail + data[pos:pos + len(needle) - 1]
+        index = head.find(needle)
+        if index != -1:
+            return pos + index + len(needle) - len(tail)
+
+        index = data.find(needle, pos)
+        if index != -1:
+            return index + len(needle)
+        return -1
+
+    def feed(self, data: str) -> Iterator[Token]:
+        """
+        Tokenize the next chunk of input.
+
+        The returned iterator must be exhausted before feeding more input.
+        """
+        base = self.position
+        pos = 0
+        end = len(data)
+
+        while pos < end:
+            if self.state == HTMLTokenizerState.TEXT:
+                index = data.find("<", pos)
+                if index == -1:
+                    self.buffer.append(data[pos:])
+                    break
+                self.buffer.append(data[pos:index])
+                text = self.flush_buffer()
+                self.buffer = ["<"]
+                self.state = HTMLTokenizerState.TAG_OPEN
+                pos = index + 1
+                self.position = base + pos
+                yield ("text", text)
+
+            elif self.state == HTMLTokenizerState.TAG_OPEN:
+                match = TAG_SPECIAL_CHARS.search(data, pos)
+                if match is None:
+                    self.buffer.append(data[pos:])
+                    break
+                index = match.start()
+                c = data[index]
+                if index > pos:
+                    self.buffer.append(data[pos:index])
+                pos = index + 1
+
+                if c == "-":
+                    if self._tail(len(COMMENT_OPEN)) == COMMENT_OPEN:
+                        self.state = HTMLTokenizerState.COMMENT
+                    self.buffer.append(c)
+                elif c == ">":
+                    tag = self.flush_buffer() + c
+                    self.position = base + pos
+                    if tag.endswith(SCRIPT_OPEN):
+                        self.buffer = [tag[:-len(SCRIPT_OPEN)]]
+                        self.state = HTMLTokenizerState.SCRIPT_DATA
+                        yield ("tag", "script")
+                    else:
+                        # Mirrors the state machine, which trims the
+                        # stripped content length off the buffer.
+                        content = tag[1:-1].strip()
+                        self.buffer = [tag[:-len(content) - 2]]
+                        self.state = HTMLTokenizerState.TEXT
+                        yield ("tag", content)
+                else:
+                    if self._tail(1) == "=":
+                        self.attribution_qoute_char = c
+                        self.state = HTMLTokenizerState.ATTRIBUTE_OPEN
+                    self.buffer.append(c)
+
+            elif self.state == HTMLTokenizerState.ATTRIBUTE_OPEN:
+                quote = self.attribution_qoute_char
+                assert quote is not None
+                # HTML has no escapes inside quoted values, as in
+                # attributes.parse_tag()
+                index = data.find(quote, pos)
+                if index == -1:
+                    self.buffer.append(data[pos:])
+                    break
+                self.buffer.append(data[pos:index + 1])
+                pos = index + 1
+                self.state = HTMLTokenizerState.TAG_OPEN
+
+            elif self.state == HTMLTokenizerState.COMMENT:
+                index = self._find_across(data, pos, COMMENT_CLOSE)
+                if index == -1:
+                    self.buffer.append(data[pos:])
+                    break
+                self.buffer.append(data[pos:index])
+                pos = index
+                # HTMLParser discards comments, so the buffer is flushed
+                comment = self.flush_buffer()
+                self.state = HTMLTokenizerState.TEXT
+                self.position = base + pos
+                yield ("comment", comment)
+
+            elif self.state == HTMLTokenizerState.SCRIPT_DATA:
+                index = self._find_across(data, pos, SCRIPT_CLOSE)
+                if index == -1:
+                    self.buffer.append(data[pos:])
+                    break
+                self.buffer.append(data[pos:index])
+                pos = index
+                # Like the state machine, the script body stays buffered
+                script = self.flush_buffer()[:-len(SCRIPT_CLOSE)]
+                self.buffer = [script]
+                self.state = HTMLTokenizerState.TEXT
+                self.position = base + pos
+                yield ("script", script)
+
+        self.position = base + end
+
+    def close(self) -> Iterator[Token]:
+        """
+        Flush the trailing text run. Unterminated tags, comments and
+        scripts are dropped.
+        """
+        if self.state == HTMLTokenizerState.TEXT:
+            text = self.flush_buffer()
+            if text:
+                yield ("text", text)
+        else:
+            self.buffer = []
@@ -1,4 +1,9 @@
 from dataclasses import dataclass
+import re
+
+
+# An absolute URL or one with a scheme parse() does not fetch, e.g. mailto:
+SCHEME = re.compile(r"[A-Za-z][A-Za-z0-9+.-]*:")
 
 
 @dataclass
@@ -98,4 +103,32 @@ class URL:
                 host="",
                 port=0,
             )
-        
+
+    def resolve(self, href: str) -> "URL":
+        """
+        Resolve a link found in this page: absolute, scheme- or root-relative,
+        or relative. Fragments are dropped, so "" and "#frag" are this page.
+        Links with other schemes, e.g. mailto: or javascript:, go through
+        parse(), which makes them about:blank.
+        """
+        href = href.split("#", 1)[0]
+        if SCHEME.match(href):
+            return URL.parse(href)
+        if href.startswith("//"):
+            return URL.parse(f"{self.scheme}:{href}")
+        if not href:
+            return self
+
+        path = self.path.split("?", 1)[0]
+        if href.startswith("?"):
+            href = f"{path}{href}"
+        elif not href.startswith("/"):
+            directory, _ = path.rsplit("/", 1)
+            while href.startswith("../"):
+                _, href = href.split("/", 1)
+                if "/" in directory:
+                    directory, _ = directory.rsplit("/", 1)
+            href = f"{directory}/{href}"
+        if self.scheme == "file":
+            return URL.parse(f"file://{href}")
+        return URL.parse(f"{self.scheme}://{self.host}:{self.port}{href}")
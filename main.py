@@ -3,6 +3,8 @@ import sys
 import argparse
 
 from gorushi.browser import Browser
+from gorushi.cache import DEFAULT_DISK_CACHE_DIR, DiskCache
+from gorushi.connection import Connection
 from gorushi.url import URL
 
 # recursion limit increase for deep HTML trees
@@ -16,10 +18,16 @@ argparser.add_argument("--width")
 argparser.add_argument("--height")
 argparser.add_argument("--ltr")
 argparser.add_argument("--center")
+argparser.add_argument("--disk-cache")
+argparser.add_argument("--cache-dir")
 args = argparser.parse_args()
 
 
 if __name__ == "__main__":
+    if args.disk_cache != "false":
+        Connection.disk_cache = DiskCache(
+            directory=args.cache_dir or DEFAULT_DISK_CACHE_DIR
+        )
     browser = Browser(
         width=args.width or 800,
         height=args.height or 600,
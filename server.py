@@ -1,12 +1,16 @@
 from datetime import datetime
+from email.utils import formatdate
 from math import ceil
 from typing import AsyncGenerator, Optional
 
 import gzip
+import hashlib
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.responses import (
+    JSONResponse, PlainTextResponse, Response, StreamingResponse
+)
 
 app = FastAPI(title="Browser Caching & Compression Testbed")
 
@@ -41,6 +45,28 @@ def cache_endpoint(mode: Optional[str] = None) -> PlainTextResponse:
     return response
 
 
+ETAG_BODY = ("Hello ETag! " * 4096).encode("utf-8")
+ETAG_VALUE = f'"{hashlib.sha256(ETAG_BODY).hexdigest()[:16]}"'
+ETAG_LAST_MODIFIED = formatdate(0, usegmt=True)
+
+
+@app.get("/etag")
+def etag_endpoint(request: Request, validators: bool = True) -> Response:
+    # max-age=0 makes every cached copy stale, so each request exercises
+    # revalidation.
+    headers = {"Cache-Control": "max-age=0"}
+    if validators:
+        headers["ETag"] = ETAG_VALUE
+        headers["Last-Modified"] = ETAG_LAST_MODIFIED
+        if_none_match = request.headers.get("if-none-match")
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_none_match == ETAG_VALUE or (
+            if_none_match is None and if_modified_since == ETAG_LAST_MODIFIED
+        ):
+            return Response(status_code=304, headers=headers)
+    return PlainTextResponse(ETAG_BODY, headers=headers)
+
+
 @app.get("/gzip")
 async def gzip_endpoint(request: Request):
     body = b"Hello GZip"
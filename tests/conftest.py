@@ -0,0 +1,394 @@
+import gzip
+import hashlib
+import os
+import queue
+import socket
+import ssl
+import sys
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from gorushi.connection import Connection
+from gorushi.tls import TLSConfig
+
+
+ETAG_BODY = ("Hello ETag! " * 4096).encode("utf-8")
+ETAG_VALUE = f'"{hashlib.sha256(ETAG_BODY).hexdigest()[:16]}"'
+ETAG_LAST_MODIFIED = formatdate(0, usegmt=True)
+
+CERTS_DIR = os.path.join(os.path.dirname(__file__), "certs")
+TLS_CERTFILE = os.path.join(CERTS_DIR, "localhost.pem")
+TLS_KEYFILE = os.path.join(CERTS_DIR, "localhost.key")
+
+
+@dataclass
+class LocalServerStats:
+    bytes_sent: int = 0
+    requests: list[dict[str, str]] = field(default_factory=list)
+    # Requests being handled right now, and the most seen at once
+    in_flight: int = 0
+    max_in_flight: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def record_request(self, headers: dict[str, str]) -> None:
+        with self.lock:
+            self.requests.append(headers)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def record_response(self) -> None:
+        with self.lock:
+            self.in_flight -= 1
+
+    def record_bytes(self, count: int) -> None:
+        with self.lock:
+            self.bytes_sent += count
+
+
+class CountingWriter:
+    def __init__(self, wfile, stats: LocalServerStats):
+        self.wfile = wfile
+        self.stats = stats
+
+    def write(self, data: bytes) -> int:
+        self.stats.record_bytes(len(data))
+        return self.wfile.write(data)
+
+    def __getattr__(self, name: str):
+        return getattr(self.wfile, name)
+
+
+class LocalHandler(BaseHTTPRequestHandler):
+    """HTTP/1.1 keep-alive handler standing in for server.py in tests."""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "LocalServer"
+
+    def setup(self) -> None:
+        super().setup()
+        self.wfile = CountingWriter(self.wfile, self.server.stats)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+    def send_body(
+        self,
+        body: bytes,
+        status: int = 200,
+        headers: dict[str, str] | None = None
+    ) -> None:
+        self.send_response(status)
+        for header, value in (headers or {}).items():
+            self.send_header(header, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        self.server.stats.record_request(
+            {k.casefold(): v for k, v in self.headers.items()}
+        )
+        try:
+            self.respond()
+        finally:
+            self.server.stats.record_response()
+
+    def respond(self) -> None:
+        parts = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+
+        if parts.path == "/etag":
+            self.etag(query)
+        elif parts.path == "/gzip":
+            self.compressed(query)
+        elif parts.path.startswith("/redirect/"):
+            self.redirect(int(parts.path[len("/redirect/"):]), parts.query)
+        elif parts.path == "/charset":
+            # /charset?charset=shift_jis&meta=1
+            charset = query.get("charset", "utf-8")
+            page = "<p>こんにちは、世界</p>" * 200
+            if query.get("meta") == "1":
+                self.send_body(
+                    f'<meta charset="{charset}">{page}'.encode(charset),
+                    headers={"Content-Type": "text/html"},
+                )
+            else:
+                self.send_body(
+                    page.encode(charset),
+                    headers={"Content-Type": f"text/html; charset={charset}"},
+                )
+        elif parts.path == "/links":
+            # /links?close=1: a page linking to another one, then a long
+            # tail; close=1 drops the keep-alive connection afterwards
+            self.close_connection = query.get("close") == "1"
+            headers = {"Connection": "close"} if self.close_connection else {}
+            self.send_body(
+                b'<a href="/links">next</a>' + b"<p>tail</p>" * 4096,
+                headers=headers,
+            )
+        elif parts.path == "/close":
+            # Answer, then drop the keep-alive connection
+            self.close_connection = True
+            self.send_body(b"Closing", headers={"Connection": "close"})
+        else:
+            # Simulated server latency, e.g. /page?delay=0.05
+            time.sleep(float(query.get("delay", 0)))
+            self.send_body(f"Hello {parts.path}".encode("utf-8"))
+
+    def compressed(self, query: dict[str, str]) -> None:
+        """
+        Same shape as server.py's /gzip: gzip in 16-byte chunks. The
+        encoding (gzip, deflate, raw-deflate) and framing (chunked, length,
+        close) can be changed through the query.
+        """
+        body = query.get("body", "Hello GZip").encode("utf-8")
+        encoding = query.get("encoding", "gzip")
+        if encoding == "gzip":
+            compressed = gzip.compress(body)
+        elif encoding == "deflate":
+            compressed = zlib.compress(body)
+        else:
+            deflater = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+            compressed = deflater.compress(body) + deflater.flush()
+
+        framing = query.get("framing", "chunked")
+        self.send_response(200)
+        self.send_header(
+            "Content-Encoding",
+            "deflate" if encoding == "raw-deflate" else encoding
+        )
+        if framing == "length":
+            self.send_header("Content-Length", str(len(compressed)))
+        elif framing == "close":
+            self.close_connection = True
+            self.send_header("Connection", "close")
+        else:
+            self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        for index in range(0, len(compressed), 16):
+            chunk = compressed[index:index + 16]
+            if framing == "chunked":
+                self.wfile.write(
+                    f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n"
+                )
+            else:
+                self.wfile.write(chunk)
+        if framing == "chunked":
+            self.wfile.write(b"0\r\n\r\n")
+
+    def redirect(self, hops: int, query: str = "") -> None:
+        """
+        /redirect/N redirects N times before the final page. The query
+        (e.g. status=301, cache_control=max-age=60) is passed along.
+        """
+        if hops > 0:
+            options = {k: v[0] for k, v in parse_qs(query).items()}
+            location = f"/redirect/{hops - 1}" + (f"?{query}" if query else "")
+            headers = {"Location": location}
+            if "cache_control" in options:
+                headers["Cache-Control"] = options["cache_control"]
+            self.send_body(
+                b"", status=int(options.get("status", 302)), headers=headers
+            )
+        else:
+            self.send_body(b"Final destination reached.")
+
+    def etag(self, query: dict[str, str]) -> None:
+        headers = {"Cache-Control": "max-age=0"}
+        if query.get("validators") != "0":
+            headers["ETag"] = ETAG_VALUE
+            headers["Last-Modified"] = ETAG_LAST_MODIFIED
+            if_none_match = self.headers.get("If-None-Match")
+            if_modified_since = self.headers.get("If-Modified-Since")
+            if if_none_match == ETAG_VALUE or (
+                if_none_match is None
+                and if_modified_since == ETAG_LAST_MODIFIED
+            ):
+                self.send_body(b"", status=304, headers=headers)
+                return
+        self.send_body(ETAG_BODY, headers=headers)
+
+
+class LocalServer(ThreadingHTTPServer):
+    daemon_threads = True
+    stats: LocalServerStats
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class LocalTLSServer(LocalServer):
+    """LocalServer over TLS with the self-signed certificate in certs/."""
+
+    def __init__(
+        self,
+        server_address: tuple[str, int],
+        handler: type[BaseHTTPRequestHandler]
+    ):
+        super().__init__(server_address, handler)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(TLS_CERTFILE, TLS_KEYFILE)
+        self.socket = context.wrap_socket(
+            self.socket, server_side=True, do_handshake_on_connect=False
+        )
+
+    def finish_request(self, request, client_address) -> None:
+        # Handshake in the request thread rather than in accept()
+        try:
+            request.do_handshake()
+        except (ssl.SSLError, OSError):
+            return
+        super().finish_request(request, client_address)
+
+    def handle_error(self, request, client_address) -> None:
+        # Benchmarks hang up right after the handshake
+        if isinstance(sys.exc_info()[1], OSError):
+            return
+        super().handle_error(request, client_address)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"https://{host}:{port}"
+
+
+class LatencyProxy:
+    """
+    TCP proxy adding a fixed one-way delay in both directions, so that
+    round trips to a local server cost what they would over a network.
+    Data is delayed, not throttled: bytes sent back to back still arrive
+    back to back, latency later.
+    """
+
+    def __init__(self, target: tuple[str, int], latency: float):
+        self.target = target
+        self.latency = latency
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.closed = threading.Event()
+        # Separate reads of client data, i.e. round trips the clients made
+        self.client_reads = 0
+        threading.Thread(target=self.accept_loop, daemon=True).start()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.listener.getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def accept_loop(self) -> None:
+        while not self.closed.is_set():
+            try:
+                client, _ = self.listener.accept()
+            except OSError:
+                return
+            upstream = socket.create_connection(self.target)
+            for sock in (client, upstream):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.pipe(client, upstream, from_client=True)
+            self.pipe(upstream, client)
+
+    def pipe(
+        self,
+        source: socket.socket,
+        destination: socket.socket,
+        from_client: bool = False
+    ) -> None:
+        pending: queue.Queue[tuple[float, bytes]] = queue.Queue()
+
+        def receive() -> None:
+            while True:
+                try:
+                    data = source.recv(65536)
+                except OSError:
+                    data = b""
+                if data and from_client:
+                    self.client_reads += 1
+                pending.put((time.monotonic() + self.latency, data))
+                if not data:
+                    return
+
+        def send() -> None:
+            while True:
+                due, data = pending.get()
+                time.sleep(max(0.0, due - time.monotonic()))
+                try:
+                    if not data:
+                        destination.shutdown(socket.SHUT_WR)
+                        return
+                    destination.sendall(data)
+                except OSError:
+                    return
+
+        threading.Thread(target=receive, daemon=True).start()
+        threading.Thread(target=send, daemon=True).start()
+
+    def close(self) -> None:
+        self.closed.set()
+        self.listener.close()
+
+
+def reset_connection_state() -> None:
+    Connection.connection_pool.clear()
+    Connection.browser_cache.clear()
+    Connection.redirect_cache.clear()
+    Connection.resolver.clear()
+    Connection.tls.clear()
+
+
+@pytest.fixture
+def local_server() -> Iterator[LocalServer]:
+    """Serve LocalHandler on an ephemeral port with a clean Connection."""
+    reset_connection_state()
+    server = LocalServer(("127.0.0.1", 0), LocalHandler)
+    server.stats = LocalServerStats()
+    thread = threading.Thread(
+        target=server.serve_forever, args=(0.05,), daemon=True
+    )
+    thread.start()
+    try:
+        yield server
+    finally:
+        reset_connection_state()
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def latency_proxy(local_server: LocalServer) -> Iterator[LatencyProxy]:
+    """local_server behind a LatencyProxy with a 10ms one-way delay."""
+    proxy = LatencyProxy(local_server.server_address[:2], latency=0.01)
+    try:
+        yield proxy
+    finally:
+        proxy.close()
+
+
+@pytest.fixture
+def tls_server() -> Iterator[LocalServer]:
+    """LocalTLSServer on an ephemeral port, trusted by Connection."""
+    reset_connection_state()
+    tls_config = Connection.tls_config
+    Connection.tls_config = TLSConfig(cafile=TLS_CERTFILE)
+    server = LocalTLSServer(("127.0.0.1", 0), LocalHandler)
+    server.stats = LocalServerStats()
+    thread = threading.Thread(
+        target=server.serve_forever, args=(0.05,), daemon=True
+    )
+    thread.start()
+    try:
+        yield server
+    finally:
+        Connection.tls_config = tls_config
+        reset_connection_state()
+        server.shutdown()
+        server.server_close()
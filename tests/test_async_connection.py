@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from conftest import LocalServer
+from gorushi.async_connection import AsyncConnection, fetch_many
+from gorushi.connection import Connection
+from gorushi.url import URL
+
+
+@pytest.mark.ci
+def test_fetch_many_preserves_order(local_server: LocalServer):
+    urls = [URL.parse(f"{local_server.base_url}/page{i}") for i in range(20)]
+    contents = fetch_many(urls, concurrency=4)
+    assert contents == [f"Hello /page{i}" for i in range(20)]
+
+
+@pytest.mark.ci
+def test_fetch_many_matches_sequential_connection(local_server: LocalServer):
+    paths = ["/gzip?body=async", "/redirect/3", "/etag", "/plain"]
+    urls = [URL.parse(f"{local_server.base_url}{path}") for path in paths]
+    conn = Connection(http_options={"http_version": "1.0"})
+    expected = [conn.request(url=url) for url in urls]
+
+    Connection.browser_cache.clear()
+    assert fetch_many(urls, concurrency=2) == expected
+
+
+@pytest.mark.ci
+def test_fetch_many_matches_pooled_connection(local_server: LocalServer):
+    paths = ["/gzip?body=async", "/redirect/3", "/etag", "/plain"]
+    urls = [URL.parse(f"{local_server.base_url}{path}") for path in paths]
+    conn = Connection(http_options={"http_version": "1.1"})
+    expected = [conn.request(url=url) for url in urls]
+    assert Connection.connection_pool.stats.reused > 0
+
+    Connection.browser_cache.clear()
+    assert fetch_many(urls, concurrency=2) == expected
+
+
+@pytest.mark.ci
+def test_async_connection_reuses_streams(local_server: LocalServer):
+    async def run() -> int:
+        connection = AsyncConnection(http_options={"http_version": "1.1"})
+        for i in range(5):
+            url = URL.parse(f"{local_server.base_url}/{i}")
+            await connection.fetch(url=url)
+        pooled = sum(len(idle) for idle in connection.stream_pool.values())
+        await connection.aclose()
+        return pooled
+
+    assert asyncio.run(run()) == 1
+
+
+@pytest.mark.ci
+def test_async_connection_retries_once_on_dead_reused_stream(
+    local_server: LocalServer,
+    monkeypatch: pytest.MonkeyPatch
+):
+    async def run() -> tuple[str, bool]:
+        connection = AsyncConnection(http_options={"http_version": "1.1"})
+        await connection.fetch(url=URL.parse(f"{local_server.base_url}/first"))
+
+        # The server closes the idle stream just after the liveness check
+        monkeypatch.setattr(asyncio.StreamReader, "at_eof", lambda self: False)
+        (idle,) = connection.stream_pool.values()
+        _, writer = idle.pop()
+        dead = asyncio.StreamReader()
+        dead.feed_eof()
+        idle.append((dead, writer))
+
+        url = URL.parse(f"{local_server.base_url}/second")
+        content = await connection.fetch(url=url)
+        closed = writer.is_closing()
+        await connection.aclose()
+        return content, closed
+
+    assert asyncio.run(run()) == ("Hello /second", True)
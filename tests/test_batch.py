@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from gorushi.batch import render_batch, render_document, warm_worker
+from gorushi.layout import FONT_CACHE
+from gorushi import fonts
+
+
+DEMO_DIR = os.path.join(os.path.dirname(__file__), "..", "demo")
+
+DEMO_FILES = [
+    os.path.join(DEMO_DIR, filename)
+    for filename in sorted(os.listdir(DEMO_DIR))
+]
+
+
+@pytest.fixture
+def warm_process():
+    previous = fonts._font_backend
+    FONT_CACHE.clear()
+    warm_worker()
+    try:
+        yield
+    finally:
+        fonts.set_font_backend(previous)
+        FONT_CACHE.clear()
+
+
+@pytest.mark.ci
+def test_render_document(warm_process):
+    result = render_document(DEMO_FILES[0], include_display_list=True)
+    assert result.error is None
+    assert result.commands == len(result.display_list or []) > 0
+    assert result.words > 0
+    assert result.fonts_created == 0
+
+
+@pytest.mark.ci
+def test_render_document_reports_errors(warm_process):
+    result = render_document(os.path.join(DEMO_DIR, "missing.html"))
+    assert result.error is not None
+    assert result.error.startswith("FileNotFoundError")
+
+
+@pytest.mark.ci
+def test_render_batch_matches_in_process_rendering(warm_process):
+    sources = DEMO_FILES * 3
+    expected = [render_document(source) for source in sources]
+    results = render_batch(sources, max_workers=2, chunksize=2)
+
+    assert [result.source for result in results] == sources
+    assert [result.digest for result in results] == [
+        result.digest for result in expected
+    ]
+    assert len({result.worker for result in results}) <= 2
+    assert os.getpid() not in {result.worker for result in results}
+    # Fonts were created when each worker started, not by the tasks
+    assert all(result.fonts_created == 0 for result in results)
@@ -0,0 +1,41 @@
+import pytest
+
+from gorushi.browser import Browser
+from gorushi.connection import Connection
+from gorushi.url import URL
+
+from conftest import LocalServer
+
+
+def wait_for_preconnects() -> None:
+    Browser.preconnector.submit(lambda: None).result()
+
+
+@pytest.mark.ci
+@pytest.mark.parametrize("close", ["1", "0"])
+def test_navigation_reuses_socket_warmed_while_parsing(
+    local_server: LocalServer, close: str
+):
+    page = URL.parse(f"{local_server.base_url}/links?close={close}")
+    _, nodes = Browser.fetch(page)
+    assert nodes.tag == "html"
+    wait_for_preconnects()
+
+    stats = Connection.connection_pool.stats
+    # The page's own socket, and one warmed for the link
+    assert stats.created == 2
+    idle = [
+        pooled
+        for sockets in Connection.connection_pool.idle.values()
+        for pooled in sockets
+    ]
+    assert len(idle) == (1 if close == "1" else 2)
+    warmed = next(pooled for pooled in idle if not pooled.reused)
+
+    _, nodes = Browser.fetch(page.resolve("/links"))
+    assert nodes.tag == "html"
+    assert stats.reused == 1
+    if close == "1":
+        # The only socket left was the warmed one
+        assert warmed.reused
+    wait_for_preconnects()
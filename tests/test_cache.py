@@ -0,0 +1,187 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from gorushi.cache import (
+    BrowserCacheEntry, BrowserCacheKey, DiskCache, MemoryCache
+)
+from gorushi.connection import Connection
+
+
+def entry(content: str, max_age: int = 60) -> BrowserCacheEntry:
+    return BrowserCacheEntry(
+        content=content, max_age=max_age, timestamp=datetime.now()
+    )
+
+
+####
+# Disk Cache Tests
+####
+
+@pytest.mark.ci
+@pytest.mark.cache
+def test_disk_cache_survives_restart(tmp_path):
+    key = BrowserCacheKey(url="http://example.org/")
+    DiskCache(directory=str(tmp_path)).put(key, entry("Hello 안녕"))
+
+    cached = DiskCache(directory=str(tmp_path)).get(key)
+    assert cached is not None
+    assert cached.content == "Hello 안녕"
+    assert cached.max_age == 60
+
+
+@pytest.mark.ci
+@pytest.mark.cache
+def test_disk_cache_expired_entry_is_a_miss(tmp_path):
+    cache = DiskCache(directory=str(tmp_path))
+    key = BrowserCacheKey(url="http://example.org/")
+    cache.put(key, BrowserCacheEntry(
+        content="old",
+        max_age=5,
+        timestamp=datetime.now() - timedelta(seconds=10)
+    ))
+    assert cache.get(key) is None
+    assert os.listdir(tmp_path / "index") == []
+
+
+@pytest.mark.ci
+@pytest.mark.cache
+def test_disk_cache_is_content_addressed(tmp_path):
+    cache = DiskCache(directory=str(tmp_path))
+    cache.put(BrowserCacheKey(url="http://a.org/"), entry("same body"))
+    cache.put(BrowserCacheKey(url="http://b.org/"), entry("same body"))
+    assert len(os.listdir(tmp_path / "index")) == 2
+    assert len(os.listdir(tmp_path / "objects")) == 1
+
+
+@pytest.mark.ci
+@pytest.mark.cache
+def test_disk_cache_pop(tmp_path):
+    cache = DiskCache(directory=str(tmp_path))
+    key = BrowserCacheKey(url="http://example.org/")
+    cache.put(key, entry("body"))
+    cache.pop(key)
+    assert cache.get(key) is None
+
+
+@pytest.mark.ci
+@pytest.mark.cache
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(directory=str(tmp_path), max_size=350)
+    keys = [BrowserCacheKey(url=f"http://example.org/{i}") for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, entry(str(i) * 100))
+        # Make the access order unambiguous regardless of mtime resolution
+        os.utime(cache._index_path(key), (i, i))
+
+    # Touch the oldest entry so the second one becomes least recently used
+    assert cache.get(keys[0]) is not None
+    cache.put(BrowserCacheKey(url="http://example.org/new"), entry("n" * 100))
+
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.size() <= 350
+
+
+@pytest.mark.ci
+@pytest.mark.cache
+def test_disk_cache_only_rescans_when_over_budget(tmp_path, monkeypatch):
+    cache = DiskCache(directory=str(tmp_path), max_size=350)
+    scans = []
+    object_sizes = cache._object_sizes
+    monkeypatch.setattr(
+        cache, "_object_sizes", lambda: scans.append(1) or object_sizes()
+    )
+    for i in range(3):
+        key = BrowserCacheKey(url=f"http://example.org/{i}")
+        cache.put(key, entry(str(i) * 100))
+    assert len(scans) == 1
+
+    cache.put(BrowserCacheKey(url="http://example.org/new"), entry("n" * 100))
+    assert len(scans) == 2
+    assert cache.size() <= 350
+
+
+@pytest.mark.ci
+@pytest.mark.cache
+def test_disk_cache_fresh_lookup_skips_stale_body(tmp_path, monkeypatch):
+    cache = DiskCache(directory=str(tmp_path))
+    key = BrowserCacheKey(url="http://example.org/")
+    cache.put(key, BrowserCacheEntry(
+        content="old",
+        max_age=5,
+        timestamp=datetime.now() - timedelta(seconds=10),
+        etag='"v1"',
+    ))
+    reads = []
+    read_object = cache._read_object
+    monkeypatch.setattr(
+        cache,
+        "_read_object",
+        lambda digest: reads.append(digest) or read_object(digest),
+    )
+
+    assert cache.get(key, fresh=True) is None
+    assert reads == []
+    stale = cache.get(key)
+    assert stale is not None and stale.content == "old"
+    assert len(reads) == 1
+
+
+####
+# Memory Cache Tests
+####
+
+@pytest.mark.ci
+@pytest.mark.cache
+def test_memory_cache_counts_hits_and_misses():
+    cache = MemoryCache()
+    key = BrowserCacheKey(url="http://example.org/")
+    assert cache.lookup(key, datetime.now()) is None
+    cache[key] = entry("body")
+    cached = cache.lookup(key, datetime.now())
+    assert cached is not None and cached.content == "body"
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+    assert cache.stats.bytes_held == entry("body").size
+
+
+@pytest.mark.ci
+@pytest.mark.cache
+def test_memory_cache_evicts_least_recently_used_within_budget():
+    size = entry("x" * 100).size
+    cache = MemoryCache(max_size=size * 3)
+    keys = [BrowserCacheKey(url=f"http://example.org/{i}") for i in range(4)]
+    for key in keys[:3]:
+        cache[key] = entry("x" * 100)
+
+    assert cache.lookup(keys[0], datetime.now()) is not None
+    cache[keys[3]] = entry("x" * 100)
+
+    assert keys[0] in cache
+    assert keys[1] not in cache
+    assert cache.stats.evictions == 1
+    assert cache.stats.bytes_held == size * 3
+
+
+@pytest.mark.ci
+@pytest.mark.cache
+def test_memory_cache_expires_stale_entries_proactively():
+    cache = MemoryCache()
+    stale = BrowserCacheKey(url="http://example.org/stale")
+    cache[stale] = BrowserCacheEntry(
+        content="old",
+        max_age=5,
+        timestamp=datetime.now() - timedelta(seconds=10)
+    )
+    # Storing an unrelated URL flushes the stale one
+    cache[BrowserCacheKey(url="http://example.org/fresh")] = entry("new")
+    assert stale not in cache
+    assert cache.stats.expirations == 1
+    assert len(cache) == 1
+
+
+@pytest.mark.ci
+@pytest.mark.cache
+def test_connection_exposes_cache_stats():
+    assert Connection.cache_stats() is Connection.browser_cache.stats
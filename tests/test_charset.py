@@ -0,0 +1,86 @@
+import codecs
+
+import pytest
+
+from gorushi.charset import (
+    SNIFF_SIZE, CharsetDecoder, charset_from_content_type, sniff_meta_charset
+)
+
+
+def decode_in_pieces(decoder: CharsetDecoder, data: bytes, size: int) -> str:
+    text = "".join(
+        decoder.decode(data[i:i + size]) for i in range(0, len(data), size)
+    )
+    return text + decoder.decode(b"", final=True)
+
+
+@pytest.mark.ci
+@pytest.mark.parametrize(("content_type", "charset"), [
+    ("text/html; charset=Shift_JIS", "shift_jis"),
+    ('text/html; charset="euc-kr"', "euc_kr"),
+    ("text/html;charset=ISO-8859-1", "cp1252"),
+    ("text/html", None),
+    ("text/html; charset=no-such-charset", None),
+    (None, None),
+])
+def test_charset_from_content_type(
+    content_type: str | None, charset: str | None
+):
+    assert charset_from_content_type(content_type) == charset
+
+
+@pytest.mark.ci
+@pytest.mark.parametrize(("head", "charset"), [
+    (b'<html><head><meta charset="windows-1251">', "cp1251"),
+    (b"<meta charset=euc-jp>", "euc_jp"),
+    (
+        b'<meta http-equiv="Content-Type" '
+        b'content="text/html; charset=gb2312">',
+        "gb2312",
+    ),
+    (b"<META CHARSET='UTF-8'>", "utf-8"),
+    (b'<meta charset="utf-16">', "utf-8"),
+    (b"<p>charset=big5</p>", None),
+    (b" " * SNIFF_SIZE + b'<meta charset="cp1251">', None),
+])
+def test_sniff_meta_charset(head: bytes, charset: str | None):
+    assert sniff_meta_charset(head) == charset
+
+
+@pytest.mark.ci
+def test_content_type_wins_over_meta():
+    body = '<meta charset="utf-8"><p>こんにちは</p>'.encode("shift_jis")
+    decoder = CharsetDecoder(content_type="text/html; charset=shift_jis")
+    assert decode_in_pieces(decoder, body, 1) == (
+        '<meta charset="utf-8"><p>こんにちは</p>'
+    )
+    assert decoder.charset == "shift_jis"
+
+
+@pytest.mark.ci
+def test_meta_charset_with_split_multibyte_sequences():
+    text = '<meta charset="euc-kr">' + "한국어 텍스트 " * 500
+    decoder = CharsetDecoder(content_type="text/html")
+    assert decode_in_pieces(decoder, text.encode("euc-kr"), 7) == text
+    assert decoder.charset == "euc_kr"
+
+
+@pytest.mark.ci
+def test_bom_wins_over_content_type():
+    body = codecs.BOM_UTF8 + "ünïcode".encode("utf-8")
+    decoder = CharsetDecoder(content_type="text/html; charset=iso-8859-1")
+    assert decoder.decode(body, final=True) == "ünïcode"
+
+
+@pytest.mark.ci
+def test_defaults_to_utf8_with_replacement():
+    decoder = CharsetDecoder()
+    assert decoder.decode(b"caf\xc3\xa9 \xff", final=True) == "café �"
+    assert decoder.charset == "utf-8"
+
+
+@pytest.mark.ci
+def test_text_is_held_back_only_while_sniffing():
+    assert CharsetDecoder().decode(b"<p>short</p>") == ""
+    decoder = CharsetDecoder(content_type="text/html; charset=utf-8")
+    assert decoder.decode(b"<p>short</p>") == "<p>short</p>"
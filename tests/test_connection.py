@@ -1,8 +1,135 @@
 
+import gzip
+import zlib
+from io import BufferedReader, BytesIO
+
 import pytest
-from gorushi.connection import Connection
+from gorushi.connection import BrowserCacheKey, Connection
 from gorushi.url import URL
 import time
+from datetime import datetime, timedelta
+
+from conftest import ETAG_BODY, ETAG_VALUE, LocalServer
+
+
+def chunked(data: bytes, chunk_size: int) -> bytes:
+    encoded = b""
+    for index in range(0, len(data), chunk_size):
+        chunk = data[index:index + chunk_size]
+        encoded += f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n"
+    return encoded + b"0\r\n\r\n"
+
+
+@pytest.mark.ci
+def test_iter_body_content_length():
+    conn = Connection()
+    conn.STREAM_CHUNK_SIZE = 4
+    response = BufferedReader(BytesIO(b"Hello World!extra"))
+    chunks = list(conn._iter_body(response, {'content-length': '12'}))
+    assert chunks == [b"Hell", b"o Wo", b"rld!"]
+
+
+@pytest.mark.ci
+def test_iter_body_chunked():
+    conn = Connection()
+    response = BufferedReader(BytesIO(chunked(b"Hello Chunked", 5)))
+    chunks = list(conn._iter_body(response, {'transfer-encoding': 'chunked'}))
+    assert chunks == [b"Hello", b" Chun", b"ked"]
+
+
+@pytest.mark.ci
+def test_iter_body_chunked_gzip():
+    conn = Connection()
+    body = b"Hello GZip " * 100
+    response = BufferedReader(BytesIO(chunked(gzip.compress(body), 16)))
+    headers = {'transfer-encoding': 'chunked', 'content-encoding': 'gzip'}
+    assert b"".join(conn._iter_body(response, headers)) == body
+
+
+@pytest.mark.ci
+def test_chunked_body_with_extensions_and_trailers():
+    conn = Connection()
+    body = (
+        b"5;name=value\r\nHello\r\n"
+        b"6 ; quoted=\"a;b\"\r\n World\r\n"
+        b"0;last\r\n"
+        b"Checksum: abc123\r\n"
+        b"\r\n"
+        b"HTTP/1.1 200 OK\r\n"
+    )
+    response = BufferedReader(BytesIO(body))
+    trailers: dict[str, str] = {}
+    assert conn._read_chunked_body(response, trailers) == b"Hello World"
+    assert trailers == {'checksum': 'abc123'}
+    # The next response is left untouched
+    assert response.readline() == b"HTTP/1.1 200 OK\r\n"
+
+
+@pytest.mark.ci
+def test_chunked_body_truncated():
+    conn = Connection()
+    response = BufferedReader(BytesIO(b"a\r\nshort"))
+    with pytest.raises(ConnectionError):
+        conn._read_chunked_body(response)
+
+
+@pytest.mark.ci
+def test_iter_body_until_close():
+    conn = Connection()
+    response = BufferedReader(BytesIO(b"read until close"))
+    assert b"".join(conn._iter_body(response, {})) == b"read until close"
+
+
+@pytest.mark.ci
+def test_iter_body_content_length_gzip():
+    conn = Connection()
+    conn.STREAM_CHUNK_SIZE = 8
+    body = b"Hello GZip " * 100
+    compressed = gzip.compress(body)
+    response = BufferedReader(BytesIO(compressed))
+    headers = {
+        'content-length': str(len(compressed)),
+        'content-encoding': 'gzip'
+    }
+    chunks = list(conn._iter_body(response, headers))
+    assert b"".join(chunks) == body
+    # Decoded as the blocks arrive rather than at the end
+    assert len(chunks) > 1
+
+
+@pytest.mark.ci
+@pytest.mark.parametrize("compressed", [
+    zlib.compress(b"Hello Deflate"),
+    zlib.compress(b"Hello Deflate", wbits=-zlib.MAX_WBITS),
+], ids=["zlib", "raw"])
+def test_iter_body_deflate(compressed: bytes):
+    conn = Connection()
+    response = BufferedReader(BytesIO(compressed))
+    headers = {'content-encoding': 'deflate'}
+    assert b"".join(conn._iter_body(response, headers)) == b"Hello Deflate"
+
+
+@pytest.mark.ci
+def test_iter_body_unsupported_encoding():
+    conn = Connection()
+    response = BufferedReader(BytesIO(b"..."))
+    with pytest.raises(ValueError):
+        list(conn._iter_body(response, {'content-encoding': 'br'}))
+
+
+@pytest.mark.ci
+@pytest.mark.parametrize("encoding", ["gzip", "deflate", "raw-deflate"])
+@pytest.mark.parametrize("framing", ["chunked", "length", "close"])
+def test_compressed_responses(
+    local_server: LocalServer, encoding: str, framing: str
+):
+    conn = Connection(http_options={'http_version': '1.1'})
+    url = URL.parse(
+        f"{local_server.base_url}/gzip?body=compressed"
+        f"&encoding={encoding}&framing={framing}"
+    )
+    assert conn.request(url=url) == "compressed"
+    assert local_server.stats.requests[0]['accept-encoding'] == "gzip, deflate"
 
 @pytest.mark.cache
 def test_caching_with_live_server():
@@ -30,3 +157,122 @@ def test_caching_with_live_server():
     # Second request, should also fetch from server
     content5 = conn.request(url=url_no_store)
     assert content4 != content5
+
+
+@pytest.mark.ci
+@pytest.mark.parametrize("meta", ["0", "1"])
+def test_non_utf8_responses_are_decoded(
+    local_server: LocalServer, meta: str
+):
+    conn = Connection(http_options={'http_version': '1.1'})
+    url = URL.parse(
+        f"{local_server.base_url}/charset?charset=shift_jis&meta={meta}"
+    )
+    assert conn.request(url=url).endswith("<p>こんにちは、世界</p>" * 200)
+
+
+@pytest.mark.ci
+@pytest.mark.cache
+def test_expired_entry_is_revalidated(local_server: LocalServer):
+    conn = Connection(http_options={'http_version': '1.1'})
+    url = URL.parse(f"{local_server.base_url}/etag")
+
+    first = conn.request(url=url)
+    second = conn.request(url=url)
+
+    assert first == second == ETAG_BODY.decode("utf-8")
+    assert 'if-none-match' not in local_server.stats.requests[0]
+    assert local_server.stats.requests[1]['if-none-match'] == ETAG_VALUE
+    entry = Connection.browser_cache.get(BrowserCacheKey(url=str(url)))
+    assert entry is not None and entry.etag == ETAG_VALUE
+
+
+####################################
+# Pipelining
+####################################
+
+@pytest.mark.ci
+def test_request_many_pipelines_on_one_socket(local_server: LocalServer):
+    conn = Connection(http_options={"http_version": "1.1"})
+    urls = [URL.parse(f"{local_server.base_url}/page{i}") for i in range(10)]
+    assert conn.request_many(urls, pipeline=True) == [
+        f"Hello /page{i}" for i in range(10)
+    ]
+
+    stats = Connection.connection_pool.stats
+    assert stats.created == 1
+    assert len(Connection.connection_pool) == 1
+
+
+@pytest.mark.ci
+def test_request_many_matches_serial_requests(local_server: LocalServer):
+    paths = ["/gzip?body=pipelined", "/redirect/2", "/etag", "/plain", "/etag"]
+    urls = [URL.parse(f"{local_server.base_url}{path}") for path in paths]
+    conn = Connection(http_options={"http_version": "1.1"})
+    expected = [conn.request(url=url) for url in urls]
+
+    Connection.browser_cache.clear()
+    assert conn.request_many(urls, pipeline=True) == expected
+
+
+@pytest.mark.ci
+def test_request_many_falls_back_when_server_closes(local_server: LocalServer):
+    paths = ["/a", "/close", "/b", "/c"]
+    urls = [URL.parse(f"{local_server.base_url}{path}") for path in paths]
+    conn = Connection(http_options={"http_version": "1.1"})
+    assert conn.request_many(urls, pipeline=True) == [
+        "Hello /a", "Closing", "Hello /b", "Hello /c"
+    ]
+    # /b and /c are requested again on a new socket
+    assert Connection.connection_pool.stats.created == 2
+
+
+####################################
+# Redirects
+####################################
+
+@pytest.mark.ci
+def test_permanent_redirects_are_memoized(local_server: LocalServer):
+    conn = Connection(http_options={"http_version": "1.1"})
+    url = URL.parse(f"{local_server.base_url}/redirect/5?status=301")
+    assert conn.request(url=url) == "Final destination reached."
+    assert len(local_server.stats.requests) == 6
+    # Every hop was on the same socket
+    assert Connection.connection_pool.stats.created == 1
+
+    assert conn.request(url=url) == "Final destination reached."
+    # Straight to the final URL
+    assert len(local_server.stats.requests) == 7
+    assert Connection.redirect_cache.stats.hops_skipped == 5
+
+
+@pytest.mark.ci
+@pytest.mark.parametrize(("query", "memoized"), [
+    ("status=302", False),
+    ("status=307", False),
+    ("status=302&cache_control=max-age=60", True),
+    ("status=307&cache_control=max-age=60", True),
+    ("status=301&cache_control=no-store", False),
+    ("status=308", True),
+])
+def test_which_redirects_are_memoized(
+    local_server: LocalServer, query: str, memoized: bool
+):
+    conn = Connection(http_options={"http_version": "1.1"})
+    url = URL.parse(f"{local_server.base_url}/redirect/1?{query}")
+    conn.request(url=url)
+    conn.request(url=url)
+    assert len(local_server.stats.requests) == (3 if memoized else 4)
+
+
+@pytest.mark.ci
+def test_memoized_redirect_expires(local_server: LocalServer):
+    conn = Connection(http_options={"http_version": "1.1"})
+    url = URL.parse(
+        f"{local_server.base_url}/redirect/1"
+        "?status=302&cache_control=max-age=1"
+    )
+    conn.request(url=url)
+    entry = Connection.redirect_cache.entries[BrowserCacheKey(url=str(url))]
+    assert entry.is_fresh(datetime.now())
+    assert not entry.is_fresh(datetime.now() + timedelta(seconds=2))
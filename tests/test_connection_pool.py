@@ -0,0 +1,178 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from gorushi import connection_pool
+from gorushi.connection import Connection
+from gorushi.connection_pool import (
+    ConnectionPool, ConnectionPoolCacheKey, is_socket_alive
+)
+from gorushi.url import URL
+
+from conftest import LocalServer
+
+
+KEY = ConnectionPoolCacheKey(host="localhost", port=80)
+
+
+def socket_pair_connect(peers: list[socket.socket]):
+    """connect() callback handing out one end of a socketpair."""
+    def connect() -> socket.socket:
+        ours, theirs = socket.socketpair()
+        peers.append(theirs)
+        return ours
+    return connect
+
+
+@pytest.mark.ci
+def test_checkin_then_checkout_reuses_socket():
+    pool = ConnectionPool()
+    peers: list[socket.socket] = []
+    first = pool.checkout(KEY, socket_pair_connect(peers))
+    first.uses += 1
+    pool.checkin(first)
+
+    second = pool.checkout(KEY, socket_pair_connect(peers))
+    assert second is first
+    assert second.reused
+    assert (pool.stats.created, pool.stats.reused) == (1, 1)
+    pool.checkin(second, reusable=False)
+    assert len(pool) == 0
+
+
+@pytest.mark.ci
+def test_preconnect_opens_one_spare_next_to_idle_socket():
+    pool = ConnectionPool()
+    peers: list[socket.socket] = []
+    used = pool.checkout(KEY, socket_pair_connect(peers))
+    used.uses += 1
+    pool.checkin(used)
+
+    assert pool.preconnect(KEY, socket_pair_connect(peers))
+    # The spare is still unused
+    assert not pool.preconnect(KEY, socket_pair_connect(peers))
+    assert (pool.stats.created, len(pool)) == (2, 2)
+
+
+@pytest.mark.ci
+def test_dead_idle_socket_is_replaced():
+    pool = ConnectionPool()
+    peers: list[socket.socket] = []
+    pooled = pool.checkout(KEY, socket_pair_connect(peers))
+    pool.checkin(pooled)
+
+    # The server closes the idle keep-alive connection
+    peers[0].close()
+    assert not is_socket_alive(pooled.socket)
+
+    replacement = pool.checkout(KEY, socket_pair_connect(peers))
+    assert replacement is not pooled
+    assert pool.stats.dead_sockets == 1
+    assert pool.stats.created == 2
+    pool.clear()
+
+
+@pytest.mark.ci
+def test_idle_sockets_are_evicted():
+    pool = ConnectionPool(idle_timeout=0.01)
+    peers: list[socket.socket] = []
+    pool.checkin(pool.checkout(KEY, socket_pair_connect(peers)))
+    assert KEY in pool
+
+    time.sleep(0.02)
+    pool.evict_idle()
+    assert KEY not in pool
+    assert pool.stats.idle_evictions == 1
+
+
+@pytest.mark.ci
+def test_checkout_blocks_at_max_per_host():
+    pool = ConnectionPool(max_per_host=2)
+    peers: list[socket.socket] = []
+    held = [pool.checkout(KEY, socket_pair_connect(peers)) for _ in range(2)]
+
+    checked_out = threading.Event()
+
+    def third() -> None:
+        pool.checkin(pool.checkout(KEY, socket_pair_connect(peers)))
+        checked_out.set()
+
+    thread = threading.Thread(target=third)
+    thread.start()
+    assert not checked_out.wait(0.05)
+
+    pool.checkin(held[0])
+    thread.join(1)
+    assert checked_out.is_set()
+    assert pool.stats.created == 2
+    assert pool.stats.reused == 1
+    pool.checkin(held[1])
+    pool.clear()
+
+
+@pytest.mark.ci
+def test_concurrent_requests_respect_max_per_host(local_server: LocalServer):
+    Connection.connection_pool.max_per_host = 3
+    try:
+        urls = [
+            URL.parse(f"{local_server.base_url}/page{i}?delay=0.01")
+            for i in range(24)
+        ]
+        results: dict[int, str] = {}
+
+        def fetch(index: int) -> None:
+            conn = Connection(http_options={"http_version": "1.1"})
+            results[index] = conn.request(url=urls[index])
+
+        threads = [
+            threading.Thread(target=fetch, args=(i,))
+            for i in range(len(urls))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == {i: f"Hello /page{i}" for i in range(len(urls))}
+        stats = Connection.connection_pool.stats
+        assert stats.created <= 3
+        assert stats.created + stats.reused == len(urls)
+    finally:
+        Connection.connection_pool.max_per_host = 6
+
+
+@pytest.mark.ci
+def test_request_retries_once_on_dead_reused_socket(
+    local_server: LocalServer,
+    monkeypatch: pytest.MonkeyPatch
+):
+    conn = Connection(http_options={"http_version": "1.1"})
+    first = URL.parse(f"{local_server.base_url}/first")
+    assert conn.request(url=first) == "Hello /first"
+
+    # The server closes the idle socket just after the liveness check
+    monkeypatch.setattr(connection_pool, "is_socket_alive", lambda sock: True)
+    key = ConnectionPoolCacheKey(
+        host="127.0.0.1", port=local_server.server_address[1]
+    )
+    pooled = Connection.connection_pool.idle[key][0]
+    pooled.socket.shutdown(socket.SHUT_WR)
+
+    second = URL.parse(f"{local_server.base_url}/second")
+    assert conn.request(url=second) == "Hello /second"
+    stats = Connection.connection_pool.stats
+    assert (stats.created, stats.reused, stats.retries) == (2, 1, 1)
+
+
+@pytest.mark.ci
+def test_redirects_do_not_leave_closed_sockets_in_pool(
+    local_server: LocalServer
+):
+    conn = Connection(http_options={"http_version": "1.1"})
+    url = URL.parse(f"{local_server.base_url}/redirect/2")
+    for _ in range(3):
+        Connection.browser_cache.clear()
+        assert conn.request(url=url) == "Final destination reached."
+    assert len(Connection.connection_pool) == 1
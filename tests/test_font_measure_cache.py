@@ -0,0 +1,258 @@
+from dataclasses import dataclass
+
+import pytest
+
+from gorushi import fonts
+from gorushi.font_measure_cache import FontMeasurer, FontMetricsDiskCache
+from gorushi.fonts import (
+    FontDescriptor, FontKey, HeadlessFont, HeadlessFontBackend
+)
+
+
+@dataclass
+class CountingFont(HeadlessFont):
+    measure_calls: int = 0
+    metrics_calls: int = 0
+    cget_calls: int = 0
+
+    def measure(self, text):
+        self.measure_calls += 1
+        return super().measure(text)
+
+    def metrics(self):
+        self.metrics_calls += 1
+        return super().metrics()
+
+    def cget(self, option):
+        self.cget_calls += 1
+        return super().cget(option)
+
+
+def glyph_sum(font, text):
+    # FontMeasurer adds up per-character widths, each rounded by the font
+    return sum(HeadlessFont.measure(font, ch) for ch in text)
+
+
+@dataclass
+class VersionedBackend(HeadlessFontBackend):
+    tables: str = "1"
+
+    def version(self):
+        return f"test {self.tables}"
+
+
+@pytest.fixture
+def backend():
+    previous = fonts._font_backend
+    backend = VersionedBackend()
+    fonts.set_font_backend(backend)
+    try:
+        yield backend
+    finally:
+        fonts.set_font_backend(previous)
+
+
+@pytest.mark.ci
+def test_measure_matches_font():
+    measurer = FontMeasurer()
+    font = HeadlessFont(family="Arial", size=12)
+    assert measurer.measure(font, "Hello") == glyph_sum(font, "Hello")
+    assert measurer.measure(font, "가나") == 2 * font.measure("가")
+    assert measurer.measure(font, "") == 0.0
+    assert measurer.metrics(font) == font.metrics()
+    assert measurer.metrics(font)["linespace"] == font.metrics()["linespace"]
+
+
+@pytest.mark.ci
+def test_measure_many():
+    font = CountingFont(family="Arial", size=12)
+    words = "the quick brown fox jumps over the lazy 犬 . ".split(" ")
+    widths = FontMeasurer().measure_many(font, words)
+    assert widths == [FontMeasurer().measure(font, word) for word in words]
+    assert widths[-1] == 0.0
+
+    measurer = FontMeasurer()
+    measurer.measure(font, "warm")
+    font.cget_calls = 0
+    measurer.measure_many(font, words * 10)
+    # One font key lookup (four cget calls) for the whole batch
+    assert font.cget_calls == 4
+
+
+@pytest.mark.ci
+def test_metrics_are_fetched_once_per_font():
+    measurer = FontMeasurer()
+    font = CountingFont(family="Arial", size=12)
+    for _ in range(3):
+        measurer.metrics(font)["ascent"]
+        measurer.metrics(font)
+    assert font.metrics_calls == 1
+
+
+####
+# Font descriptors
+####
+
+@pytest.mark.ci
+def test_font_descriptor():
+    font = CountingFont(family="Arial", size=12, weight="bold")
+    descriptor = FontDescriptor.wrap(font)
+    assert descriptor.key == FontKey(
+        size=12, weight="bold", slant="roman", family="Arial"
+    )
+    assert descriptor.cget("weight") == "bold"
+    assert descriptor.measure("Hello") == HeadlessFont.measure(font, "Hello")
+    assert str(descriptor) == str(font)
+
+    font.cget_calls = 0
+    for _ in range(3):
+        assert descriptor.metrics() == HeadlessFont.metrics(font)
+        assert descriptor.metrics()["ascent"] == 15
+        descriptor.cget("size")
+    assert font.metrics_calls == 1
+    assert font.cget_calls == 0
+
+
+@pytest.mark.ci
+def test_measuring_a_descriptor_skips_cget():
+    font = CountingFont(family="Arial", size=12)
+    descriptor = FontDescriptor.wrap(font)
+    measurer = FontMeasurer()
+    font.cget_calls = 0
+    assert measurer.measure(descriptor, "Hello") == measurer.measure(
+        font, "Hello"
+    )
+    measurer.measure(descriptor, "world")
+    measurer.metrics(descriptor)
+    # Only the measure() of the bare font looked its key up
+    assert font.cget_calls == 4
+
+
+####
+# Glyph tables and word cache
+####
+
+@pytest.mark.ci
+def test_word_cache_is_bounded():
+    measurer = FontMeasurer(max_words=3)
+    font = HeadlessFont(family="Arial", size=12)
+    for word in ["one", "two", "three", "four"]:
+        measurer.measure(font, word)
+    assert len(measurer.words) == 3
+    assert measurer.stats.word_evictions == 1
+
+    # "two" is used again, so "three" is the next to go
+    measurer.measure(font, "two")
+    measurer.measure(font, "five")
+    assert [text for _, text in measurer.words] == ["four", "two", "five"]
+
+
+@pytest.mark.ci
+def test_glyphs_are_kept_apart_from_words():
+    measurer = FontMeasurer(max_words=1)
+    font = CountingFont(family="Arial", size=12)
+    measurer.measure(font, "café")
+    measurer.measure(font, "日本")
+    measurer.measure(font, "Ωμέγα")
+    calls = font.measure_calls
+
+    # Evicted words are re-summed from the glyph tables without the font
+    assert measurer.measure(font, "café") == glyph_sum(font, "café")
+    assert measurer.measure(font, "Ωμέγα") > 0
+    assert font.measure_calls == calls
+
+    glyphs = measurer.glyphs[measurer._font_key(font)]
+    assert glyphs.widths[ord("é")] == HeadlessFont.measure(font, "é")
+    assert glyphs.get("Ω") == HeadlessFont.measure(font, "Ω")
+    assert "日" not in glyphs.other and glyphs.get("日") is None
+
+
+@pytest.mark.ci
+def test_measure_stats():
+    measurer = FontMeasurer()
+    font = HeadlessFont(family="Arial", size=12)
+    for _ in range(4):
+        measurer.measure(font, "hello")
+    measurer.measure(font, "é")
+
+    assert measurer.stats.word_hits == 3
+    assert measurer.stats.word_misses == 1
+    assert measurer.stats.word_hit_rate == 0.75
+    assert measurer.stats.glyph_hits == 5
+    assert measurer.stats.glyph_misses == 1
+
+    measurer.clear()
+    assert measurer.stats.word_hit_rate == 0.0
+    assert not measurer.words and not measurer.glyphs
+
+
+####
+# Disk cache
+####
+
+@pytest.mark.ci
+def test_disk_cache_skips_measuring_on_restart(tmp_path, backend):
+    first = CountingFont(family="Arial", size=12)
+    directory = str(tmp_path)
+    FontMeasurer(disk_cache=FontMetricsDiskCache(directory=directory)).measure(
+        first, "Hi"
+    )
+    assert first.measure_calls > 95
+
+    font = CountingFont(family="Arial", size=12)
+    measurer = FontMeasurer(
+        disk_cache=FontMetricsDiskCache(directory=directory)
+    )
+    assert measurer.measure(font, "Hello, world") == glyph_sum(
+        font, "Hello, world"
+    )
+    assert measurer.measure(font, "안녕") == 2 * HeadlessFont.measure(
+        font, "가"
+    )
+    assert measurer.metrics(font) == HeadlessFont.metrics(font)
+    assert font.measure_calls == 0
+    assert font.metrics_calls == 0
+
+
+@pytest.mark.ci
+def test_disk_cache_is_keyed_by_font(tmp_path, backend):
+    directory = str(tmp_path)
+    FontMeasurer(disk_cache=FontMetricsDiskCache(directory=directory)).measure(
+        CountingFont(family="Arial", size=12), "a"
+    )
+
+    bold = CountingFont(family="Arial", size=12, weight="bold")
+    measurer = FontMeasurer(
+        disk_cache=FontMetricsDiskCache(directory=directory)
+    )
+    assert measurer.measure(bold, "Hello") == glyph_sum(bold, "Hello")
+    assert bold.measure_calls > 95
+
+
+@pytest.mark.ci
+def test_disk_cache_is_keyed_by_backend_version(tmp_path, backend):
+    directory = str(tmp_path)
+    FontMeasurer(disk_cache=FontMetricsDiskCache(directory=directory)).measure(
+        CountingFont(family="Arial", size=12), "a"
+    )
+
+    backend.tables = "2"
+    font = CountingFont(family="Arial", size=12)
+    FontMeasurer(disk_cache=FontMetricsDiskCache(directory=directory)).measure(
+        font, "a"
+    )
+    assert font.measure_calls > 95
+
+
+@pytest.mark.ci
+def test_disk_cache_ignores_corrupt_files(tmp_path, backend):
+    cache = FontMetricsDiskCache(directory=str(tmp_path))
+    FontMeasurer(disk_cache=cache).measure(
+        CountingFont(family="Arial", size=12), "a"
+    )
+    for path in tmp_path.iterdir():
+        path.write_bytes(b"{not json")
+
+    font = CountingFont(family="Arial", size=12)
+    measurer = FontMeasurer(disk_cache=cache)
+    assert measurer.measure(font, "Hello") == glyph_sum(font, "Hello")
@@ -0,0 +1,146 @@
+import os
+
+import pytest
+
+from gorushi.state_machine import HTMLTokenizerState, HTMLTokenizerStateMachine
+from gorushi.tokenizer import HTMLTokenizer
+
+
+DEMO_DIR = os.path.join(os.path.dirname(__file__), "..", "demo")
+
+PARITY_CASES = [
+    "",
+    "plain text only",
+    "<html><head><title>Test</title></head><body>Hello World</body></html>",
+    "<html><body><p>Paragraph 1<p>Paragraph 2</body></html>",
+    "<html><!-- This is a comment --><body>"
+    "<script>var a = 1;</script></body></html>",
+    '<div class="bg-blue-500 text-white p-4">Hello Tailwind</div>',
+    '<a href="http://example.com" title=\'Example "Site"\'>Link</a>',
+    "<b>Bold <i>both</b> italic</i>",
+    "<!--->",
+    "<!-->after",
+    "<!-- Comment <!-- Nested --> Still in comment -->",
+    "<script>if (a < b) { console.log('Hello'); }</script>tail<b>x</b>",
+    "<script><!-- var a = 1; --></script>",
+    "<script></script>",
+    '<script src="app.js">var x = "<b>";</script>',
+    "<div class='contai>ner' id=\"main\">text</div>",
+    "<a b='1'c=\"2\">",
+    "<  a  >text< /a >",
+    "<>empty<  >tag",
+    "<a<script>x</script>y",
+    "<a <!-- inside -->b",
+    "unterminated <b",
+    "unterminated <!-- comment",
+    "unterminated <script> body",
+    "&lt;entities&gt; &amp; <br/> more",
+    "line one\nline two\n<pre>\n  code\n</pre>\n",
+    "한국어 <b>텍스트</b> 입니다",
+]
+
+# Inputs where HTMLTokenizer deliberately differs from the state machine,
+# with the tokens it produces instead. The state machine takes a
+# backslash before the closing quote as an escape, but HTML has no
+# escapes inside quoted attribute values.
+EXPECTED_DIFFERENCES = [
+    (
+        '<a title="escaped \\" quote>">x</a>',
+        [
+            ("text", "", 1),
+            ("tag", 'a title="escaped \\" quote', 27),
+            ("text", '">x', 31),
+            ("tag", "/a", 34),
+        ],
+    ),
+    (
+        '<a title="x\\">text</a>',
+        [
+            ("text", "", 1),
+            ("tag", 'a title="x\\"', 14),
+            ("text", "text", 19),
+            ("tag", "/a", 22),
+        ],
+    ),
+]
+
+
+def reference_tokens(text: str) -> list[tuple[str, str, int]]:
+    """
+    Drive the character state machine the way HTMLParser used to and
+    record each token with the offset just past the character producing it.
+    """
+    state_machine = HTMLTokenizerStateMachine()
+    tokens: list[tuple[str, str, int]] = []
+    for i, c in enumerate(text):
+        output = state_machine.feed(c)
+        if output:
+            kind, value = output
+            tokens.append((kind, value, i + 1))
+            if kind == "comment":
+                _ = state_machine.flush_buffer()
+
+    if state_machine.state == HTMLTokenizerState.TEXT:
+        text_run = state_machine.flush_buffer()
+        if text_run:
+            tokens.append(("text", text_run, len(text)))
+    return tokens
+
+
+def bulk_tokens(text: str) -> list[tuple[str, str, int]]:
+    tokenizer = HTMLTokenizer()
+    tokens: list[tuple[str, str, int]] = []
+    for kind, value in tokenizer.feed(text):
+        tokens.append((kind, value, tokenizer.position))
+    for kind, value in tokenizer.close():
+        tokens.append((kind, value, len(text)))
+    return tokens
+
+
+def demo_documents() -> list[str]:
+    documents: list[str] = []
+    for filename in sorted(os.listdir(DEMO_DIR)):
+        with open(os.path.join(DEMO_DIR, filename)) as f:
+            documents.append(f.read())
+    return documents
+
+
+@pytest.mark.ci
+@pytest.mark.parametrize("text", PARITY_CASES)
+def test_parity_with_state_machine(text: str):
+    assert bulk_tokens(text) == reference_tokens(text)
+
+
+@pytest.mark.ci
+@pytest.mark.parametrize(("text", "expected"), EXPECTED_DIFFERENCES)
+def test_expected_differences_from_state_machine(
+    text: str, expected: list[tuple[str, str, int]]
+):
+    assert bulk_tokens(text) == expected
+    assert reference_tokens(text) != expected
+
+
+@pytest.mark.ci
+def test_parity_with_state_machine_on_demo_pages():
+    for document in demo_documents():
+        assert bulk_tokens(document) == reference_tokens(document)
+
+
+@pytest.mark.ci
+def test_long_text_run_is_a_single_token():
+    text = "word " * 10000
+    tokenizer = HTMLTokenizer()
+    tokens = list(tokenizer.feed(f"<p>{text}</p>"))
+    assert tokens == [
+        ("text", ""), ("tag", "p"), ("text", text), ("tag", "/p")
+    ]
+
+
+@pytest.mark.ci
+def test_final_state_matches_state_machine():
+    for text in ["<div class='contai", "<!-- open", "<script>x", "<b"]:
+        tokenizer = HTMLTokenizer()
+        _ = list(tokenizer.feed(text))
+        state_machine = HTMLTokenizerStateMachine()
+        _ = state_machine.process_string(text)
+        assert tokenizer.state == state_machine.state
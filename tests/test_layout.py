@@ -0,0 +1,105 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from gorushi import fonts
+from gorushi.command import DrawText
+from gorushi.font_measure_cache import font_measurer
+from gorushi.fonts import FontDescriptor, HeadlessFont, HeadlessFontBackend
+from gorushi.layout import FONT_CACHE, DocumentLayout, paint_tree
+from gorushi.parser import HTMLParser
+
+
+DEMO_DIR = os.path.join(os.path.dirname(__file__), "..", "demo")
+
+
+@pytest.fixture
+def headless_backend():
+    previous = fonts._font_backend
+    fonts.set_font_backend(HeadlessFontBackend())
+    FONT_CACHE.clear()
+    try:
+        yield
+    finally:
+        fonts.set_font_backend(previous)
+        FONT_CACHE.clear()
+
+
+def layout_document(html: str) -> tuple[DocumentLayout, list]:
+    document = DocumentLayout(node=HTMLParser(body=html).parse())
+    document.layout()
+    display_list: list = []
+    paint_tree(document, display_list)
+    return document, display_list
+
+
+@pytest.mark.ci
+def test_headless_font_metrics():
+    font = HeadlessFont(family="Arial", size=12)
+    # 12pt at 96 dpi is 16px; "Hello" is 2.278 em
+    assert font.measure("Hello") == 36
+    assert font.metrics() == {
+        "ascent": 15, "descent": 4, "linespace": 19, "fixed": False
+    }
+    bold = HeadlessFont(family="Arial", size=12, weight="bold")
+    assert bold.measure("Hello") > 36
+    assert font.measure("가나") == 32
+    assert font.cget("size") == 12
+
+
+@pytest.mark.ci
+def test_headless_layout_and_paint(headless_backend, capsys):
+    document, display_list = layout_document(
+        "<html><body><p>Hello <b>bold</b> world</p>"
+        "<h1>Title</h1></body></html>"
+    )
+    texts = [cmd for cmd in display_list if isinstance(cmd, DrawText)]
+    assert [cmd.text for cmd in texts] == [
+        "Hello", "bold", "world", "Title"
+    ]
+    assert all(isinstance(cmd.font, FontDescriptor) for cmd in texts)
+    assert all(isinstance(cmd.font.font, HeadlessFont) for cmd in texts)
+    hello, bold, world, _ = texts
+    assert hello.left < bold.left < world.left
+    assert hello.top == world.top
+    assert bold.right - bold.left == font_measurer.measure(bold.font, "bold")
+    assert document.height > 0
+
+
+@pytest.mark.ci
+def test_headless_layout_of_demo_pages(headless_backend, capsys):
+    for filename in sorted(os.listdir(DEMO_DIR)):
+        with open(os.path.join(DEMO_DIR, filename)) as f:
+            _, display_list = layout_document(f.read())
+        assert display_list, filename
+
+
+@pytest.mark.ci
+def test_layout_without_tkinter_installed():
+    script = (
+        "import sys; sys.modules['tkinter'] = None\n"
+        "from gorushi.fonts import HeadlessFontBackend, set_font_backend\n"
+        "from gorushi.layout import DocumentLayout, paint_tree\n"
+        "from gorushi.parser import HTMLParser\n"
+        "set_font_backend(HeadlessFontBackend())\n"
+        "body = '<p>no display</p>'\n"
+        "document = DocumentLayout(node=HTMLParser(body=body).parse())\n"
+        "document.layout()\n"
+        "display_list = []\n"
+        "paint_tree(document, display_list)\n"
+        "print(len(display_list))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        cwd=os.path.join(os.path.dirname(__file__), ".."),
+        env={
+            **os.environ,
+            "PYTHONPATH": os.path.join(os.path.dirname(__file__), ".."),
+        },
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "2"
@@ -1,22 +1,61 @@
 import pytest
-from gorushi.node import Element, Text
-from gorushi.parser import AttributesExtractor, HTMLParser, print_tree
+from gorushi.node import Element, Node, Text
+from gorushi.attributes import EMPTY_ATTRIBUTES, parse_attributes, parse_tag
+from gorushi.parser import HTMLParser, HTMLViewSourceParser, print_tree
 
 
 ####
-# Attributes Extractor Tests
+# Tag Parsing Tests
 ####
 @pytest.mark.ci
-def test_attributes_extractor_basic():
-    content = 'class="btn btn-primary" id="submit-btn" disabled'
-    extractor = AttributesExtractor(text=content)
-    attributes = extractor.parse()
+def test_parse_tag_basic():
+    content = 'button class="btn btn-primary" id="submit-btn" disabled'
+    tag, attributes = parse_tag(content)
+    assert tag == 'button'
     assert attributes.get('class') == 'btn btn-primary'
     assert attributes.get('id') == 'submit-btn'
     assert 'disabled' in attributes
     assert attributes.get('disabled') == ''
 
 
+@pytest.mark.ci
+def test_parse_tag_value_forms():
+    tag, attributes = parse_tag(
+        "INPUT Type=text value = 'say \"hi\"' data-x=a=b name=\"\" checked"
+        "\nrequired/"
+    )
+    assert tag == 'input'
+    assert dict(attributes) == {
+        'type': 'text',
+        'value': 'say "hi"',
+        'data-x': 'a=b',
+        'name': '',
+        'checked': '',
+        'required': '',
+    }
+
+
+@pytest.mark.ci
+def test_parse_tag_duplicate_attributes():
+    _, attributes = parse_tag('p id="first" ID=second class=a id=third')
+    assert dict(attributes) == {'id': 'first', 'class': 'a'}
+
+
+@pytest.mark.ci
+def test_parse_tag_end_and_void_tags():
+    assert parse_tag('/DIV') == ('/div', {})
+    assert parse_tag('br/')[0] == 'br'
+    assert parse_tag('!doctype html')[0] == '!doctype'
+
+
+@pytest.mark.ci
+def test_parse_tag_is_cached():
+    _, first = parse_tag('a href="/page" class="nav"')
+    assert parse_tag('a href="/page" class="nav"')[1] is first
+    with pytest.raises(TypeError):
+        first['href'] = '/other'
+
+
 ####
 # HTML Parser Tests
 ####
@@ -43,7 +82,20 @@ def test_parser_with_unclosed_tags():
     assert body.children[1].tag == 'p'
 
 
-@pytest.mark.ci 
+@pytest.mark.ci
+def test_parser_with_very_long_numeric_references():
+    content = (
+        "<p>&#" + "1" * 5000 + ";&#x" + "0" * 5000 + "41;&#" + "0" * 20 + "66"
+        "&#x" + "f" * 5000 + ";</p>"
+    )
+    dom_tree = HTMLParser(body=content).parse()
+    paragraph = dom_tree.children[0].children[0]
+    assert paragraph.tag == 'p'
+    assert isinstance(paragraph.children[0], Text)
+    assert paragraph.children[0].text == "�AB�"
+
+
+@pytest.mark.ci
 def test_parser_with_comments_and_scripts():
     content = "<html><!-- This is a comment --><body><script>var a = 1;</script></body></html>"
     parser = HTMLParser(body=content)
@@ -89,6 +141,15 @@ def test_quote_handling_in_attributes():
     assert isinstance(a_tag.children[0], Text)
     assert a_tag.children[0].text == 'Link'
 
+@pytest.mark.ci
+def test_backslash_does_not_escape_quotes():
+    dom_tree = HTMLParser(body='<a title="x\\">text</a>').parse()
+    a_tag = dom_tree.children[0].children[0]
+    assert isinstance(a_tag, Element)
+    assert a_tag.attributes.get('title') == 'x\\'
+    assert isinstance(a_tag.children[0], Text)
+    assert a_tag.children[0].text == 'text'
+
 ####
 # Mismatched Tags Tests 
 ####
@@ -186,3 +247,195 @@ def test_misnested_with_br_void_element():
 
 
 
+
+@pytest.mark.ci
+def test_attributes_are_parsed_on_first_use():
+    body = '<div id="main" class=wide><p>text</p></div>'
+    dom_tree = HTMLParser(body=body).parse()
+    div = dom_tree.children[0].children[0]
+    p = div.children[0]
+    assert div.source == 'div id="main" class=wide'
+    assert div._attributes is None
+    assert div.attributes == {'id': 'main', 'class': 'wide'}
+    assert div._attributes is div.attributes
+    # Nothing to parse for a bare tag
+    assert p.source == ''
+    assert p.attributes == {}
+
+    built = Element(tag='nav', attributes={'id': 'toc'})
+    assert built.attributes == {'id': 'toc'}
+    assert repr(built) == '<nav id="toc">'
+
+
+@pytest.mark.ci
+def test_repr_does_not_parse_attributes(capsys: pytest.CaptureFixture[str]):
+    body = '<div id="main" class=wide><p>text</p></div>'
+    dom_tree = HTMLParser(body=body).parse()
+    div = dom_tree.children[0].children[0]
+    assert repr(div) == '<div id="main" class=wide>'
+    print_tree(dom_tree)
+    assert '<div id="main" class=wide>' in capsys.readouterr().out
+    assert div._attributes is None
+    # The same once they are parsed, until they are changed
+    assert div.attributes['id'] == 'main'
+    assert repr(div) == '<div id="main" class=wide>'
+    div.attributes['id'] = 'side'
+    assert repr(div) == '<div id="side" class="wide">'
+
+
+@pytest.mark.ci
+def test_elements_compare_attributes():
+    assert Element(tag='a', attributes={'href': '/'}) != Element(
+        tag='a', attributes={'href': '/x'}
+    )
+    # Parsed or not, however the source spells them
+    assert Element(tag='a', source="a href='/'") == Element(
+        tag='a', attributes={'href': '/'}
+    )
+    assert Element(tag='a', source="a href='/'") == Element(
+        tag='a', source='a href="/"'
+    )
+
+    # The same source is not parsed again, unless one side was changed
+    first = Element(tag='a', source="a href='/'")
+    second = Element(tag='a', source="a href='/'")
+    assert first == second
+    assert first._attributes is None and second._attributes is None
+    first.attributes['href'] = '/x'
+    assert first != second
+
+
+@pytest.mark.ci
+def test_open_text_style_tags_follow_unfinished():
+    parser = HTMLParser()
+    for tag in ['html', 'body', 'b', 'p', 'i', 'span', '/b', 'u']:
+        parser.add_tag(tag)
+        assert parser.open_text_style_tags == [
+            node.tag for node in parser.unfinished
+            if node.tag in HTMLParser.TEXT_STYLE_TAGS
+        ]
+    parser.finish()
+    assert parser.open_text_style_tags == []
+
+
+@pytest.mark.ci
+def test_deep_nesting():
+    depth = 5000
+    body = "<div>" * depth + "x" + "</div>" * depth
+    dom_tree = HTMLParser(body=body).parse()
+    node = dom_tree.children[0]
+    for _ in range(depth):
+        node = node.children[0]
+    assert node.children[0].text == "x"
+
+
+####
+# Incremental Parsing Tests
+####
+
+def tree_repr(node: Node, depth: int = 0) -> list[str]:
+    lines = ["  " * depth + repr(node)]
+    for child in node.children:
+        lines.extend(tree_repr(child, depth + 1))
+    return lines
+
+
+STREAMING_DOCUMENT = (
+    "<html><body><!-- a comment -->"
+    "<p class=\"intro\">Hello &amp; 안녕하세요</p>"
+    "<script>if (a < b) { go(); }</script>"
+    "<pre>\n  code\n</pre>tail</body></html>"
+)
+
+
+@pytest.mark.ci
+@pytest.mark.parametrize("parser_class", [HTMLParser, HTMLViewSourceParser])
+def test_feed_matches_parse_at_every_split(parser_class: type[HTMLParser]):
+    expected = tree_repr(parser_class(body=STREAMING_DOCUMENT).parse())
+    for split in range(len(STREAMING_DOCUMENT) + 1):
+        parser = parser_class()
+        parser.feed(STREAMING_DOCUMENT[:split])
+        parser.feed(STREAMING_DOCUMENT[split:])
+        assert tree_repr(parser.close()) == expected
+
+
+@pytest.mark.ci
+def test_feed_bytes_one_at_a_time():
+    expected = tree_repr(HTMLParser(body=STREAMING_DOCUMENT).parse())
+    parser = HTMLParser()
+    for byte in STREAMING_DOCUMENT.encode("utf-8"):
+        parser.feed(bytes([byte]))
+    assert tree_repr(parser.close()) == expected
+
+
+@pytest.mark.ci
+def test_feed_bytes_with_meta_charset():
+    document = (
+        '<html><head><meta charset="euc-kr"></head>'
+        '<body>안녕하세요</body></html>'
+    )
+    parser = HTMLParser()
+    encoded = document.encode("euc-kr")
+    for index in range(0, len(encoded), 5):
+        parser.feed(encoded[index:index + 5])
+    expected = tree_repr(HTMLParser(body=document).parse())
+    assert tree_repr(parser.close()) == expected
+
+
+@pytest.mark.ci
+def test_feed_split_comment_and_script_markers():
+    parser = HTMLParser()
+    chunks = ["<body>a<!", "-", "- hidden -", "->b<script>x</scr", "ipt>c"]
+    for chunk in chunks:
+        parser.feed(chunk)
+    body = parser.close().children[0]
+    assert [repr(child) for child in body.children] == [
+        "'a'", "'b'", "<script>"
+    ]
+    assert body.children[2].children[0].text == "x"
+
+
+####
+# Compact Nodes Tests
+####
+
+@pytest.mark.ci
+def test_nodes_are_compact():
+    dom_tree = HTMLParser(
+        body=(
+            '<html><body><p class="a">one</p><p>two</p><P>three</P>'
+            '</body></html>'
+        )
+    ).parse()
+    body = dom_tree.children[0]
+    first, second, third = body.children
+    text = first.children[0]
+
+    assert not hasattr(first, "__dict__") and not hasattr(text, "__dict__")
+    assert first.attributes == {"class": "a"}
+    # Empty attributes and text children are shared rather than allocated
+    assert second.attributes._mapping is third.attributes._mapping
+    assert text.children is second.children[0].children == []
+    with pytest.raises(TypeError):
+        text.children.append(second)
+    assert first.tag is second.tag is third.tag
+    assert repr(second) == "<p>"
+
+
+@pytest.mark.ci
+def test_attribute_changes_stay_with_their_element():
+    dom_tree = HTMLParser(
+        body='<p class="a">one</p><p class="a">two</p><p>three</p><p>four</p>'
+    ).parse()
+    first, second, third, fourth = dom_tree.children[0].children
+    first.attributes["id"] = "x"
+    del first.attributes["class"]
+    third.attributes["id"] = "y"
+
+    assert first.attributes == {"id": "x"}
+    assert second.attributes == {"class": "a"}
+    assert third.attributes == {"id": "y"}
+    assert fourth.attributes == {}
+    # The cached parse of the tag is untouched
+    assert parse_attributes('p class="a"') == {"class": "a"}
+    assert EMPTY_ATTRIBUTES == {}
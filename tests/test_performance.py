@@ -1,34 +1,35 @@
+import gc
+import html
+import socket
+import ssl
 import time
 import threading
+import tracemalloc
+from dataclasses import dataclass, field
+from io import BufferedReader, BytesIO
 from http.server import BaseHTTPRequestHandler, HTTPServer
 
 from gorushi.url import URL
-from gorushi.connection import Connection, ConnectionPoolCacheKey
+from gorushi.async_connection import fetch_many
+from gorushi.connection import Connection
+from gorushi.font_measure_cache import FontMeasurer
+from gorushi.node import Element, Node, Text
+from gorushi.attributes import parse_attributes
+from gorushi.parser import HTMLParser
+from gorushi.renderer import replace_all
+
+from conftest import TLS_CERTFILE
+from test_font_measure_cache import CountingFont
 
 # --- Benchmark Function ---
 
-def run_benchmark(num_requests, keep_alive):
-    base_url = "http://example.org"
+def run_benchmark(num_requests, keep_alive, base_url="http://example.org"):
     Connection.connection_pool.clear()
     times = []
-    connections = {'new': 0, 'reused': 0}
     http_version = "1.1" if keep_alive else "1.0"
 
     for i in range(num_requests):
         url = URL.parse(base_url)
-        key = ConnectionPoolCacheKey(host=url.host, port=url.port)
-        
-        # For HTTP/1.1, we check the pool before the request to see if it will be reused.
-        if keep_alive:
-            if key not in Connection.connection_pool:
-                connections['new'] += 1
-            # In the first request, the connection is new but not yet in the pool.
-            # After the first request, it's reused.
-            elif i > 0:
-                connections['reused'] += 1
-        else:
-            # For HTTP/1.0, a new connection is always made.
-            connections['new'] += 1
 
         start_time = time.perf_counter()
         
@@ -38,14 +39,10 @@ def run_benchmark(num_requests, keep_alive):
         end_time = time.perf_counter()
         times.append(end_time - start_time)
 
-    # Close any sockets left in the pool
-    for sock in Connection.connection_pool.values():
-        sock.close()
+    # Socket reuse as counted by the pool itself
+    stats = Connection.connection_pool.stats
+    connections = {'new': stats.created, 'reused': stats.reused}
     Connection.connection_pool.clear()
-    
-    # The first connection in a keep-alive scenario is also "new"
-    if keep_alive and num_requests > 0:
-        connections['reused'] = num_requests - 1
 
     return {
         'total_time': sum(times),
@@ -53,6 +50,40 @@ def run_benchmark(num_requests, keep_alive):
         'connections': connections,
     }
 
+def generate_document(size):
+    """An attribute- and inline-heavy page of about size characters."""
+    parts = ["<html><body>"]
+    total = 0
+    i = 0
+    while total < size:
+        block = (
+            f'<div class="row" id="row{i}">'
+            f'<p>Paragraph {i} with <b>bold</b> and <i>italic</i> text '
+            f'&amp; a <a href="/page/{i}">link</a>.</p>'
+            f'<ul><li>one</li><li>two<br></li></ul>'
+            f'<img src="/img/{i}.png"></div>\n'
+        )
+        parts.append(block)
+        total += len(block)
+        i += 1
+    parts.append("</body></html>")
+    return "".join(parts)
+
+def best_time(function, runs=5):
+    """Fastest of several runs of function, with the garbage collector off."""
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        times = []
+        for _ in range(runs):
+            start_time = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - start_time)
+        return min(times)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
 # --- Tests ---
 
 def test_performance_with_keep_alive():
@@ -102,8 +133,477 @@ def test_connection_reuse_across_urls():
 
     # The same connection should be reused
     assert len(Connection.connection_pool) == 1
+    assert Connection.connection_pool.stats.created == 1
+    assert Connection.connection_pool.stats.reused == num_requests - 1
 
     # Cleanup
-    for sock in Connection.connection_pool.values():
-        sock.close()
     Connection.connection_pool.clear()
+
+def run_revalidation_benchmark(server, num_requests, validators):
+    url = URL.parse(f"{server.base_url}/etag?validators={int(validators)}")
+    conn = Connection(http_options={"http_version": "1.1"})
+    bytes_before = server.stats.bytes_sent
+
+    start_time = time.perf_counter()
+    for _ in range(num_requests):
+        conn.request(url=url)
+    end_time = time.perf_counter()
+
+    return {
+        'total_time': end_time - start_time,
+        'bytes': server.stats.bytes_sent - bytes_before,
+    }
+
+def test_revalidation_bytes_transferred(local_server):
+    """Compares bytes sent for expired entries with and without validators."""
+    num_requests = 20
+    full = run_revalidation_benchmark(
+        local_server, num_requests, validators=False
+    )
+    revalidated = run_revalidation_benchmark(
+        local_server, num_requests, validators=True
+    )
+
+    print(
+        f"\n--- Revalidation of expired entries ({num_requests} requests) ---"
+    )
+    print(f"Full GET: {full['bytes']} bytes in {full['total_time']:.4f}s")
+    print(
+        f"If-None-Match / 304: {revalidated['bytes']} bytes "
+        f"in {revalidated['total_time']:.4f}s"
+    )
+
+    # Only the first response carries the body when revalidating
+    assert revalidated['bytes'] < full['bytes'] / 10
+
+def test_fetch_many_against_sequential(local_server):
+    """Compares async fetch_many with sequential keep-alive requests."""
+    num_requests = 40
+    concurrency = 8
+    urls = [
+        URL.parse(f"{local_server.base_url}/page{i}?delay=0.05")
+        for i in range(num_requests)
+    ]
+
+    stats = local_server.stats
+
+    start_time = time.perf_counter()
+    conn = Connection(http_options={"http_version": "1.1"})
+    sequential = [conn.request(url=url) for url in urls]
+    sequential_time = time.perf_counter() - start_time
+    sequential_in_flight = stats.max_in_flight
+
+    stats.max_in_flight = 0
+    start_time = time.perf_counter()
+    concurrent = fetch_many(urls, concurrency=concurrency)
+    concurrent_time = time.perf_counter() - start_time
+
+    print(
+        f"\n--- fetch_many vs sequential ({num_requests} requests, "
+        "50ms latency) ---"
+    )
+    print(
+        f"Sequential (HTTP/1.1 keep-alive): {sequential_time:.4f}s, "
+        f"{sequential_in_flight} in flight"
+    )
+    print(
+        f"fetch_many (concurrency={concurrency}): {concurrent_time:.4f}s, "
+        f"{stats.max_in_flight} in flight"
+    )
+
+    assert concurrent == sequential
+    # The server saw the requests overlap, up to the concurrency limit
+    assert sequential_in_flight == 1
+    assert 1 < stats.max_in_flight <= concurrency
+
+def test_keep_alive_against_local_server(local_server):
+    """Compares pooled HTTP/1.1 sockets with a new socket per request."""
+    num_requests = 50
+    base_url = local_server.base_url
+    keep_alive = run_benchmark(
+        num_requests, keep_alive=True, base_url=base_url
+    )
+    no_keep_alive = run_benchmark(
+        num_requests, keep_alive=False, base_url=base_url
+    )
+
+    print(
+        f"\n--- Keep-alive against a local server "
+        f"({num_requests} requests) ---"
+    )
+    print(
+        f"HTTP/1.1: {keep_alive['total_time']:.4f}s, "
+        f"{keep_alive['connections']}"
+    )
+    print(
+        f"HTTP/1.0: {no_keep_alive['total_time']:.4f}s, "
+        f"{no_keep_alive['connections']}"
+    )
+
+    assert keep_alive['connections'] == {'new': 1, 'reused': num_requests - 1}
+    assert no_keep_alive['connections'] == {'new': num_requests, 'reused': 0}
+
+def test_pipelining_against_serial_keep_alive(latency_proxy):
+    """Compares pipelined and serial keep-alive requests over a 20ms RTT."""
+    num_requests = 20
+    urls = [
+        URL.parse(f"{latency_proxy.base_url}/asset{i}.css")
+        for i in range(num_requests)
+    ]
+
+    start_time = time.perf_counter()
+    conn = Connection(http_options={"http_version": "1.1"})
+    serial = conn.request_many(urls)
+    serial_time = time.perf_counter() - start_time
+    serial_reads = latency_proxy.client_reads
+
+    Connection.connection_pool.clear()
+    latency_proxy.client_reads = 0
+    start_time = time.perf_counter()
+    pipelined = conn.request_many(urls, pipeline=True)
+    pipelined_time = time.perf_counter() - start_time
+    pipelined_reads = latency_proxy.client_reads
+
+    print(
+        f"\n--- Pipelining vs serial keep-alive "
+        f"({num_requests} requests, 20ms RTT) ---"
+    )
+    print(
+        f"Serial (HTTP/1.1 keep-alive): {serial_time:.4f}s, "
+        f"{serial_reads} round trips"
+    )
+    print(f"Pipelined: {pipelined_time:.4f}s, {pipelined_reads} round trips")
+
+    assert pipelined == serial
+    # Serial requests wait a round trip each; pipelined ones go out together
+    assert serial_reads == num_requests
+    assert pipelined_reads < num_requests / 4
+
+def test_chunked_decoding_with_small_chunks():
+    """Decodes a 1MB body sent in 16-byte chunks like the /gzip endpoint."""
+    data = b"x" * (1024 * 1024)
+    encoded = b"".join(
+        f"{16:x}\r\n".encode() + data[i:i + 16] + b"\r\n"
+        for i in range(0, len(data), 16)
+    ) + b"0\r\n\r\n"
+    conn = Connection()
+
+    start_time = time.perf_counter()
+    body = b""
+    response = BufferedReader(BytesIO(encoded))
+    for chunk_data in conn._iter_chunked_body(response):
+        body += chunk_data
+    concatenated_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    joined = conn._read_chunked_body(BufferedReader(BytesIO(encoded)))
+    joined_time = time.perf_counter() - start_time
+
+    print(f"\n--- Chunked decoding (1MB in 16-byte chunks) ---")
+    print(f"body += chunk: {concatenated_time:.4f}s")
+    print(f"_read_chunked_body: {joined_time:.4f}s")
+
+    assert joined == body == data
+    assert joined_time < concatenated_time
+
+def test_tls_handshake_cost(tls_server):
+    """
+    Compares a fresh context and full handshake per socket with the shared
+    context and resumed sessions.
+    """
+    num_connections = 30
+    host, port = tls_server.server_address[:2]
+
+    start_time = time.perf_counter()
+    for _ in range(num_connections):
+        # What every new HTTPS socket used to do
+        ctx = ssl.create_default_context(cafile=TLS_CERTFILE)
+        ctx.load_default_certs()
+        ctx.wrap_socket(
+            socket.create_connection((host, port)), server_hostname=host
+        ).close()
+    fresh_time = time.perf_counter() - start_time
+
+    conn = Connection(http_options={"http_version": "1.0"})
+    url = URL.parse(f"{tls_server.base_url}/")
+    conn.request(url=url)  # First full handshake, receives the session ticket
+    start_time = time.perf_counter()
+    for _ in range(num_connections):
+        conn._connect(url).close()
+    shared_time = time.perf_counter() - start_time
+
+    print(f"\n--- TLS connection setup ({num_connections} connections) ---")
+    print(f"New context, full handshake: {fresh_time:.4f}s")
+    print(f"Shared context, resumed session: {shared_time:.4f}s")
+    print(f"TLS stats: {Connection.tls.stats}")
+
+    assert Connection.tls.stats.resumed_handshakes == num_connections
+    assert shared_time < fresh_time
+
+def test_redirect_memoization(local_server, latency_proxy):
+    """Compares a 20-hop permanent redirect chain before and after caching."""
+    url = URL.parse(f"{latency_proxy.base_url}/redirect/20?status=301")
+    conn = Connection(http_options={"http_version": "1.1"})
+
+    start_time = time.perf_counter()
+    first = conn.request(url=url)
+    first_time = time.perf_counter() - start_time
+    first_requests = len(local_server.stats.requests)
+
+    start_time = time.perf_counter()
+    second = conn.request(url=url)
+    second_time = time.perf_counter() - start_time
+    second_requests = len(local_server.stats.requests) - first_requests
+
+    stats = Connection.redirect_cache.stats
+    print(f"\n--- Redirect memoization (20 hops, 20ms RTT) ---")
+    print(f"Following the chain: {first_time:.4f}s, {first_requests} requests")
+    print(
+        f"Memoized: {second_time:.4f}s, {second_requests} requests, "
+        f"{stats.hops_skipped} hops skipped"
+    )
+    print(f"Sockets opened: {Connection.connection_pool.stats.created}")
+
+    assert first == second == "Final destination reached."
+    assert stats.hops_skipped == 20
+    # Every hop is a round trip the first time, only the final page after
+    assert (first_requests, second_requests) == (21, 1)
+    assert Connection.connection_pool.stats.created == 1
+
+def test_measure_many_against_measure_per_word():
+    """Measures a 100k-word paragraph word by word, then as one text node."""
+    font = CountingFont(family="Arial", size=12)
+    words = [f"word{i % 5000}" for i in range(100_000)]
+    measurer = FontMeasurer()
+    measurer.measure_many(font, words)  # Same warm caches for both
+
+    font.cget_calls = 0
+    start_time = time.perf_counter()
+    per_word = [measurer.measure(font, word) for word in words]
+    per_word_time = time.perf_counter() - start_time
+    per_word_lookups = font.cget_calls
+
+    font.cget_calls = 0
+    start_time = time.perf_counter()
+    batched = measurer.measure_many(font, words)
+    batched_time = time.perf_counter() - start_time
+    batched_lookups = font.cget_calls
+
+    print(f"\n--- Measuring 100k words ---")
+    print(
+        f"measure per word: {per_word_time:.4f}s, "
+        f"{per_word_lookups} cget calls"
+    )
+    print(f"measure_many: {batched_time:.4f}s, {batched_lookups} cget calls")
+    print(f"Word cache hit rate: {measurer.stats.word_hit_rate:.2%}")
+
+    assert batched == per_word
+    # The font key (four cget calls) is worked out once per text node
+    assert per_word_lookups == 4 * len(words)
+    assert batched_lookups == 4
+
+# The node classes as they were before they were slotted
+@dataclass
+class DictNode:
+    tag: str = ""
+    children: list = field(default_factory=list)
+
+@dataclass
+class DictElement(DictNode):
+    attributes: dict = field(default_factory=dict)
+    parent: DictNode | None = None
+
+@dataclass
+class DictText(DictNode):
+    text: str = ""
+    parent: DictNode | None = None
+
+def copy_tree(node, compact, parent=None):
+    if isinstance(node, Text):
+        if compact:
+            return Text(text=node.text, parent=parent)
+        return DictText(text=node.text, parent=parent)
+    if compact:
+        copy = Element(
+            tag=node.tag,
+            attributes=(
+                dict(node.attributes) if node.attributes else node.attributes
+            ),
+            parent=parent,
+        )
+    else:
+        # Tags used to be a fresh string per element
+        copy = DictElement(
+            tag=node.tag.casefold(),
+            attributes=dict(node.attributes),
+            parent=parent,
+        )
+    for child in node.children:
+        copy.children.append(copy_tree(child, compact, copy))
+    return copy
+
+def measure_tree_memory(tree, compact):
+    gc.collect()
+    tracemalloc.start()
+    copy = copy_tree(tree, compact)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del copy
+    return size
+
+def count_nodes(node: Node) -> int:
+    return 1 + sum(count_nodes(child) for child in node.children)
+
+def test_dom_memory_on_10mb_document():
+    """Bytes held by the nodes of a 10MB page, slotted vs. instance dicts."""
+    document = generate_document(10 * 1024 * 1024)
+    tree = HTMLParser(body=document).parse()
+    nodes = count_nodes(tree)
+
+    dict_size = measure_tree_memory(tree, compact=False)
+    compact_size = measure_tree_memory(tree, compact=True)
+
+    print(
+        f"\n--- DOM memory ({len(document) / 2**20:.1f}MB, "
+        f"{nodes} nodes) ---"
+    )
+    print(
+        f"Dataclasses with __dict__: {dict_size / 2**20:.1f}MB "
+        f"({dict_size / nodes:.0f} bytes/node)"
+    )
+    print(
+        f"Slotted, shared empties: {compact_size / 2**20:.1f}MB "
+        f"({compact_size / nodes:.0f} bytes/node)"
+    )
+
+    assert compact_size < dict_size * 0.6
+
+def test_parse_time_scales_linearly_with_nesting_depth():
+    """
+    Parses deeply nested pages at 2,000 and 8,000 levels; 4x the input
+    should take about 4x the time.
+    """
+    def nested(depth):
+        half = depth // 2
+        return {
+            "div": "<div>" * depth + "x" + "</div>" * depth,
+            # Every </span> closes and reopens the <b> inside it
+            "misnested": "<span><b>" * half + "x" + "</span></b>" * half,
+            "lists": "<div><ul>" * half + "<li>a<li>b<p>c<p>d" * half,
+        }
+
+    print(f"\n--- Parsing deeply nested documents ---")
+    for name in nested(1):
+        times = []
+        for depth in (2000, 8000):
+            document = nested(depth)[name]
+            times.append(best_time(lambda: HTMLParser(body=document).parse()))
+        print(
+            f"{name}: {times[0]:.4f}s at depth 2000, "
+            f"{times[1]:.4f}s at depth 8000"
+        )
+        # Quadratic bookkeeping would take 16x as long
+        assert times[1] < times[0] * 8
+
+def test_tag_parsing_cache():
+    """Parses the tags of a 1MB attribute-heavy page with and without cache."""
+    document = generate_document(1024 * 1024)
+    tags = [tag.split(">", 1)[0] for tag in document.split("<")[1:]]
+    parse_attributes.cache_clear()
+
+    start_time = time.perf_counter()
+    uncached = [parse_attributes.__wrapped__(tag) for tag in tags]
+    uncached_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    cached = [parse_attributes(tag) for tag in tags]
+    cached_time = time.perf_counter() - start_time
+
+    cache_info = parse_attributes.cache_info()
+    print(f"\n--- Parsing {len(tags)} tags ---")
+    print(f"Uncached: {uncached_time:.4f}s")
+    print(f"Cached: {cached_time:.4f}s ({cache_info})")
+
+    assert cached == uncached
+    # Only the first occurrence of each tag is scanned
+    assert cache_info.misses == len(set(tags))
+    assert cache_info.hits == len(tags) - len(set(tags))
+
+def iter_elements(node):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Element):
+            yield node
+            stack.extend(node.children)
+
+def test_lazy_attributes():
+    """
+    Parses a 1MB page, then compares reading no attributes with reading
+    all of them.
+    """
+    document = generate_document(1024 * 1024)
+    parse_attributes.cache_clear()
+
+    gc.collect()
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    tree = HTMLParser(body=document).parse()
+    parse_time = time.perf_counter() - start_time
+    lazy_size, _ = tracemalloc.get_traced_memory()
+
+    start_time = time.perf_counter()
+    attributes = sum(
+        len(element.attributes) for element in iter_elements(tree)
+    )
+    attributes_time = time.perf_counter() - start_time
+    eager_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"\n--- Lazy attributes ({attributes} attributes) ---")
+    print(
+        f"Parse, attributes untouched: {parse_time:.4f}s, "
+        f"{lazy_size / 2**20:.1f}MB"
+    )
+    print(
+        "Then reading every element's attributes: "
+        f"+{attributes_time:.4f}s, {eager_size / 2**20:.1f}MB"
+    )
+
+    assert lazy_size < eager_size
+
+def test_entity_decoding_against_html_unescape():
+    """
+    Decodes the text of a 1MB page, with and without character
+    references, and compares with html.unescape.
+    """
+    document = generate_document(1024 * 1024)
+    texts = {
+        "entity-heavy": [
+            text.split("<", 1)[0]
+            .replace(" and ", " &amp; &#x2014; ")
+            .replace("text", "&ldquo;text&rdquo;&nbsp;&copy")
+            for text in document.split(">")
+        ],
+        "no references": [
+            text.split("<", 1)[0].replace("&", "and")
+            for text in document.split(">")
+        ],
+    }
+
+    print(f"\n--- Decoding character references (1MB page) ---")
+    for name, corpus in texts.items():
+        decoded = [replace_all(text) for text in corpus]
+        assert decoded == [html.unescape(text) for text in corpus]
+
+        decoder_time = best_time(
+            lambda: [replace_all(text) for text in corpus]
+        )
+        unescape_time = best_time(
+            lambda: [html.unescape(text) for text in corpus]
+        )
+        print(
+            f"{name}: EntityDecoder {decoder_time:.4f}s, "
+            f"html.unescape {unescape_time:.4f}s"
+        )
+        assert decoder_time < unescape_time * 2
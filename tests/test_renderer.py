@@ -1,7 +1,12 @@
+import html
+from html.entities import html5
+
 import pytest
 
 from gorushi.url import URL
-from gorushi.renderer import Renderer, RenderMode
+from gorushi.renderer import (
+    EntityDecoder, Renderer, RenderMode, entity_decoder, replace_all
+)
 
 
 @pytest.mark.ci
@@ -55,3 +60,61 @@ def test_renderer_with_double_encoded_entities():
     rendered_content = renderer.render()
     assert "Double encoded: &gt; &lt;" in rendered_content
 
+
+####
+# Entity Decoder Tests
+####
+
+@pytest.mark.ci
+def test_every_named_entity():
+    for name, replacement in html5.items():
+        decoded = entity_decoder.replace_all(f"a&{name}b")
+        assert decoded == f"a{replacement}b", name
+
+
+@pytest.mark.ci
+@pytest.mark.parametrize("text, expected", [
+    ("&notin; &notit;", "∉ ¬it;"),
+    ("&amp &ampx &AMP;", "& &x &"),
+    ("&am&amp; &&lt;", "&am& &<"),
+    ("&unknown; & amp; &", "&unknown; & amp; &"),
+    ("&CounterClockwiseContourIntegral;", "∳"),
+])
+def test_named_references_match_longest(text, expected):
+    assert entity_decoder.replace_all(text) == expected
+    assert entity_decoder.replace_all(text) == html.unescape(text)
+
+
+@pytest.mark.ci
+@pytest.mark.parametrize("text, expected", [
+    ("&#39;&#x27;&#X27", "'" * 3),
+    ("&#65&#66;C", "ABC"),
+    ("&#128;&#x9F;", "€Ÿ"),
+    ("&#x81;", "\x81"),
+    ("&#0;&#xD800;&#1114112;", "�" * 3),
+    ("&#; &#x; &#z", "&#; &#x; &#z"),
+])
+def test_numeric_references(text, expected):
+    assert entity_decoder.replace_all(text) == expected
+    assert entity_decoder.replace_all(text) == html.unescape(text)
+
+
+@pytest.mark.ci
+def test_text_without_references_is_returned_as_is():
+    text = "no references here; just text"
+    assert entity_decoder.replace_all(text) is text
+    assert replace_all(text) is text
+    assert replace_all("&copy;&#169;") == "\u00a9\u00a9"
+
+
+@pytest.mark.ci
+def test_entity_decoder_must_be_compiled():
+    decoder = EntityDecoder()
+    decoder.add_pattern("&x;", "y")
+    with pytest.raises(RuntimeError):
+        decoder.replace_all("&x;")
+    decoder.compile()
+    assert decoder.replace_all("&x;&x") == "y&x"
+
+    with pytest.raises(ValueError):
+        decoder.add_pattern("&a b;", "c")
@@ -0,0 +1,116 @@
+import socket
+import time
+
+import pytest
+
+from gorushi.connection import Connection
+from gorushi.resolver import (
+    Resolver, happy_eyeballs_connect, interleave_families
+)
+from gorushi.url import URL
+
+from conftest import LocalServer
+
+
+def address(family: socket.AddressFamily, host: str, port: int):
+    if family == socket.AF_INET6:
+        sockaddr = (host, port, 0, 0)
+    else:
+        sockaddr = (host, port)
+    return (family, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", sockaddr)
+
+
+@pytest.mark.ci
+def test_resolver_caches_until_ttl(monkeypatch: pytest.MonkeyPatch):
+    calls: list[str] = []
+
+    def getaddrinfo(host: str, port: int, **_):
+        calls.append(host)
+        return [address(socket.AF_INET, "127.0.0.1", port)]
+
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+    resolver = Resolver(ttl=0.05)
+    for _ in range(3):
+        assert resolver.resolve("example.test", 80)[0][4] == ("127.0.0.1", 80)
+    assert calls == ["example.test"]
+    assert (resolver.stats.hits, resolver.stats.misses) == (2, 1)
+
+    time.sleep(0.06)
+    resolver.resolve("example.test", 80)
+    assert calls == ["example.test", "example.test"]
+
+
+@pytest.mark.ci
+def test_interleave_families():
+    v6 = [address(socket.AF_INET6, f"::{i}", 80) for i in range(1, 4)]
+    v4 = [address(socket.AF_INET, f"10.0.0.{i}", 80) for i in range(1, 3)]
+    assert interleave_families(v6 + v4) == [v6[0], v4[0], v6[1], v4[1], v6[2]]
+
+
+@pytest.mark.ci
+def test_happy_eyeballs_skips_refused_address(local_server: LocalServer):
+    closed = socket.create_server(("127.0.0.1", 0))
+    closed_port = closed.getsockname()[1]
+    closed.close()
+
+    port = local_server.server_address[1]
+    sock = happy_eyeballs_connect([
+        address(socket.AF_INET, "127.0.0.1", closed_port),
+        address(socket.AF_INET, "127.0.0.1", port),
+    ])
+    assert sock.getpeername() == ("127.0.0.1", port)
+    sock.close()
+
+
+@pytest.mark.ci
+def test_happy_eyeballs_races_unresponsive_address(local_server: LocalServer):
+    port = local_server.server_address[1]
+    start = time.perf_counter()
+    # 192.0.2.0/24 is reserved for documentation: nothing ever answers
+    sock = happy_eyeballs_connect([
+        address(socket.AF_INET, "192.0.2.1", 80),
+        address(socket.AF_INET, "127.0.0.1", port),
+    ], delay=0.05)
+    assert sock.getpeername() == ("127.0.0.1", port)
+    assert time.perf_counter() - start < 1
+    sock.close()
+
+
+@pytest.mark.ci
+def test_preconnect_warms_pool(local_server: LocalServer):
+    conn = Connection(http_options={"http_version": "1.1"})
+    urls = [URL.parse(f"{local_server.base_url}/page{i}") for i in range(3)]
+    assert conn.preconnect(urls) == 1
+    # Already warm
+    assert conn.preconnect(urls) == 0
+
+    assert conn.request(url=urls[0]) == "Hello /page0"
+    stats = Connection.connection_pool.stats
+    assert (stats.created, stats.reused) == (1, 1)
+
+
+@pytest.mark.ci
+def test_preconnect_is_capped(
+    local_server: LocalServer,
+    monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(Connection, "MAX_PRECONNECTS", 2)
+    conn = Connection(http_options={"http_version": "1.1"})
+    port = local_server.server_address[1]
+    # Distinct origins that all reach the local server
+    urls = [
+        URL.parse(f"http://{host}:{port}/")
+        for host in ("127.0.0.1", "localhost", "127.0.0.2")
+    ]
+    assert conn.preconnect(urls) == 2
+    assert len(Connection.connection_pool) == 2
+
+
+@pytest.mark.ci
+def test_preconnect_ignores_failures():
+    conn = Connection(http_options={"http_version": "1.1"})
+    closed = socket.create_server(("127.0.0.1", 0))
+    closed_port = closed.getsockname()[1]
+    closed.close()
+    url = URL.parse(f"http://127.0.0.1:{closed_port}/")
+    assert conn.preconnect([url]) == 0
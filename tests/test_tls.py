@@ -0,0 +1,58 @@
+import os
+import ssl
+
+import pytest
+
+from gorushi.connection import Connection
+from gorushi.url import URL
+
+from conftest import CERTS_DIR, LocalServer
+
+
+@pytest.mark.ci
+def test_https_request(tls_server: LocalServer):
+    conn = Connection(http_options={"http_version": "1.1"})
+    url = URL.parse(f"{tls_server.base_url}/secure")
+    assert conn.request(url=url) == "Hello /secure"
+    assert conn.request(url=url) == "Hello /secure"
+    assert Connection.connection_pool.stats.reused == 1
+
+
+@pytest.mark.ci
+def test_reconnects_share_context_and_resume_session(tls_server: LocalServer):
+    conn = Connection(http_options={"http_version": "1.0"})
+    for i in range(4):
+        url = URL.parse(f"{tls_server.base_url}/page{i}")
+        assert conn.request(url=url) == f"Hello /page{i}"
+
+    stats = Connection.tls.stats
+    assert stats.contexts_created == 1
+    assert stats.full_handshakes == 1
+    assert stats.resumed_handshakes == 3
+
+
+@pytest.mark.ci
+def test_session_is_not_resumed_with_another_config(tls_server: LocalServer):
+    conn = Connection(http_options={"http_version": "1.0"})
+    url = URL.parse(f"{tls_server.base_url}/")
+    assert conn.request(url=url) == "Hello /"
+
+    # Same certificate, but a different config and so a different context
+    Connection.tls_config = Connection.tls_config._replace(
+        cafile=os.path.join(CERTS_DIR, ".", "localhost.pem")
+    )
+    assert conn.request(url=url) == "Hello /"
+    assert conn.request(url=url) == "Hello /"
+
+    stats = Connection.tls.stats
+    assert stats.contexts_created == 2
+    assert stats.full_handshakes == 2
+    assert stats.resumed_handshakes == 1
+
+
+@pytest.mark.ci
+def test_untrusted_certificate_is_rejected(tls_server: LocalServer):
+    Connection.tls_config = Connection.tls_config._replace(cafile=None)
+    conn = Connection(http_options={"http_version": "1.0"})
+    with pytest.raises(ssl.SSLCertVerificationError):
+        conn.request(url=URL.parse(f"{tls_server.base_url}/"))
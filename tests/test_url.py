@@ -23,3 +23,47 @@ def test_view_source_scheme():
     assert url.view_source
     assert url.scheme == "http"
     assert url.host == "example.com"
+
+
+@pytest.mark.ci
+@pytest.mark.parametrize(("href", "expected"), [
+    ("d.html", "/a/b/d.html"),
+    ("../x.html", "/a/x.html"),
+    ("/root.html", "/root.html"),
+    ("", "/a/b/c.html"),
+    ("#frag", "/a/b/c.html"),
+    ("?q=1", "/a/b/c.html?q=1"),
+    ("d.html#frag", "/a/b/d.html"),
+])
+def test_resolve_relative_links(href: str, expected: str):
+    url = URL.parse("http://example.com:8080/a/b/c.html").resolve(href)
+    assert (url.scheme, url.host, url.port, url.path) == (
+        "http", "example.com", 8080, expected
+    )
+
+
+@pytest.mark.ci
+def test_resolve_absolute_links():
+    base = URL.parse("https://example.com/index.html")
+    url = base.resolve("//cdn.example.com/app.js")
+    assert (url.scheme, url.host, url.path) == (
+        "https", "cdn.example.com", "/app.js"
+    )
+    url = base.resolve("http://other.example/")
+    assert (url.scheme, url.host, url.port) == ("http", "other.example", 80)
+
+
+@pytest.mark.ci
+@pytest.mark.parametrize("href", [
+    "mailto:someone@example.com",
+    "javascript:void(0)",
+])
+def test_resolve_links_without_a_fetchable_scheme(href: str):
+    url = URL.parse("http://example.com/a/b/c.html").resolve(href)
+    assert url.scheme == "about"
+
+
+@pytest.mark.ci
+def test_resolve_data_link():
+    url = URL.parse("http://example.com/a/b/c.html").resolve("data:text/html,Hi")
+    assert (url.scheme, url.content) == ("data", "Hi")